@@ -1,16 +1,201 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+import asyncio
 import os
+import threading
+import time
 
-# MongoDB connection - will be initialized in server.py
+from utils.fork import after_fork
+from utils.mongo_profiler import command_profiler
+
+# MongoDB connection - created and closed by the FastAPI lifespan in server.py
 client = None
-db = None
+_database = None
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters collected from pymongo pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.open_connections = 0
+            self.checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.waiting = 0
+            self.max_waiting = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self._wait_started = {}
+
+    def _begin_wait(self, event):
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            self._wait_started[threading.get_ident()] = time.perf_counter()
+
+    def _end_wait(self):
+        started = self._wait_started.pop(threading.get_ident(), None)
+        self.waiting = max(self.waiting - 1, 0)
+        if started is not None:
+            waited = (time.perf_counter() - started) * 1000
+            self.total_wait_ms += waited
+            self.max_wait_ms = max(self.max_wait_ms, waited)
+
+    def connection_check_out_started(self, event):
+        self._begin_wait(event)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self._end_wait()
+            self.checkouts += 1
+            self.checked_out += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._end_wait()
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(self.open_connections - 1, 0)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "openConnections": self.open_connections,
+                "checkedOut": self.checked_out,
+                "waiting": self.waiting,
+                "maxWaiting": self.max_waiting,
+                "checkouts": self.checkouts,
+                "checkoutFailures": self.checkout_failures,
+                "avgWaitMs": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "maxWaitMs": round(self.max_wait_ms, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+def pool_options() -> dict:
+    """Motor client pool settings, configurable through the environment."""
+    return {
+        "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", "0")),
+        "waitQueueTimeoutMS": int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+        "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    }
+
+
+class _DatabaseProxy:
+    """
+    Stable handle returned by get_db().
+
+    Route modules grab `db = get_db()` at import time, before the lifespan
+    hook has connected. Attribute access is forwarded to whichever database
+    is current, so the client can be created and closed per process.
+    """
+
+    def _target(self):
+        if _database is None:
+            raise RuntimeError("Database is not connected; call database.connect() first")
+        return _database
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __getitem__(self, name):
+        return self._target()[name]
+
+
+_proxy = _DatabaseProxy()
+
+
+def connect():
+    """Create the Motor client for this process. Called from the lifespan hook."""
+    global client, _database
+    if client is not None:
+        return _proxy
+    pool_stats.reset()
+    client = AsyncIOMotorClient(
+        os.environ['MONGO_URL'],
+        event_listeners=[pool_stats, command_profiler],
+        **pool_options()
+    )
+    _database = client[os.environ['DB_NAME']]
+    return _proxy
+
+
+def close():
+    global client, _database
+    if client is not None:
+        client.close()
+    client = None
+    _database = None
+
+
+@after_fork
+def _forget_parent_client():
+    """
+    A Motor client must not be used across a fork. Drop any client the
+    parent created (e.g. gunicorn --preload) without closing it - its
+    sockets belong to the parent - so the worker's lifespan connects anew.
+    """
+    global client, _database
+    client = None
+    _database = None
+    # Fresh counters and lock; a parent thread may have held the old one
+    pool_stats.__init__()
+
 
 def init_db():
-    global client, db
-    mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[os.environ['DB_NAME']]
-    return db
+    # Kept for scripts that expect the old entry point
+    return connect()
+
 
 def get_db():
-    return db
+    return _proxy
+
+
+def is_connected() -> bool:
+    return _database is not None
+
+
+async def ping(timeout: float = 2.0) -> float:
+    """Round-trip a ping to the server; returns latency in ms."""
+    started = time.perf_counter()
+    await asyncio.wait_for(_proxy.command("ping"), timeout=timeout)
+    return (time.perf_counter() - started) * 1000
+
+
+async def ensure_indexes():
+    """Apply the index registry (see indexes.py). Idempotent."""
+    from indexes import apply_indexes
+    return await apply_indexes(_proxy)
@@ -3,6 +3,7 @@ Properly format artikel content ke valid HTML
 """
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from utils.cache_versions import ARTICLES, bump
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -366,6 +367,9 @@ async def fix_articles():
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         raise
+    else:
+        # Drop cached copies / ETags served by the API
+        await bump(ARTICLES, db)
     finally:
         client.close()
 
@@ -0,0 +1,34 @@
+"""
+Gunicorn launcher for running the API on every core.
+
+    cd backend
+    gunicorn -c gunicorn.conf.py server:app
+
+Each worker is its own process running the ASGI app under uvicorn, and owns
+everything stateful:
+
+- the Motor client and pool are created by the lifespan hook in server.py,
+  i.e. inside the worker;
+- Midtrans clients, password hashers and caches are created lazily on first
+  use and reset after fork (utils/fork.py), so GUNICORN_PRELOAD=1 is safe.
+
+Environment:
+    WEB_CONCURRENCY     number of workers (default: CPU count)
+    GUNICORN_BIND       listen address (default 0.0.0.0:8001)
+    GUNICORN_PRELOAD    "1" imports the app once in the master before forking
+    GUNICORN_TIMEOUT    seconds before a silent worker is restarted (default 60)
+
+MONGO_MAX_POOL_SIZE is per worker: the server sees up to
+WEB_CONCURRENCY x MONGO_MAX_POOL_SIZE connections from one box.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8001")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
@@ -0,0 +1,263 @@
+"""
+Index registry for every MongoDB collection the API queries.
+
+All indexes are declared here and applied by database.ensure_indexes() on
+startup. create_indexes() is idempotent, so re-applying an unchanged spec is
+a no-op; new indexes are built in the background.
+
+QUERY_SHAPES lists the filters/sorts the route modules actually send so the
+query-plan check (tests/test_query_plans.py) can run explain() on each one and
+fail if any of them falls back to a COLLSCAN.
+"""
+import logging
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+def _index(*keys, **options) -> IndexModel:
+    options.setdefault("background", True)
+    return IndexModel(list(keys), **options)
+
+
+INDEXES = {
+    # Auth / users
+    "users": [
+        _index(("email", ASCENDING)),
+        _index(("myReferralCode", ASCENDING)),
+        _index(("createdAt", DESCENDING)),
+        _index(("referralCount", DESCENDING)),
+    ],
+    "admin_users": [
+        _index(("email", ASCENDING)),
+    ],
+    # Per-user cache invalidations (utils/user_cache.py), kept for 10 minutes
+    "user_invalidations": [
+        _index(("at", ASCENDING), expireAfterSeconds=600),
+    ],
+
+    # Payments
+    "payment_proofs": [
+        _index(("orderId", ASCENDING)),
+        _index(("userId", ASCENDING), ("createdAt", DESCENDING)),
+        _index(("createdAt", DESCENDING)),
+        # Due Midtrans orders for the payment reconciler
+        _index(("status", ASCENDING), ("nextCheckAt", ASCENDING)),
+    ],
+    "payments": [
+        _index(("userId", ASCENDING), ("status", ASCENDING)),
+        _index(("registrationId", ASCENDING)),
+        _index(("uploadedAt", DESCENDING)),
+    ],
+    "transactions": [
+        _index(("order_id", ASCENDING)),
+        _index(("created_at", DESCENDING)),
+    ],
+    "webhook_events": [
+        _index(("status", ASCENDING), ("nextAttemptAt", ASCENDING)),
+        _index(("status", ASCENDING), ("leaseUntil", ASCENDING)),
+    ],
+    "referral_transactions": [
+        _index(("referrerId", ASCENDING), ("referredId", ASCENDING), ("status", ASCENDING)),
+        _index(("referredId", ASCENDING)),
+        _index(("createdAt", DESCENDING)),
+    ],
+
+    # Wallet
+    "wallets": [
+        # One wallet per user: balance copies upsert on userId
+        _index(("userId", ASCENDING), unique=True),
+    ],
+    "wallet_ledger": [
+        # One entry per seq: concurrent changes to a wallet cannot both land
+        _index(("userId", ASCENDING), ("seq", ASCENDING), unique=True),
+        # A referenced change (e.g. a top-up order) is recorded once
+        _index(("type", ASCENDING), ("refId", ASCENDING), unique=True,
+               partialFilterExpression={"refId": {"$type": "string"}}),
+    ],
+    "wallet_snapshots": [
+        _index(("userId", ASCENDING), ("seq", DESCENDING), unique=True),
+    ],
+    "wallet_transactions": [
+        _index(("userId", ASCENDING), ("createdAt", DESCENDING)),
+        _index(("orderId", ASCENDING)),
+        _index(("status", ASCENDING), ("nextCheckAt", ASCENDING)),
+    ],
+
+    # Analytics
+    "pageviews": [
+        _index(("timestamp", ASCENDING)),
+        _index(("page", ASCENDING)),
+    ],
+    "online_users": [
+        _index(("sessionId", ASCENDING)),
+        _index(("lastActivity", DESCENDING)),
+    ],
+
+    # Tests & results
+    "questions": [
+        _index(("testType", ASCENDING), ("isPremium", ASCENDING), ("order", ASCENDING)),
+        _index(("order", ASCENDING)),
+    ],
+    "personality_descriptions": [
+        _index(("personalityType", ASCENDING)),
+    ],
+    "test_results": [
+        _index(("userEmail", ASCENDING), ("testType", ASCENDING)),
+        _index(("userEmail", ASCENDING), ("completedAt", DESCENDING)),
+        _index(("userId", ASCENDING), ("testType", ASCENDING)),
+        _index(("testType", ASCENDING)),
+    ],
+    "user_test_answers": [
+        _index(("userId", ASCENDING), ("testType", ASCENDING), unique=True),
+    ],
+    "ai_analyses": [
+        _index(("userId", ASCENDING), ("createdAt", DESCENDING)),
+        _index(("userId", ASCENDING), ("testType", ASCENDING)),
+    ],
+
+    # Certificates
+    "issued_certificates": [
+        _index(("certificateNumber", ASCENDING)),
+        _index(("issuedAt", DESCENDING)),
+    ],
+
+    # Content
+    "articles": [
+        _index(("slug", ASCENDING)),
+        _index(("publishedAt", DESCENDING)),
+    ],
+    "banners": [
+        _index(("order", ASCENDING)),
+    ],
+    "running_info": [
+        _index(("priority", DESCENDING)),
+    ],
+    "hero_slides": [
+        _index(("isActive", ASCENDING), ("order", ASCENDING)),
+    ],
+    "website_products": [
+        _index(("isActive", ASCENDING), ("order", ASCENDING)),
+    ],
+    "website_testimonials": [
+        _index(("isActive", ASCENDING), ("order", ASCENDING)),
+    ],
+    "website_activities": [
+        _index(("isActive", ASCENDING), ("order", ASCENDING)),
+    ],
+    "section_images": [
+        _index(("sectionName", ASCENDING)),
+    ],
+    "products": [
+        _index(("createdAt", DESCENDING)),
+    ],
+
+    # Lead forms
+    "registrations": [
+        _index(("email", ASCENDING)),
+        _index(("registrationDate", DESCENDING)),
+    ],
+    "contacts": [
+        _index(("submittedAt", DESCENDING)),
+    ],
+    "institutions": [
+        _index(("createdAt", DESCENDING)),
+    ],
+}
+
+
+# (collection, filter, sort) as issued by the route modules
+QUERY_SHAPES = [
+    ("users", {"email": "user@example.com"}, None),
+    ("users", {"myReferralCode": "ABCD123456"}, None),
+    ("users", {}, [("createdAt", DESCENDING)]),
+    ("users", {"referralCount": {"$gt": 0}}, [("referralCount", DESCENDING)]),
+    ("admin_users", {"email": "admin@example.com"}, None),
+    ("user_invalidations", {"at": {"$gte": "2024-01-01"}}, None),
+    ("payment_proofs", {"orderId": "NEWME-00000000-ABCDEF12"}, None),
+    ("payment_proofs", {"userId": "000000000000000000000000"}, [("createdAt", DESCENDING)]),
+    ("payment_proofs", {"status": "pending", "paymentMethod": "midtrans_snap",
+                        "nextCheckAt": {"$lte": "2024-01-01"}}, [("nextCheckAt", ASCENDING)]),
+    ("payments", {"userId": "000000000000000000000000", "status": "approved",
+                  "type": {"$in": ["test", "paid_test", "premium_test"]}}, None),
+    ("payments", {"registrationId": "000000000000000000000000"}, None),
+    ("transactions", {"order_id": "ORDER-1"}, None),
+    ("webhook_events", {"status": "queued", "nextAttemptAt": {"$lte": "2024-01-01"}}, [("nextAttemptAt", ASCENDING)]),
+    ("webhook_events", {"status": "processing", "leaseUntil": {"$lt": "2024-01-01"}}, None),
+    ("referral_transactions", {"referrerId": "000000000000000000000000",
+                               "referredId": "000000000000000000000001",
+                               "status": "pending"}, None),
+    ("wallets", {"userId": "000000000000000000000000"}, None),
+    ("wallet_ledger", {"userId": "000000000000000000000000", "seq": {"$gt": 100}}, None),
+    ("wallet_ledger", {"userId": "000000000000000000000000"}, [("seq", DESCENDING)]),
+    ("wallet_ledger", {"type": "topup", "refId": "TOPUP-00000000-0"}, None),
+    ("wallet_snapshots", {"userId": "000000000000000000000000"}, [("seq", DESCENDING)]),
+    ("wallet_transactions", {"userId": "000000000000000000000000"}, [("createdAt", DESCENDING)]),
+    ("wallet_transactions", {"orderId": "TOPUP-00000000-0"}, None),
+    ("wallet_transactions", {"status": "pending", "type": "topup", "paymentMethod": "qris",
+                             "nextCheckAt": {"$lte": "2024-01-01"}}, [("nextCheckAt", ASCENDING)]),
+    ("pageviews", {"timestamp": {"$gte": "2024-01-01"}}, None),
+    ("online_users", {"sessionId": "sess_1"}, None),
+    ("online_users", {"lastActivity": {"$gte": "2024-01-01"}}, [("lastActivity", DESCENDING)]),
+    ("questions", {"testType": "element_personality", "isPremium": False}, [("order", ASCENDING)]),
+    ("questions", {"testType": "element_personality"}, None),
+    ("personality_descriptions", {"personalityType": "air"}, None),
+    ("test_results", {"userEmail": "user@example.com", "testType": "free"}, None),
+    ("test_results", {"userEmail": "user@example.com", "result": {"$exists": True}}, [("completedAt", DESCENDING)]),
+    ("test_results", {"userId": "000000000000000000000000", "testType": "free"}, None),
+    ("test_results", {"testType": "introvert_extrovert"}, None),
+    ("user_test_answers", {"userId": "000000000000000000000000", "testType": "free"}, None),
+    ("ai_analyses", {"userId": "000000000000000000000000"}, [("createdAt", DESCENDING)]),
+    ("ai_analyses", {"userId": "000000000000000000000000", "testType": "free"}, None),
+    ("issued_certificates", {"certificateNumber": "NMC-2024-000001"}, None),
+    ("articles", {"slug": "judul-artikel"}, None),
+    ("articles", {}, [("publishedAt", DESCENDING)]),
+    ("hero_slides", {"isActive": True}, [("order", ASCENDING)]),
+    ("website_products", {"isActive": True}, [("order", ASCENDING)]),
+    ("website_testimonials", {"isActive": True}, [("order", ASCENDING)]),
+    ("website_activities", {"isActive": True}, [("order", ASCENDING)]),
+    ("section_images", {"sectionName": "about-main"}, None),
+    ("registrations", {"email": "user@example.com"}, None),
+]
+
+
+async def apply_indexes(db) -> dict:
+    """Create every registered index. Safe to call on each startup."""
+    created = {}
+    for collection, models in INDEXES.items():
+        try:
+            created[collection] = await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            # An index with the same keys but different options already exists;
+            # leave it alone rather than failing startup.
+            logger.warning(f"Could not create indexes on {collection}: {str(e)}")
+    return created
+
+
+def _winning_stages(plan: dict) -> list:
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += _winning_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _winning_stages(child)
+    return stages
+
+
+async def find_collscans(db, shapes=QUERY_SHAPES) -> list:
+    """
+    Run explain() for each query shape and return the ones whose winning
+    plan contains a COLLSCAN stage.
+    """
+    offenders = []
+    for collection, query, sort in shapes:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        winning_plan = explain["queryPlanner"]["winningPlan"]
+        # Newer servers nest the classic plan under "queryPlan"
+        winning_plan = winning_plan.get("queryPlan", winning_plan)
+        if "COLLSCAN" in _winning_stages(winning_plan):
+            offenders.append((collection, query, sort))
+    return offenders
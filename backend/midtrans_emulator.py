@@ -0,0 +1,278 @@
+"""
+Local Midtrans emulator for offline payment testing and benchmarks.
+
+Serves the parts of the Midtrans API the backend calls:
+
+    POST /snap/v1/transactions     Snap create_transaction
+    POST /v2/charge                Core API charge (payment_type qris)
+    GET  /v2/{order_id}/status     transaction status
+
+and, like Midtrans, POSTs a signed notification to --notify-url whenever an
+order changes status, retrying with backoff until it gets a 2xx.
+
+Payments are completed through the emulator's own controls:
+
+    POST /emulator/orders/{order_id}/pay   {"status": "settlement"}  (or expire / deny / cancel)
+    GET  /emulator/stats
+
+or automatically --auto-pay seconds after an order is created. Every API
+call waits --latency seconds (+/- 50%) and fails with a 500 at
+--failure-rate; --duplicate-rate sends notifications twice.
+
+Point the backend at it through the usual settings:
+
+    MIDTRANS_SERVER_KEY=SB-Mid-server-local
+    MIDTRANS_API_URL=http://localhost:8900
+    MIDTRANS_SNAP_URL=http://localhost:8900/snap/v1
+
+    python midtrans_emulator.py --port 8900 --server-key SB-Mid-server-local \\
+        --notify-url http://localhost:8001/api/webhooks/midtrans --latency 0.2
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger("midtrans_emulator")
+
+STATUS_CODES = {"pending": "201", "settlement": "200", "capture": "200",
+                "expire": "407", "deny": "202", "cancel": "200"}
+
+
+def _error(status_code: int, message: str) -> JSONResponse:
+    return JSONResponse(
+        {"status_code": str(status_code), "status_message": message, "error_messages": [message]},
+        status_code=status_code
+    )
+
+
+class MidtransEmulator:
+    def __init__(self, server_key: str, notify_url: str = None, latency: float = 0.0,
+                 failure_rate: float = 0.0, duplicate_rate: float = 0.0, auto_pay: float = None,
+                 notify_retries: int = 5, notify_transport=None):
+        self.server_key = server_key
+        self.notify_url = notify_url
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.duplicate_rate = duplicate_rate
+        self.auto_pay = auto_pay
+        self.notify_retries = notify_retries
+        self.notify_transport = notify_transport
+        self.orders = {}
+        self.stats = {"requests": 0, "injectedFailures": 0, "created": 0, "paid": 0,
+                      "notificationsSent": 0, "notificationsFailed": 0}
+        self._http = None
+        self._tasks = set()
+        self.app = self._create_app()
+
+    # ----- helpers -----
+
+    def _authorized(self, request: Request) -> bool:
+        expected = base64.b64encode(f"{self.server_key}:".encode()).decode()
+        return request.headers.get("authorization") == f"Basic {expected}"
+
+    async def _simulate(self):
+        """Latency and failure injection; returns an error response or None."""
+        self.stats["requests"] += 1
+        if self.latency:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.stats["injectedFailures"] += 1
+            return _error(500, "Emulated Midtrans failure")
+        return None
+
+    def _new_order(self, order_id: str, gross_amount, payment_type: str) -> dict:
+        now = datetime.now()
+        order = {
+            "status_code": "201",
+            "status_message": "Success, transaction is found",
+            "transaction_id": str(uuid.uuid4()),
+            "order_id": order_id,
+            "merchant_id": "G000000000",
+            "gross_amount": f"{float(gross_amount):.2f}",
+            "currency": "IDR",
+            "payment_type": payment_type,
+            "transaction_time": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "expiry_time": (now + timedelta(minutes=15)).strftime("%Y-%m-%d %H:%M:%S"),
+            "transaction_status": "pending",
+            "fraud_status": "accept",
+        }
+        self.orders[order_id] = order
+        self.stats["created"] += 1
+        if self.auto_pay is not None:
+            self._spawn(self._pay_later(order_id, self.auto_pay))
+        return order
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _pay_later(self, order_id: str, delay: float):
+        await asyncio.sleep(delay)
+        self.pay(order_id)
+
+    def notification_for(self, order_id: str) -> dict:
+        """The signed notification body Midtrans would send for the order's current state."""
+        order = self.orders[order_id]
+        raw = f"{order_id}{order['status_code']}{order['gross_amount']}{self.server_key}"
+        return {**order, "signature_key": hashlib.sha512(raw.encode()).hexdigest()}
+
+    def pay(self, order_id: str, status: str = "settlement") -> dict:
+        """Move an order to `status` and send its notification. Returns the notification."""
+        order = self.orders[order_id]
+        order.update(transaction_status=status, status_code=STATUS_CODES.get(status, "200"))
+        if status in ("settlement", "capture"):
+            order["settlement_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.stats["paid"] += 1
+        notification = self.notification_for(order_id)
+        if self.notify_url:
+            self._spawn(self._notify(notification))
+            if self.duplicate_rate and random.random() < self.duplicate_rate:
+                self._spawn(self._notify(notification))
+        return notification
+
+    async def _notify(self, notification: dict):
+        import httpx
+
+        if self._http is None:
+            self._http = httpx.AsyncClient(transport=self.notify_transport, timeout=10.0)
+        for attempt in range(self.notify_retries + 1):
+            try:
+                response = await self._http.post(self.notify_url, json=notification)
+                if response.status_code < 300:
+                    self.stats["notificationsSent"] += 1
+                    return
+                logger.warning(f"Notification for {notification['order_id']} got {response.status_code}")
+            except httpx.HTTPError as e:
+                logger.warning(f"Notification for {notification['order_id']} failed: {str(e)}")
+            await asyncio.sleep(0.5 * 2 ** attempt)
+        self.stats["notificationsFailed"] += 1
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    # ----- API -----
+
+    def _create_app(self) -> FastAPI:
+        app = FastAPI(title="Midtrans emulator")
+
+        @app.post("/snap/v1/transactions")
+        async def create_snap_transaction(request: Request):
+            if not self._authorized(request):
+                return _error(401, "Access denied due to unauthorized transaction, please check client or server key")
+            failure = await self._simulate()
+            if failure:
+                return failure
+            param = await request.json()
+            details = param.get("transaction_details", {})
+            order_id = details.get("order_id")
+            if not order_id or details.get("gross_amount") is None:
+                return _error(400, "transaction_details.order_id and gross_amount are required")
+            if order_id in self.orders:
+                return _error(400, "transaction_details.order_id sudah digunakan")
+            self._new_order(order_id, details["gross_amount"], "qris")
+            token = uuid.uuid4().hex
+            return JSONResponse({
+                "token": token,
+                "redirect_url": f"{str(request.base_url).rstrip('/')}/snap/v2/vtweb/{token}"
+            }, status_code=201)
+
+        @app.post("/v2/charge")
+        async def charge(request: Request):
+            if not self._authorized(request):
+                return _error(401, "Access denied due to unauthorized transaction, please check client or server key")
+            failure = await self._simulate()
+            if failure:
+                return failure
+            payload = await request.json()
+            details = payload.get("transaction_details", {})
+            order_id = details.get("order_id")
+            if payload.get("payment_type") != "qris":
+                return _error(400, "Emulator only supports payment_type qris")
+            if not order_id or details.get("gross_amount") is None:
+                return _error(400, "transaction_details.order_id and gross_amount are required")
+            if order_id in self.orders:
+                return _error(406, "The request could not be processed due to duplicate order_id")
+            order = self._new_order(order_id, details["gross_amount"], "qris")
+            base_url = str(request.base_url).rstrip("/")
+            return {
+                **order,
+                "status_message": "QRIS transaction is created",
+                "acquirer": payload.get("qris", {}).get("acquirer", "gopay"),
+                "qr_string": f"00020101021226EMULATOR{order['transaction_id'].replace('-', '')}5303360",
+                "actions": [{
+                    "name": "generate-qr-code",
+                    "method": "GET",
+                    "url": f"{base_url}/v2/qris/{order['transaction_id']}/qr-code"
+                }]
+            }
+
+        @app.get("/v2/{order_id}/status")
+        async def get_status(order_id: str, request: Request):
+            if not self._authorized(request):
+                return _error(401, "Access denied due to unauthorized transaction, please check client or server key")
+            failure = await self._simulate()
+            if failure:
+                return failure
+            order = self.orders.get(order_id)
+            if order is None:
+                return _error(404, "Transaction doesn't exist.")
+            return order
+
+        @app.post("/emulator/orders/{order_id}/pay")
+        async def pay_order(order_id: str, request: Request):
+            if order_id not in self.orders:
+                return _error(404, "Transaction doesn't exist.")
+            body = await request.json() if await request.body() else {}
+            return self.pay(order_id, body.get("status", "settlement"))
+
+        @app.get("/emulator/stats")
+        async def get_stats():
+            return {**self.stats, "orders": len(self.orders)}
+
+        @app.on_event("shutdown")
+        async def shutdown():
+            await self.close()
+
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Midtrans emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--server-key", default="SB-Mid-server-local")
+    parser.add_argument("--notify-url", help="backend notification URL, e.g. http://localhost:8001/api/webhooks/midtrans")
+    parser.add_argument("--latency", type=float, default=0.0, help="mean API latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of API calls answered with 500")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="fraction of notifications sent twice")
+    parser.add_argument("--auto-pay", type=float, help="settle every order this many seconds after creation")
+    args = parser.parse_args()
+
+    import uvicorn
+    logging.basicConfig(level=logging.INFO)
+    emulator = MidtransEmulator(
+        server_key=args.server_key,
+        notify_url=args.notify_url,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        duplicate_rate=args.duplicate_rate,
+        auto_pay=args.auto_pay
+    )
+    uvicorn.run(emulator.app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
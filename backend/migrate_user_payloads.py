@@ -0,0 +1,117 @@
+"""
+Script untuk memindahkan payload besar dari dokumen users:
+- freeTestAnswers / paidTestAnswers -> user_test_answers ({userId, testType, answers})
+- lastAnalysis -> ai_analyses (hanya jika user belum punya analisis di sana)
+
+Aman dijalankan ulang: data disalin dulu, baru field di users di-$unset.
+
+    python migrate_user_payloads.py [--dry-run]
+"""
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from utils.cache_versions import USERS, bump
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url)
+db = client[os.environ['DB_NAME']]
+
+BULKY_FIELDS = ["freeTestAnswers", "paidTestAnswers", "lastAnalysis"]
+BATCH_SIZE = 500
+
+
+async def flush(answer_ops, user_ops):
+    if answer_ops:
+        await db.user_test_answers.bulk_write(answer_ops, ordered=False)
+    if user_ops:
+        await db.users.bulk_write(user_ops, ordered=False)
+
+
+async def migrate_user_payloads(dry_run: bool = False):
+    """Move bulky payloads out of the users collection"""
+    moved = {"answers": 0, "analyses": 0, "users": 0}
+    try:
+        print("🚚 Starting user payload migration..." + (" (dry run)" if dry_run else ""))
+
+        query = {"$or": [{field: {"$exists": True}} for field in BULKY_FIELDS]}
+        projection = {
+            "email": 1, "fullName": 1, "lastAnalysisDate": 1,
+            "freeTestCompletedAt": 1, "paidTestCompletedAt": 1,
+            **{field: 1 for field in BULKY_FIELDS}
+        }
+
+        answer_ops, user_ops = [], []
+        async for user in db.users.find(query, projection):
+            user_id = str(user["_id"])
+            now = datetime.utcnow()
+
+            for test_type in ("free", "paid"):
+                answers = user.get(f"{test_type}TestAnswers")
+                if answers is None:
+                    continue
+                moved["answers"] += 1
+                answer_ops.append(UpdateOne(
+                    {"userId": user_id, "testType": test_type},
+                    {"$set": {
+                        "answers": answers,
+                        "completedAt": user.get(f"{test_type}TestCompletedAt"),
+                        "migratedAt": now
+                    }},
+                    upsert=True
+                ))
+
+            analysis = user.get("lastAnalysis")
+            if analysis is not None:
+                existing = await db.ai_analyses.find_one({"userId": user_id}, {"_id": 1})
+                if existing is None:
+                    moved["analyses"] += 1
+                    if not dry_run:
+                        await db.ai_analyses.insert_one({
+                            "userId": user_id,
+                            "userEmail": user.get("email"),
+                            "userName": user.get("fullName"),
+                            "aiAnalysis": analysis,
+                            "createdAt": user.get("lastAnalysisDate") or now,
+                            "migratedFromUser": True
+                        })
+
+            moved["users"] += 1
+            user_ops.append(UpdateOne(
+                {"_id": user["_id"]},
+                {"$unset": {field: "" for field in BULKY_FIELDS}}
+            ))
+
+            if len(user_ops) >= BATCH_SIZE:
+                if not dry_run:
+                    await flush(answer_ops, user_ops)
+                answer_ops, user_ops = [], []
+                print(f"  ... {moved['users']} users processed")
+
+        if not dry_run:
+            await flush(answer_ops, user_ops)
+
+        print(f"\n✅ Users slimmed: {moved['users']}")
+        print(f"✅ Answer sets moved to user_test_answers: {moved['answers']}")
+        print(f"✅ Analyses copied to ai_analyses: {moved['analyses']}")
+
+    except Exception as e:
+        print(f"❌ Error migrating user payloads: {str(e)}")
+        raise
+    else:
+        # Cached user records in running API workers are rebuilt
+        if not dry_run:
+            await bump(USERS, db)
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate_user_payloads(dry_run="--dry-run" in sys.argv))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
 from utils.objectid import PyObjectId
@@ -32,4 +32,13 @@ class OnlineUser(BaseModel):
         populate_by_name=True,
         arbitrary_types_allowed=True,
         json_encoders={ObjectId: str}
-    )
\ No newline at end of file
+    )
+
+class BeaconEvent(BaseModel):
+    page: str = Field(min_length=1, max_length=500)
+    referrer: Optional[str] = Field(default=None, max_length=1000)
+    timestamp: Optional[int] = None  # client time, epoch milliseconds
+
+class PageviewBeacon(BaseModel):
+    sessionId: str = Field(min_length=1, max_length=100)
+    events: List[BeaconEvent] = Field(min_length=1, max_length=50)
@@ -85,11 +85,10 @@ class User(BaseModel):
     # Test related
     freeTestStatus: str = "not_started"  # not_started, in_progress, completed
     freeTestCompletedAt: Optional[datetime] = None
-    freeTestAnswers: Optional[dict] = None
     
     paidTestStatus: str = "not_started"  # not_started, pending_payment, paid, in_progress, completed
     paidTestCompletedAt: Optional[datetime] = None
-    paidTestAnswers: Optional[dict] = None
+    # Answers live in user_test_answers, AI analyses in ai_analyses
     
     paymentStatus: str = "unpaid"  # unpaid, pending, approved, rejected
     paymentMethod: Optional[str] = None
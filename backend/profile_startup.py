@@ -0,0 +1,83 @@
+"""
+Startup import profiler.
+
+Imports each router in a fresh interpreter, after the modules every router
+shares (FastAPI, Motor, database), so the number reported is what that router
+adds to a cold worker. The heaviest third-party modules it pulls in are
+listed from `python -X importtime`.
+
+Usage:
+    python profile_startup.py            # all routers
+    python profile_startup.py auth wallet
+    python profile_startup.py --server   # full `import server`
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+
+BASELINE = "import fastapi, pydantic, motor.motor_asyncio, database"
+
+SNIPPET = """
+import sys, time
+{baseline}
+started = time.perf_counter()
+import {module}
+print("ELAPSED", (time.perf_counter() - started) * 1000, file=sys.stderr)
+"""
+
+
+def profile(module: str, top: int) -> tuple:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET.format(baseline=BASELINE, module=module)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    elapsed = None
+    heavy = []
+    # importtime lines look like "import time:  self | cumulative | <indent>name";
+    # lines printed before the router import belong to the baseline.
+    seen_baseline = False
+    for line in result.stderr.splitlines():
+        if line.startswith("ELAPSED"):
+            elapsed = float(line.split()[1])
+        elif line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if name.strip() == "database":
+                seen_baseline = True
+                continue
+            if not seen_baseline or not cumulative.strip().isdigit():
+                continue
+            depth = (len(name) - len(name.lstrip())) // 2
+            if depth == 1 and not name.strip().startswith(("routes", "models", "utils")):
+                heavy.append((name.strip(), int(cumulative) / 1000))
+    if elapsed is None:
+        raise RuntimeError(f"Failed to import {module}:\n{result.stderr[-2000:]}")
+    heavy.sort(key=lambda item: item[1], reverse=True)
+    return elapsed, heavy[:top]
+
+
+def main(argv):
+    sys.path.insert(0, str(ROOT_DIR))
+    if "--server" in argv:
+        modules = ["server"]
+    else:
+        from server import ROUTER_MODULES
+        names = [a for a in argv if not a.startswith("--")] or ROUTER_MODULES
+        modules = [f"routes.{name}" for name in names]
+
+    rows = [(module, *profile(module, top=3)) for module in modules]
+    rows.sort(key=lambda row: row[1], reverse=True)
+
+    print(f"{'module':<28}{'ms':>9}  heaviest imports")
+    for module, elapsed, heavy in rows:
+        details = ", ".join(f"{name} {ms:.0f}ms" for name, ms in heavy)
+        print(f"{module:<28}{elapsed:>9.1f}  {details}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
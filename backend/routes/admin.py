@@ -2,32 +2,53 @@ from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import List, Optional
 from models.admin import AdminCreate, AdminLogin, Admin, AdminResponse, Token
-from database import get_db
+from database import get_db, pool_stats
+from utils.responses import BSONRoute
+from utils.fork import after_fork
+from utils.mongo_profiler import route_stats
+from utils.write_behind import queue_stats
+from utils.user_cache import cache_stats
+from utils.password_pool import password_pool
+from utils.midtrans_client import get_midtrans_client
+from utils.payment_reconciler import payment_reconciler
+from utils.webhook_events import webhook_processor
 import os
 from datetime import datetime, timedelta
 from bson import ObjectId
-from passlib.context import CryptContext
 import jwt
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], route_class=BSONRoute)
 security = HTTPBearer()
 
 # Get database instance
 db = get_db()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing - passlib is imported on the first login, not at startup
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+@after_fork
+def _reset_pwd_context():
+    global _pwd_context
+    _pwd_context = None
 
 # JWT settings
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
+# bcrypt is CPU-bound: handlers call these through password_pool.run()
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -64,7 +85,7 @@ async def register_admin(admin: AdminCreate):
             raise HTTPException(status_code=400, detail="Admin dengan email ini sudah terdaftar")
         
         # Hash password
-        hashed_password = hash_password(admin.password)
+        hashed_password = await password_pool.run(hash_password, admin.password)
         
         admin_dict = {
             "username": admin.username,
@@ -99,7 +120,7 @@ async def login_admin(credentials: AdminLogin):
             raise HTTPException(status_code=401, detail="Email atau password salah")
         
         # Verify password
-        if not verify_password(credentials.password, admin["password"]):
+        if not await password_pool.run(verify_password, credentials.password, admin["password"]):
             raise HTTPException(status_code=401, detail="Email atau password salah")
         
         # Update last login
@@ -144,17 +165,11 @@ async def get_dashboard_stats(token_data: dict = Depends(verify_token)):
             {}, 
             {"name": 1, "email": 1, "testStatus": 1, "registrationDate": 1}
         ).sort("registrationDate", -1).limit(5).to_list(5)
-        for reg in recent_registrations:
-            reg["_id"] = str(reg["_id"])
-        
         # Get recent contacts (optimized with projections)
         recent_contacts = await db.contacts.find(
             {}, 
             {"name": 1, "email": 1, "message": 1, "status": 1, "submittedAt": 1}
         ).sort("submittedAt", -1).limit(5).to_list(5)
-        for contact in recent_contacts:
-            contact["_id"] = str(contact["_id"])
-        
         return {
             "registrations": {
                 "total": total_registrations,
@@ -208,8 +223,6 @@ async def get_all_admins(token_data: dict = Depends(verify_token)):
             raise HTTPException(status_code=403, detail="Hanya superadmin yang dapat mengakses")
         
         admins = await db.admin_users.find({}, {"password": 0}).to_list(100)
-        for admin in admins:
-            admin["_id"] = str(admin["_id"])
         return admins
     except HTTPException:
         raise
@@ -231,7 +244,7 @@ async def create_admin_user(admin: AdminCreate, token_data: dict = Depends(verif
             raise HTTPException(status_code=400, detail="Email sudah terdaftar")
         
         # Hash password
-        hashed_password = hash_password(admin.password)
+        hashed_password = await password_pool.run(hash_password, admin.password)
         
         admin_dict = {
             "username": admin.username,
@@ -283,7 +296,7 @@ async def change_admin_password(admin_id: str, password_data: dict, token_data:
             raise HTTPException(status_code=400, detail="Password minimal 6 karakter")
         
         # Hash and update password
-        hashed_password = hash_password(new_password)
+        hashed_password = await password_pool.run(hash_password, new_password)
         await db.admin_users.update_one(
             {"_id": ObjectId(admin_id)},
             {"$set": {"password": hashed_password, "updatedAt": datetime.utcnow()}}
@@ -324,4 +337,37 @@ async def delete_admin_user(admin_id: str, token_data: dict = Depends(verify_tok
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+# ========== Performance ==========
+
+@router.get("/perf", response_model=dict)
+async def get_perf_summary(
+    top: int = 20,
+    sortBy: str = "commands",
+    token_data: dict = Depends(verify_token)
+):
+    """
+    Per-route MongoDB command statistics for this worker (admin only)
+    sortBy: commands, commandsPerRequest, mongoMs, avgMongoMs, slowestCommandMs
+    """
+    return {
+        "since": datetime.utcfromtimestamp(route_stats.since).isoformat(),
+        "pid": os.getpid(),
+        "routes": route_stats.summary(top=top, sort_by=sortBy),
+        "pool": pool_stats.snapshot(),
+        "writeBehind": queue_stats(),
+        "userCache": cache_stats(),
+        "passwordPool": password_pool.stats(),
+        "midtrans": get_midtrans_client().stats(),
+        "paymentReconciler": payment_reconciler.stats(),
+        "webhooks": webhook_processor.stats()
+    }
+
+@router.delete("/perf", response_model=dict)
+async def reset_perf_summary(token_data: dict = Depends(verify_token)):
+    """
+    Reset per-route statistics for this worker (admin only)
+    """
+    route_stats.reset()
+    return {"success": True, "message": "Statistik performa direset"}
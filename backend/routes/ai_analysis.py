@@ -2,13 +2,15 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Optional, Dict
 from pydantic import BaseModel
 from database import get_db
+from utils.responses import BSONRoute
+from utils.user_cache import invalidate_user
 from routes.auth import get_current_user
 from datetime import datetime
 import os
 import logging
 import uuid
 
-router = APIRouter(prefix="/api/ai-analysis", tags=["ai-analysis"])
+router = APIRouter(prefix="/api/ai-analysis", tags=["ai-analysis"], route_class=BSONRoute)
 db = get_db()
 logger = logging.getLogger(__name__)
 
@@ -200,15 +202,16 @@ Penting: Jawab dalam format JSON yang valid seperti yang diminta di system messa
         
         await db.ai_analyses.insert_one(analysis_doc)
         
-        # Update user with latest analysis
+        # The analysis itself stays in ai_analyses; the user document only
+        # records when and which test was analysed
         await db.users.update_one(
             {"_id": current_user["_id"]},
             {"$set": {
-                "lastAnalysis": ai_result,
                 "lastAnalysisDate": datetime.utcnow(),
                 f"{request.testType}TestStatus": "completed"
             }}
         )
+        await invalidate_user(current_user["_id"])
         
         return {
             "success": True,
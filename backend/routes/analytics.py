@@ -1,14 +1,55 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
-from models.analytics import PageView, OnlineUser
+from models.analytics import PageView, OnlineUser, PageviewBeacon
+from pydantic import ValidationError
 from database import get_db
+from utils.responses import BSONRoute
 from datetime import datetime, timedelta
 from bson import ObjectId
 from routes.admin import verify_token
+from utils.write_behind import CoalescingUpsertQueue, WriteBehindQueue
+import time
 import uuid
 
-router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+router = APIRouter(prefix="/api/analytics", tags=["analytics"], route_class=BSONRoute)
 db = get_db()
 
+# Page views and presence are written in the background (utils/write_behind.py):
+# pageviews with one insert_many per flush, online_users with one bulk_write
+# of per-session upserts, so a visitor clicking through pages between two
+# flushes costs one presence write.
+pageview_queue = WriteBehindQueue("pageviews", flush_interval=1.0)
+presence_queue = CoalescingUpsertQueue("online_users", key="sessionId", flush_interval=1.0, max_pending=20000)
+
+
+async def ingest_pageviews(session_id: str, events: list, request: Request) -> bool:
+    """
+    Queue page views of one session, as (page, referrer, timestamp) tuples,
+    and a single presence update for the latest one. False when the buffers
+    stay full.
+    """
+    user_agent = request.headers.get("user-agent")
+    ip_address = request.client.host
+    for page, referrer, timestamp in events:
+        queued = await pageview_queue.put_wait({
+            "page": page,
+            "referrer": referrer,
+            "userAgent": user_agent,
+            "ipAddress": ip_address,
+            "sessionId": session_id,
+            "timestamp": timestamp
+        })
+        if not queued:
+            return False
+    page, _, timestamp = max(events, key=lambda event: event[2])
+    return await presence_queue.put_wait({
+        "sessionId": session_id,
+        "ipAddress": ip_address,
+        "userAgent": user_agent,
+        "lastActivity": timestamp,
+        "currentPage": page
+    })
+
+
 @router.post("/pageview")
 async def track_pageview(request: Request, page: str, sessionId: str = None):
     """
@@ -18,30 +59,56 @@ async def track_pageview(request: Request, page: str, sessionId: str = None):
         if not sessionId:
             sessionId = str(uuid.uuid4())
         
-        pageview_data = {
-            "page": page,
-            "referrer": request.headers.get("referer"),
-            "userAgent": request.headers.get("user-agent"),
-            "ipAddress": request.client.host,
-            "sessionId": sessionId,
-            "timestamp": datetime.utcnow()
-        }
-        
-        await db.pageviews.insert_one(pageview_data)
-        
-        # Update or create online user
-        await db.online_users.update_one(
-            {"sessionId": sessionId},
-            {"$set": {
-                "ipAddress": request.client.host,
-                "userAgent": request.headers.get("user-agent"),
-                "lastActivity": datetime.utcnow(),
-                "currentPage": page
-            }},
-            upsert=True
-        )
+        events = [(page, request.headers.get("referer"), datetime.utcnow())]
+        if not await ingest_pageviews(sessionId, events, request):
+            raise HTTPException(
+                status_code=503,
+                detail="Analytics sedang sibuk, coba lagi nanti",
+                headers={"Retry-After": "5"}
+            )
         
         return {"success": True, "sessionId": sessionId}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+# Client clocks are only trusted within this window
+BEACON_MAX_AGE_MS = 60 * 60 * 1000
+
+@router.post("/beacon")
+async def track_beacon(request: Request):
+    """
+    Track a batch of page views from one session, e.g. sent with
+    navigator.sendBeacon: {"sessionId": ..., "events": [{"page", "referrer",
+    "timestamp"}]}. The body is parsed as JSON whatever the content type,
+    since sendBeacon posts strings as text/plain.
+    """
+    try:
+        try:
+            beacon = PageviewBeacon.model_validate_json(await request.body())
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False, include_input=False))
+        
+        now = datetime.utcnow()
+        now_ms = int(time.time() * 1000)
+        events = []
+        for event in beacon.events:
+            timestamp = now
+            if event.timestamp is not None and 0 <= now_ms - event.timestamp <= BEACON_MAX_AGE_MS:
+                timestamp = now - timedelta(milliseconds=now_ms - event.timestamp)
+            events.append((event.page, event.referrer or request.headers.get("referer"), timestamp))
+        
+        if not await ingest_pageviews(beacon.sessionId, events, request):
+            raise HTTPException(
+                status_code=503,
+                detail="Analytics sedang sibuk, coba lagi nanti",
+                headers={"Retry-After": "5"}
+            )
+        
+        return {"success": True, "sessionId": beacon.sessionId, "accepted": len(events)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -129,9 +196,6 @@ async def get_online_users(token_data: dict = Depends(verify_token)):
         
         online_users = await cursor.to_list(100)
         
-        for user in online_users:
-            user["_id"] = str(user["_id"])
-        
         return {
             "count": len(online_users),
             "users": online_users
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
 from typing import List, Optional
 from database import get_db
+from utils.responses import BSONRoute
+from utils.cache_versions import ARTICLES, bump
+from utils.uploads import ensure_dir
 from datetime import datetime
 from bson import ObjectId
 from routes.admin import verify_token
@@ -9,11 +12,10 @@ import uuid
 import re
 from pathlib import Path
 
-router = APIRouter(prefix="/api/articles", tags=["articles"])
+router = APIRouter(prefix="/api/articles", tags=["articles"], route_class=BSONRoute)
 db = get_db()
 
 UPLOAD_DIR = Path("uploads/articles")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 def create_slug(title: str) -> str:
     """Create URL-friendly slug from title"""
@@ -49,9 +51,6 @@ async def get_articles(
         cursor = db.articles.find(query).skip(skip).limit(limit).sort("publishedAt", -1)
         articles = await cursor.to_list(length=limit)
         
-        for article in articles:
-            article["_id"] = str(article["_id"])
-        
         return articles
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -83,10 +82,6 @@ async def get_article(article_id: str):
             {"$inc": {"views": 1}}
         )
         
-        # Convert _id to string if it's ObjectId
-        if isinstance(article["_id"], ObjectId):
-            article["_id"] = str(article["_id"])
-        
         return article
     except HTTPException:
         raise
@@ -137,7 +132,7 @@ async def create_article(
                 raise HTTPException(status_code=400, detail="Format file tidak didukung")
             
             filename = f"{uuid.uuid4().hex}{ext}"
-            file_path = UPLOAD_DIR / filename
+            file_path = ensure_dir(UPLOAD_DIR) / filename
             
             with open(file_path, "wb") as f:
                 content_bytes = await file.read()
@@ -147,6 +142,7 @@ async def create_article(
         
         result = await db.articles.insert_one(article_doc)
         
+        await bump(ARTICLES)
         return {
             "success": True,
             "articleId": str(result.inserted_id),
@@ -202,7 +198,7 @@ async def update_article(
                 raise HTTPException(status_code=400, detail="Format file tidak didukung")
             
             filename = f"{uuid.uuid4().hex}{ext}"
-            file_path = UPLOAD_DIR / filename
+            file_path = ensure_dir(UPLOAD_DIR) / filename
             
             with open(file_path, "wb") as f:
                 content_bytes = await file.read()
@@ -218,6 +214,7 @@ async def update_article(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Artikel tidak ditemukan")
         
+        await bump(ARTICLES)
         return {"success": True, "message": "Artikel berhasil diupdate"}
     except HTTPException:
         raise
@@ -248,6 +245,7 @@ async def delete_article(
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Artikel tidak ditemukan")
         
+        await bump(ARTICLES)
         return {"success": True, "message": "Artikel berhasil dihapus"}
     except HTTPException:
         raise
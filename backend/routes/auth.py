@@ -2,6 +2,9 @@ from fastapi import APIRouter, HTTPException, Request, Depends
 from typing import Optional
 from models.user import UserCreate, UserLogin, UserUpdate, UserResponse, PasswordChange
 from database import get_db
+from utils.responses import BSONRoute
+from utils.user_cache import BULKY_FIELDS, get_cached_user, invalidate_user
+from utils.password_pool import password_pool
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 import bcrypt
@@ -10,7 +13,7 @@ import os
 import uuid
 from pathlib import Path
 
-router = APIRouter(prefix="/api/auth", tags=["auth"])
+router = APIRouter(prefix="/api/auth", tags=["auth"], route_class=BSONRoute)
 db = get_db()
 
 JWT_SECRET = os.environ.get("JWT_SECRET_KEY", "default_secret_key")
@@ -23,6 +26,7 @@ def generate_referral_code(name: str) -> str:
     suffix = uuid.uuid4().hex[:6].upper()
     return f"{prefix}{suffix}"
 
+# bcrypt is CPU-bound: handlers call these through password_pool.run()
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
@@ -47,7 +51,8 @@ async def get_current_user(request: Request):
     token = auth_header.split(" ")[1]
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user = await db.users.find_one({"_id": ObjectId(payload["sub"])})
+        # Slim projection, cached per worker (utils/user_cache.py)
+        user = await get_cached_user(payload["sub"])
         if not user:
             raise HTTPException(status_code=401, detail="User tidak ditemukan")
         if user.get("isBanned"):
@@ -58,6 +63,16 @@ async def get_current_user(request: Request):
     except Exception:
         raise HTTPException(status_code=401, detail="Token tidak valid")
 
+def get_optional_token(request: Request) -> Optional[dict]:
+    """Payload of a valid user bearer token, or None. No database lookup."""
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    try:
+        return jwt.decode(auth_header.split(" ")[1], JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+
 @router.post("/register", response_model=dict)
 async def register_user(user_data: UserCreate, request: Request):
     """
@@ -65,12 +80,12 @@ async def register_user(user_data: UserCreate, request: Request):
     """
     try:
         # Check if email exists
-        existing = await db.users.find_one({"email": user_data.email})
+        existing = await db.users.find_one({"email": user_data.email}, {"_id": 1})
         if existing:
             raise HTTPException(status_code=400, detail="Email sudah terdaftar")
         
         # Hash password
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await password_pool.run(hash_password, user_data.password)
         
         # Generate unique referral code for this user
         my_referral_code = generate_referral_code(user_data.fullName)
@@ -78,7 +93,7 @@ async def register_user(user_data: UserCreate, request: Request):
         # Check if referral code used
         referrer_id = None
         if user_data.referralCode:
-            referrer = await db.users.find_one({"myReferralCode": user_data.referralCode})
+            referrer = await db.users.find_one({"myReferralCode": user_data.referralCode}, {"_id": 1})
             if referrer:
                 referrer_id = str(referrer["_id"])
         
@@ -151,6 +166,7 @@ async def register_user(user_data: UserCreate, request: Request):
                 {"_id": ObjectId(referrer_id)},
                 {"$inc": {"referralCount": 1}}
             )
+            await invalidate_user(referrer_id)
         
         # Generate token
         token = create_token(user_id, user_data.email, user_data.userType)
@@ -181,11 +197,11 @@ async def login_user(credentials: UserLogin, request: Request):
     Login user
     """
     try:
-        user = await db.users.find_one({"email": credentials.email})
+        user = await db.users.find_one({"email": credentials.email}, BULKY_FIELDS)
         if not user:
             raise HTTPException(status_code=401, detail="Email atau password salah")
         
-        if not verify_password(credentials.password, user["hashedPassword"]):
+        if not await password_pool.run(verify_password, credentials.password, user["hashedPassword"]):
             raise HTTPException(status_code=401, detail="Email atau password salah")
         
         if not user.get("isActive", True):
@@ -279,6 +295,7 @@ async def update_profile(
             {"_id": current_user["_id"]},
             {"$set": update_data}
         )
+        await invalidate_user(current_user["_id"])
         
         return {"success": True, "message": "Profil berhasil diupdate"}
     except Exception as e:
@@ -293,10 +310,12 @@ async def change_password(
     Change user password
     """
     try:
-        if not verify_password(data.currentPassword, current_user["hashedPassword"]):
+        # current_user is the cached slim record, without the password hash
+        user = await db.users.find_one({"_id": current_user["_id"]}, {"hashedPassword": 1})
+        if not await password_pool.run(verify_password, data.currentPassword, user["hashedPassword"]):
             raise HTTPException(status_code=400, detail="Password lama salah")
         
-        new_hashed = hash_password(data.newPassword)
+        new_hashed = await password_pool.run(hash_password, data.newPassword)
         
         await db.users.update_one(
             {"_id": current_user["_id"]},
@@ -322,6 +341,7 @@ async def get_referral_link(current_user: dict = Depends(get_current_user)):
             {"_id": current_user["_id"]},
             {"$set": {"myReferralCode": referral_code}}
         )
+        await invalidate_user(current_user["_id"])
     
     base_url = os.environ.get("FRONTEND_URL", "https://newmeclass.com")
     
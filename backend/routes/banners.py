@@ -1,18 +1,21 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Form
 from typing import List, Optional
 from database import get_db
+from utils.responses import BSONRoute
+from utils.cache_versions import bump
+from utils.homepage import HOMEPAGE
+from utils.uploads import ensure_dir
 from datetime import datetime
 from bson import ObjectId
 from routes.admin import verify_token
 import uuid
 from pathlib import Path
 
-router = APIRouter(prefix="/api/banners", tags=["banners"])
+router = APIRouter(prefix="/api/banners", tags=["banners"], route_class=BSONRoute)
 db = get_db()
 
 # Upload directory
 UPLOAD_DIR = Path("/app/frontend/public/uploads/banners")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 @router.get("", response_model=List[dict])
 async def get_banners(
@@ -32,9 +35,6 @@ async def get_banners(
         cursor = db.banners.find(query).sort("order", 1)
         banners = await cursor.to_list(100)
         
-        for banner in banners:
-            banner["_id"] = str(banner["_id"])
-        
         return banners
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -52,7 +52,6 @@ async def get_banner(banner_id: str):
         if not banner:
             raise HTTPException(status_code=404, detail="Banner not found")
         
-        banner["_id"] = str(banner["_id"])
         return banner
     except HTTPException:
         raise
@@ -82,7 +81,7 @@ async def create_banner(
         
         # Save file
         unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = UPLOAD_DIR / unique_filename
+        file_path = ensure_dir(UPLOAD_DIR) / unique_filename
         
         contents = await file.read()
         with open(file_path, 'wb') as f:
@@ -102,6 +101,7 @@ async def create_banner(
         
         result = await db.banners.insert_one(banner_data)
         
+        await bump(HOMEPAGE)
         return {
             "success": True,
             "bannerId": str(result.inserted_id),
@@ -155,7 +155,7 @@ async def update_banner(
                 raise HTTPException(status_code=400, detail="File type not allowed")
             
             unique_filename = f"{uuid.uuid4()}.{file_extension}"
-            file_path = UPLOAD_DIR / unique_filename
+            file_path = ensure_dir(UPLOAD_DIR) / unique_filename
             
             contents = await file.read()
             with open(file_path, 'wb') as f:
@@ -173,6 +173,7 @@ async def update_banner(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Banner not found")
         
+        await bump(HOMEPAGE)
         return {"success": True, "message": "Banner updated successfully"}
     except HTTPException:
         raise
@@ -196,6 +197,7 @@ async def delete_banner(
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Banner not found")
         
+        await bump(HOMEPAGE)
         return {"success": True, "message": "Banner deleted successfully"}
     except HTTPException:
         raise
@@ -218,6 +220,7 @@ async def reorder_banners(
                     {"$set": {"order": item["order"]}}
                 )
         
+        await bump(HOMEPAGE)
         return {"success": True, "message": "Banners reordered successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
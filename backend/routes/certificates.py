@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Form
 from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from database import get_db
+from utils.responses import BSONRoute
+from utils.uploads import ensure_dir
 from datetime import datetime
 from bson import ObjectId
 from routes.admin import verify_token
@@ -9,21 +11,11 @@ import uuid
 from pathlib import Path
 from io import BytesIO
 
-# PDF Generation imports
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib import colors
-from reportlab.lib.units import inch, cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
-from reportlab.pdfgen import canvas
-
-router = APIRouter(prefix="/api/certificates", tags=["certificates"])
+router = APIRouter(prefix="/api/certificates", tags=["certificates"], route_class=BSONRoute)
 db = get_db()
 
 # Upload directory
 UPLOAD_DIR = Path("/app/frontend/public/uploads/certificates")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 @router.get("/template", response_model=dict)
 async def get_certificate_template():
@@ -51,7 +43,6 @@ async def get_certificate_template():
             result = await db.certificate_templates.insert_one(default_template)
             template = await db.certificate_templates.find_one({"_id": result.inserted_id})
         
-        template["_id"] = str(template["_id"])
         return template
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -126,7 +117,7 @@ async def upload_certificate_asset(
             raise HTTPException(status_code=400, detail="File type not allowed")
         
         unique_filename = f"cert_{asset_type}_{uuid.uuid4()}.{file_extension}"
-        file_path = UPLOAD_DIR / unique_filename
+        file_path = ensure_dir(UPLOAD_DIR) / unique_filename
         
         contents = await file.read()
         with open(file_path, 'wb') as f:
@@ -167,9 +158,6 @@ async def get_issued_certificates(
         cursor = db.issued_certificates.find().skip(skip).limit(limit).sort("issuedAt", -1)
         certificates = await cursor.to_list(length=limit)
         
-        for cert in certificates:
-            cert["_id"] = str(cert["_id"])
-        
         return certificates
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -244,6 +232,11 @@ def generate_certificate_pdf(certificate: dict, template: dict) -> BytesIO:
     """
     Generate PDF certificate
     """
+    # ReportLab is imported on the first PDF render; it is the heaviest
+    # import in the API and most workers never generate a certificate.
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfgen import canvas
+
     buffer = BytesIO()
     
     # Create landscape A4 PDF
@@ -379,6 +372,10 @@ def generate_ai_certificate_pdf(user: dict, ai_analysis: dict, template: dict) -
     Generate PDF certificate dengan layout seperti template NEWME CLASS
     Termasuk 5 Element, Kepribadian, Kekuatan Jatidiri, dll
     """
+    # Deferred ReportLab imports, as in generate_certificate_pdf
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfgen import canvas
+
     buffer = BytesIO()
     
     page_width, page_height = landscape(A4)
@@ -2,10 +2,11 @@ from fastapi import APIRouter, HTTPException
 from typing import List, Optional
 from models.contact import ContactCreate, Contact, ContactResponse
 from database import get_db
+from utils.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 
-router = APIRouter(prefix="/api/contacts", tags=["contacts"])
+router = APIRouter(prefix="/api/contacts", tags=["contacts"], route_class=BSONRoute)
 
 # Get database instance
 db = get_db()
@@ -49,9 +50,6 @@ async def get_contacts(
         cursor = db.contacts.find(query).skip(skip).limit(limit).sort("submittedAt", -1)
         contacts = await cursor.to_list(length=limit)
         
-        for contact in contacts:
-            contact["_id"] = str(contact["_id"])
-        
         return contacts
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Terjadi kesalahan: {str(e)}")
@@ -69,7 +67,6 @@ async def get_contact(contact_id: str):
         if not contact:
             raise HTTPException(status_code=404, detail="Kontak tidak ditemukan")
         
-        contact["_id"] = str(contact["_id"])
         return contact
     except HTTPException:
         raise
@@ -2,10 +2,11 @@ from fastapi import APIRouter, HTTPException
 from typing import List, Optional
 from models.institution import InstitutionInquiryCreate, InstitutionInquiry
 from database import get_db
+from utils.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 
-router = APIRouter(prefix="/api/institutions", tags=["institutions"])
+router = APIRouter(prefix="/api/institutions", tags=["institutions"], route_class=BSONRoute)
 
 # Get database instance
 db = get_db()
@@ -47,9 +48,6 @@ async def get_institutions(
         cursor = db.institutions.find(query).skip(skip).limit(limit).sort("createdAt", -1)
         institutions = await cursor.to_list(length=limit)
         
-        for inst in institutions:
-            inst["_id"] = str(inst["_id"])
-        
         return institutions
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Terjadi kesalahan: {str(e)}")
@@ -67,7 +65,6 @@ async def get_institution(institution_id: str):
         if not institution:
             raise HTTPException(status_code=404, detail="Institution tidak ditemukan")
         
-        institution["_id"] = str(institution["_id"])
         return institution
     except HTTPException:
         raise
@@ -2,6 +2,9 @@ from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
 from typing import List, Optional
 from models.payment import Payment, PaymentApproval
 from database import get_db
+from utils.responses import BSONRoute
+from utils.uploads import ensure_dir
+from utils.user_cache import invalidate_user
 from datetime import datetime
 from bson import ObjectId
 import os
@@ -9,12 +12,11 @@ import uuid
 from pathlib import Path
 from routes.admin import verify_token
 
-router = APIRouter(prefix="/api/payments", tags=["payments"])
+router = APIRouter(prefix="/api/payments", tags=["payments"], route_class=BSONRoute)
 db = get_db()
 
 # Upload directory
 UPLOAD_DIR = Path("/app/frontend/public/uploads/payments")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
@@ -56,7 +58,7 @@ async def upload_payment_proof(
         # Save file
         file_extension = file.filename.rsplit('.', 1)[1].lower()
         unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = UPLOAD_DIR / unique_filename
+        file_path = ensure_dir(UPLOAD_DIR) / unique_filename
         
         contents = await file.read()
         with open(file_path, 'wb') as f:
@@ -215,6 +217,7 @@ async def approve_payment(
                         "paymentDate": datetime.utcnow()
                     }}
                 )
+                await invalidate_user(payment["userId"])
         else:
             await db.payments.update_one(
                 {"_id": ObjectId(payment_id)},
@@ -247,10 +250,7 @@ async def get_payment_by_registration(registration_id: str):
     """
     try:
         payment = await db.payments.find_one({"registrationId": registration_id})
-        if payment:
-            payment["_id"] = str(payment["_id"])
-            return payment
-        return None
+        return payment
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -1,13 +1,93 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from typing import List, Optional
 from pydantic import BaseModel
 from database import get_db
+from utils.responses import BSONRoute
+from utils.write_behind import WriteBehindQueue
+from utils.scoring import (
+    InvalidAnswer, descriptions_cache, get_description, get_scoring_table, get_weight_tensor,
+    score_answers, score_batch
+)
 from routes.admin import verify_token
-from datetime import datetime
+from routes.auth import get_current_user, get_optional_token
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+import asyncio
 
-router = APIRouter(prefix="/api/personality-tests", tags=["personality-tests"])
+router = APIRouter(prefix="/api/personality-tests", tags=["personality-tests"], route_class=BSONRoute)
 db = get_db()
 
+STATS_ID = "personality"
+# A rebuild recounts results up to a cutoff _id this many seconds ahead of
+# its clock (ObjectIds have one-second resolution, and worker clocks may
+# differ), then waits RECOUNT_SETTLE seconds for batches with earlier _ids
+# that are still being inserted
+RECOUNT_MARGIN = 2
+RECOUNT_SETTLE = 5
+
+# Layout of the test_stats document (rev, baseUpTo, splitAt, current) as
+# last read; writes are conditional on rev, so a stale copy is only a retry
+_stats_layout = None
+
+def _other_slot(slot: str) -> str:
+    return "b" if slot == "a" else "a"
+
+async def _count_results(docs):
+    """
+    Add newly written results to the test_stats counters in one $inc.
+    
+    The document holds `base`, a recount of the results up to `baseUpTo`,
+    plus per-slot counters for results after it: results after `splitAt`
+    (set while a rebuild runs) go to the `current` slot, the others to the
+    other slot, which the rebuild replaces with its recount.
+    """
+    global _stats_layout
+    for _ in range(10):
+        if _stats_layout is None:
+            _stats_layout = await db.test_stats.find_one(
+                {"_id": STATS_ID}, {"rev": 1, "baseUpTo": 1, "splitAt": 1, "current": 1}
+            ) or {}
+        layout = _stats_layout
+        current = layout.get("current", "a")
+        inc = {}
+        for doc in docs:
+            if layout.get("baseUpTo") and doc["_id"] <= layout["baseUpTo"]:
+                # Already in the recount
+                continue
+            slot = current
+            if layout.get("splitAt") and doc["_id"] <= layout["splitAt"]:
+                slot = _other_slot(current)
+            for key in ("total", f"byTestType.{doc['testType']}", f"byResult.{doc['result']}"):
+                key = f"slots.{slot}.{key}"
+                inc[key] = inc.get(key, 0) + 1
+        if not inc:
+            return
+        try:
+            await db.test_stats.update_one(
+                {"_id": STATS_ID, "rev": layout.get("rev")},
+                {"$inc": inc, "$set": {"updatedAt": datetime.utcnow()}},
+                upsert=True
+            )
+            return
+        except DuplicateKeyError:
+            # A rebuild changed the layout: sort the results again
+            _stats_layout = None
+    raise RuntimeError("test_stats layout keeps changing")
+
+def _stats_counters(stats: dict) -> dict:
+    """Sum the recount, the slot counters and counters from before the slots."""
+    counters = {"total": 0, "byTestType": {}, "byResult": {}}
+    for part in [stats.get("base", {}), stats, *stats.get("slots", {}).values()]:
+        counters["total"] += part.get("total", 0)
+        for field in ("byTestType", "byResult"):
+            for key, count in part.get(field, {}).items():
+                counters[field][key] = counters[field].get(key, 0) + count
+    return counters
+
+# Results are inserted in the background (utils/write_behind.py)
+test_results_queue = WriteBehindQueue("test_results", after_insert=_count_results)
+
 # Pydantic Models
 class AnswerInput(BaseModel):
     questionId: str
@@ -17,6 +97,16 @@ class TestSubmission(BaseModel):
     testType: str  # "introvert_extrovert" or "element_personality"
     answers: List[AnswerInput]
 
+class BatchEntry(BaseModel):
+    ref: Optional[str] = None  # caller's student identifier, echoed back
+    answers: List[AnswerInput]
+
+class BatchSubmission(BaseModel):
+    testType: str
+    submissions: List[BatchEntry]
+
+MAX_BATCH_SUBMISSIONS = 5000
+
 class TestResultResponse(BaseModel):
     result: str
     scores: dict
@@ -67,39 +157,18 @@ async def get_test_questions(
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 @router.post("/submit")
-async def submit_test(submission: TestSubmission):
+async def submit_test(submission: TestSubmission, request: Request):
     """
-    Submit test answers and calculate personality type
+    Submit test answers and calculate personality type.
+    The result is saved to the user's history when a user token is sent.
     """
     try:
-        # Get all questions with scoring info
-        cursor = db.questions.find(
-            {"testType": submission.testType},
-            {"_id": 0, "id": 1, "scoring": 1}
-        )
-        questions = await cursor.to_list(length=100)
-        
-        # Create a map of question ID to scoring
-        scoring_map = {q["id"]: q["scoring"] for q in questions}
-        
-        # Calculate scores
-        scores = {}
-        
-        for answer in submission.answers:
-            question_id = answer.questionId
-            selected_option = answer.selectedOption
-            
-            if question_id not in scoring_map:
-                continue
-            
-            # Get the scoring for the selected option
-            option_scoring = scoring_map[question_id][selected_option]
-            
-            # Add scores to the respective personality types
-            for personality_type, score_value in option_scoring.get("score", {}).items():
-                if personality_type not in scores:
-                    scores[personality_type] = 0
-                scores[personality_type] += score_value
+        # Scoring table and descriptions are cached in memory (utils/scoring.py)
+        scoring_table = await get_scoring_table(submission.testType)
+        try:
+            scores = score_answers(scoring_table, submission.answers)
+        except InvalidAnswer as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Determine the result (highest score)
         if not scores:
@@ -107,29 +176,29 @@ async def submit_test(submission: TestSubmission):
         
         result_type = max(scores, key=scores.get)
         
-        # Get personality description
-        description_doc = await db.personality_descriptions.find_one(
-            {"personalityType": result_type},
-            {"_id": 0}
-        )
+        description = await get_description(result_type)
         
-        if not description_doc:
+        if description is None:
             raise HTTPException(status_code=404, detail="Personality description not found")
         
         # Save test result to user's history (if authenticated)
+        token = get_optional_token(request) or {}
         result_data = {
+            "userId": token.get("sub"),
+            "userEmail": token.get("email"),
             "testType": submission.testType,
             "result": result_type,
             "scores": scores,
             "completedAt": datetime.utcnow(),
             "totalQuestions": len(submission.answers)
         }
+        test_results_queue.put(result_data)
         
         return {
             "success": True,
             "result": result_type,
             "scores": scores,
-            "description": description_doc["data"],
+            "description": description,
             "personalityType": result_type,
             "testType": submission.testType
         }
@@ -139,24 +208,97 @@ async def submit_test(submission: TestSubmission):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@router.post("/submit-batch")
+async def submit_test_batch(
+    batch: BatchSubmission,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Score a whole cohort in one request (institution accounts only).
+    Returns each submission's result plus cohort distributions.
+    """
+    try:
+        if current_user.get("userType") != "institution":
+            raise HTTPException(status_code=403, detail="Hanya akun institusi yang dapat mengirim batch")
+        if not batch.submissions:
+            raise HTTPException(status_code=400, detail="No submissions provided")
+        if len(batch.submissions) > MAX_BATCH_SUBMISSIONS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Maksimal {MAX_BATCH_SUBMISSIONS} submission per batch"
+            )
+        
+        tensor = await get_weight_tensor(batch.testType)
+        if tensor is None:
+            raise HTTPException(status_code=404, detail="Test type not found")
+        
+        try:
+            results, cohort = score_batch(tensor, [entry.answers for entry in batch.submissions])
+        except InvalidAnswer as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        formatted_results = []
+        for entry, result in zip(batch.submissions, results):
+            if result is None:
+                formatted_results.append({"ref": entry.ref, "result": None, "error": "No valid answers provided"})
+                continue
+            result_type, scores = result
+            formatted_results.append({
+                "ref": entry.ref,
+                "result": result_type,
+                "scores": scores,
+                "personalityType": result_type
+            })
+        
+        completed_at = datetime.utcnow()
+        institution_id = str(current_user["_id"])
+        for entry, result in zip(batch.submissions, formatted_results):
+            if result["result"] is not None:
+                test_results_queue.put({
+                    "institutionId": institution_id,
+                    "ref": entry.ref,
+                    "testType": batch.testType,
+                    "result": result["result"],
+                    "scores": result["scores"],
+                    "completedAt": completed_at,
+                    "totalQuestions": len(entry.answers)
+                })
+        
+        descriptions = await descriptions_cache.get()
+        
+        return {
+            "success": True,
+            "testType": batch.testType,
+            "total": len(batch.submissions),
+            "results": formatted_results,
+            "cohort": cohort,
+            "descriptions": {
+                personality_type: descriptions[personality_type]
+                for personality_type, bucket in cohort["distribution"].items()
+                if bucket["count"] and personality_type in descriptions
+            }
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
 @router.get("/descriptions/{personality_type}")
 async def get_personality_description(personality_type: str):
     """
     Get detailed description for a specific personality type
     """
     try:
-        description = await db.personality_descriptions.find_one(
-            {"personalityType": personality_type},
-            {"_id": 0}
-        )
+        description = await get_description(personality_type)
         
-        if not description:
+        if description is None:
             raise HTTPException(status_code=404, detail="Personality type not found")
         
         return {
             "success": True,
             "personalityType": personality_type,
-            "data": description["data"]
+            "data": description
         }
     
     except HTTPException:
@@ -170,11 +312,12 @@ async def get_my_test_results(token_data: dict = Depends(verify_token)):
     Get user's test history (requires authentication)
     """
     try:
-        user_email = token_data.get("sub")
+        # User tokens carry the email in "email" ("sub" is the user id)
+        user_email = token_data.get("email") or token_data.get("sub")
         
         # Get user's test results
         cursor = db.test_results.find(
-            {"userEmail": user_email},
+            {"userEmail": user_email, "result": {"$exists": True}},
             {"_id": 0}
         ).sort("completedAt", -1)
         
@@ -193,34 +336,95 @@ async def get_my_test_results(token_data: dict = Depends(verify_token)):
 async def get_test_statistics():
     """
     Get overall test statistics (public)
+    Reads the counters document maintained by _count_results().
     """
     try:
-        # Count total tests taken
-        total_tests = await db.test_results.count_documents({})
+        stats = _stats_counters(await db.test_stats.find_one({"_id": STATS_ID}) or {})
+        by_test_type = stats["byTestType"]
         
-        # Count by test type
-        ie_tests = await db.test_results.count_documents({"testType": "introvert_extrovert"})
-        element_tests = await db.test_results.count_documents({"testType": "element_personality"})
+        return {
+            "success": True,
+            "totalTests": stats["total"],
+            "introvertExtrovertTests": by_test_type.get("introvert_extrovert", 0),
+            "elementPersonalityTests": by_test_type.get("element_personality", 0),
+            "personalityDistribution": stats["byResult"],
+            "byTestType": by_test_type
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+@router.post("/stats/rebuild")
+async def rebuild_test_statistics(token_data: dict = Depends(verify_token)):
+    """
+    Recount the statistics counters from test_results (admin only).
+    
+    Results up to a cutoff _id are recounted and replace the counters for
+    them in one update; results after the cutoff keep being counted by
+    _count_results() in the other slot meanwhile, so nothing is counted
+    twice or lost.
+    """
+    try:
+        # Write this worker's queued results first
+        await test_results_queue.flush()
         
-        # Count by personality type
-        personality_distribution = {}
+        stats = await db.test_stats.find_one({"_id": STATS_ID}, {"rev": 1, "splitAt": 1, "current": 1}) or {}
+        rev = stats.get("rev")
+        cutoff = stats.get("splitAt")
+        old_slot = _other_slot(stats.get("current", "a"))
+        if cutoff is None:
+            # Split the counters: from here on, results after the cutoff go
+            # to the other slot
+            cutoff = ObjectId.from_datetime(datetime.utcnow() + timedelta(seconds=RECOUNT_MARGIN))
+            old_slot = stats.get("current", "a")
+            try:
+                await db.test_stats.update_one(
+                    {"_id": STATS_ID, "rev": rev},
+                    {"$set": {"splitAt": cutoff, "current": _other_slot(old_slot), "rev": (rev or 0) + 1}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                raise HTTPException(status_code=409, detail="Statistik sedang dihitung ulang")
+            rev = (rev or 0) + 1
+        # (else: finish a rebuild that stopped after its split)
+        
+        await asyncio.sleep(RECOUNT_SETTLE)
         
-        # Aggregate results
         pipeline = [
-            {"$group": {"_id": "$result", "count": {"$sum": 1}}}
+            {"$match": {"_id": {"$lte": cutoff}, "result": {"$exists": True}}},
+            {"$group": {"_id": {"testType": "$testType", "result": "$result"}, "count": {"$sum": 1}}}
         ]
+        total = 0
+        by_test_type = {}
+        by_result = {}
+        async for doc in db.test_results.aggregate(pipeline):
+            count = doc["count"]
+            total += count
+            by_test_type[doc["_id"]["testType"]] = by_test_type.get(doc["_id"]["testType"], 0) + count
+            by_result[doc["_id"]["result"]] = by_result.get(doc["_id"]["result"], 0) + count
         
-        cursor = db.test_results.aggregate(pipeline)
-        async for doc in cursor:
-            personality_distribution[doc["_id"]] = doc["count"]
+        # The recount replaces the old slot (and counters from before the
+        # slots); the current slot keeps counting results after the cutoff
+        now = datetime.utcnow()
+        result = await db.test_stats.update_one(
+            {"_id": STATS_ID, "rev": rev, "splitAt": cutoff},
+            {
+                "$set": {
+                    "base": {"total": total, "byTestType": by_test_type, "byResult": by_result},
+                    "baseUpTo": cutoff,
+                    "rev": rev + 1,
+                    "updatedAt": now,
+                    "rebuiltAt": now
+                },
+                "$unset": {"splitAt": "", f"slots.{old_slot}": "", "total": "", "byTestType": "", "byResult": ""}
+            }
+        )
+        if not result.matched_count:
+            raise HTTPException(status_code=409, detail="Statistik sedang dihitung ulang")
         
-        return {
-            "success": True,
-            "totalTests": total_tests,
-            "introvertExtrovertTests": ie_tests,
-            "elementPersonalityTests": element_tests,
-            "personalityDistribution": personality_distribution
-        }
+        return {"success": True, "message": "Statistik test dihitung ulang", "totalTests": total}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
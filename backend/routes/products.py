@@ -2,18 +2,19 @@ from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Form
 from typing import List, Optional
 from models.product import Product, ProductCreate, ProductUpdate
 from database import get_db
+from utils.responses import BSONRoute
+from utils.uploads import ensure_dir
 from datetime import datetime
 from bson import ObjectId
 from routes.admin import verify_token
 import uuid
 from pathlib import Path
 
-router = APIRouter(prefix="/api/products", tags=["products"])
+router = APIRouter(prefix="/api/products", tags=["products"], route_class=BSONRoute)
 db = get_db()
 
 # Upload directory
 UPLOAD_DIR = Path("/app/frontend/public/uploads/products")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 @router.get("", response_model=List[dict])
 async def get_products(
@@ -35,9 +36,6 @@ async def get_products(
         cursor = db.products.find(query).skip(skip).limit(limit).sort("createdAt", -1)
         products = await cursor.to_list(length=limit)
         
-        for product in products:
-            product["_id"] = str(product["_id"])
-        
         return products
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -55,7 +53,6 @@ async def get_product(product_id: str):
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        product["_id"] = str(product["_id"])
         return product
     except HTTPException:
         raise
@@ -155,7 +152,7 @@ async def upload_product_image(
             raise HTTPException(status_code=400, detail="File type not allowed")
         
         unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = UPLOAD_DIR / unique_filename
+        file_path = ensure_dir(UPLOAD_DIR) / unique_filename
         
         contents = await file.read()
         with open(file_path, 'wb') as f:
@@ -2,11 +2,13 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Optional
 from models.question import Question, QuestionCreate, QuestionUpdate, Banner
 from database import get_db
+from utils.responses import BSONRoute
+from utils.cache_versions import QUESTIONS, bump
 from datetime import datetime
 from bson import ObjectId
 from routes.admin import verify_token
 
-router = APIRouter(prefix="/api/questions", tags=["questions"])
+router = APIRouter(prefix="/api/questions", tags=["questions"], route_class=BSONRoute)
 db = get_db()
 
 # Questions Endpoints
@@ -45,7 +47,6 @@ async def get_questions(
         
         # Convert and add testType field for frontend compatibility
         for question in questions:
-            question["_id"] = str(question["_id"])
             # Add testType field based on isFree
             question["testType"] = "free" if question.get("isFree", False) else "paid"
             # Ensure text field exists (frontend uses 'text', seed uses 'question')
@@ -69,7 +70,6 @@ async def get_question(question_id: str):
         if not question:
             raise HTTPException(status_code=404, detail="Question not found")
         
-        question["_id"] = str(question["_id"])
         return question
     except HTTPException:
         raise
@@ -92,6 +92,7 @@ async def create_question(
         
         result = await db.questions.insert_one(question_data)
         
+        await bump(QUESTIONS)
         return {
             "success": True,
             "questionId": str(result.inserted_id),
@@ -124,6 +125,7 @@ async def update_question(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Question not found")
         
+        await bump(QUESTIONS)
         return {"success": True, "message": "Question updated successfully"}
     except HTTPException:
         raise
@@ -147,6 +149,7 @@ async def delete_question(
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Question not found")
         
+        await bump(QUESTIONS)
         return {"success": True, "message": "Question deleted successfully"}
     except HTTPException:
         raise
@@ -185,6 +188,7 @@ async def reorder_questions(
                     {"$set": {"order": order}}
                 )
         
+        await bump(QUESTIONS)
         return {"success": True, "message": "Questions reordered successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -435,6 +439,7 @@ async def seed_questions():
         all_questions = free_questions + paid_questions
         await db.questions.insert_many(all_questions)
         
+        await bump(QUESTIONS)
         return {
             "message": "Questions seeded successfully",
             "free_count": len(free_questions),
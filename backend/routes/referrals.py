@@ -1,19 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
 from typing import List, Optional
 from database import get_db
+from utils.responses import BSONRoute
+from utils.cache_versions import REFERRAL_SETTINGS, bump
 from datetime import datetime
 from bson import ObjectId
 from routes.admin import verify_token
 from models.referral import ReferralSettings
 import os
 import uuid
-from pathlib import Path
 
-router = APIRouter(prefix="/api/referrals", tags=["referrals"])
+router = APIRouter(prefix="/api/referrals", tags=["referrals"], route_class=BSONRoute)
 db = get_db()
 
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
 
 @router.get("/settings", response_model=dict)
 async def get_referral_settings():
@@ -39,10 +38,9 @@ async def get_referral_settings():
                 "createdAt": datetime.utcnow()
             }
             await db.referral_settings.insert_one(default_settings)
+            await bump(REFERRAL_SETTINGS)
             settings = default_settings
         
-        if "_id" in settings:
-            settings["_id"] = str(settings["_id"])
         return settings
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -86,6 +84,7 @@ async def update_referral_settings(
             upsert=True
         )
         
+        await bump(REFERRAL_SETTINGS)
         return {"success": True, "message": "Pengaturan referral berhasil diupdate"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -105,9 +104,6 @@ async def get_referral_leaderboard(
         ).sort("referralCount", -1).limit(limit)
         
         users = await cursor.to_list(length=limit)
-        for user in users:
-            user["_id"] = str(user["_id"])
-        
         return users
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -131,16 +127,15 @@ async def get_referral_transactions(
         transactions = await cursor.to_list(length=limit)
         
         for tx in transactions:
-            tx["_id"] = str(tx["_id"])
             # Get referrer info
             if tx.get("referrerId"):
-                referrer = await db.users.find_one({"_id": ObjectId(tx["referrerId"])})
+                referrer = await db.users.find_one({"_id": ObjectId(tx["referrerId"])}, {"fullName": 1, "email": 1})
                 if referrer:
                     tx["referrerName"] = referrer.get("fullName")
                     tx["referrerEmail"] = referrer.get("email")
             # Get referred info
             if tx.get("referredId"):
-                referred = await db.users.find_one({"_id": ObjectId(tx["referredId"])})
+                referred = await db.users.find_one({"_id": ObjectId(tx["referredId"])}, {"fullName": 1, "email": 1})
                 if referred:
                     tx["referredName"] = referred.get("fullName")
                     tx["referredEmail"] = referred.get("email")
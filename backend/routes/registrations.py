@@ -2,10 +2,11 @@ from fastapi import APIRouter, HTTPException, Request
 from typing import List, Optional
 from models.registration import RegistrationCreate, Registration, RegistrationResponse
 from database import get_db
+from utils.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 
-router = APIRouter(prefix="/api/registrations", tags=["registrations"])
+router = APIRouter(prefix="/api/registrations", tags=["registrations"], route_class=BSONRoute)
 
 # Get database instance
 db = get_db()
@@ -61,10 +62,6 @@ async def get_registrations(
         cursor = db.registrations.find(query).skip(skip).limit(limit).sort("registrationDate", -1)
         registrations = await cursor.to_list(length=limit)
         
-        # Convert ObjectId to string
-        for reg in registrations:
-            reg["_id"] = str(reg["_id"])
-        
         return registrations
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Terjadi kesalahan: {str(e)}")
@@ -82,7 +79,6 @@ async def get_registration(registration_id: str):
         if not registration:
             raise HTTPException(status_code=404, detail="Pendaftaran tidak ditemukan")
         
-        registration["_id"] = str(registration["_id"])
         return registration
     except HTTPException:
         raise
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends, Form
 from typing import List, Optional
 from database import get_db
+from utils.responses import BSONRoute
+from utils.cache_versions import bump
+from utils.homepage import HOMEPAGE
 from datetime import datetime
 from bson import ObjectId
 from routes.admin import verify_token
 
-router = APIRouter(prefix="/api/running-info", tags=["running-info"])
+router = APIRouter(prefix="/api/running-info", tags=["running-info"], route_class=BSONRoute)
 db = get_db()
 
 @router.get("", response_model=List[dict])
@@ -30,9 +33,6 @@ async def get_running_info(isActive: Optional[bool] = None):
         cursor = db.running_info.find(query).sort("priority", -1)
         infos = await cursor.to_list(100)
         
-        for info in infos:
-            info["_id"] = str(info["_id"])
-        
         return infos
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -46,9 +46,6 @@ async def get_all_running_info(token_data: dict = Depends(verify_token)):
         cursor = db.running_info.find({}).sort("priority", -1)
         infos = await cursor.to_list(100)
         
-        for info in infos:
-            info["_id"] = str(info["_id"])
-        
         return infos
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -88,6 +85,7 @@ async def create_running_info(
         
         result = await db.running_info.insert_one(info_doc)
         
+        await bump(HOMEPAGE)
         return {
             "success": True,
             "id": str(result.inserted_id),
@@ -146,6 +144,7 @@ async def update_running_info(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Informasi tidak ditemukan")
         
+        await bump(HOMEPAGE)
         return {"success": True, "message": "Informasi berhasil diupdate"}
     except HTTPException:
         raise
@@ -169,6 +168,7 @@ async def delete_running_info(
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Informasi tidak ditemukan")
         
+        await bump(HOMEPAGE)
         return {"success": True, "message": "Informasi berhasil dihapus"}
     except HTTPException:
         raise
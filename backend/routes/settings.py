@@ -1,48 +1,31 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from fastapi.responses import Response
 from models.settings import SiteSettings, SettingsUpdate
 from database import get_db
+from utils.responses import BSONRoute
+from utils.uploads import ensure_dir
+from utils.cache_versions import bump
+from utils.site_settings import SETTINGS, settings_cache
 from datetime import datetime
-from bson import ObjectId
 from routes.admin import verify_token
 import os
 import uuid
 from pathlib import Path
 
-router = APIRouter(prefix="/api/settings", tags=["settings"])
+router = APIRouter(prefix="/api/settings", tags=["settings"], route_class=BSONRoute)
 db = get_db()
 
 # Upload directory
 UPLOAD_DIR = Path("/app/frontend/public/uploads/site")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
-def serialize_settings(settings: dict) -> dict:
-    """Convert MongoDB document to JSON-serializable dict"""
-    if not settings:
-        return {}
-    result = {}
-    for key, value in settings.items():
-        if isinstance(value, ObjectId):
-            result[key] = str(value)
-        elif isinstance(value, datetime):
-            result[key] = value.isoformat()
-        elif isinstance(value, list):
-            result[key] = [
-                serialize_settings(item) if isinstance(item, dict) else item
-                for item in value
-            ]
-        elif isinstance(value, dict):
-            result[key] = serialize_settings(value)
-        else:
-            result[key] = value
-    return result
 
 @router.get("", response_model=dict)
 async def get_settings():
     """
-    Get site settings (public)
+    Get site settings (public). Served from the settings cache as
+    pre-serialized JSON.
     """
     try:
-        settings = await db.settings.find_one()
+        settings, body = await settings_cache.get()
         if not settings:
             # Create default settings without _id field
             default_settings = {
@@ -75,10 +58,11 @@ async def get_settings():
                 "certificateSignatureUrl": None,
                 "updatedAt": datetime.utcnow()
             }
-            result = await db.settings.insert_one(default_settings)
-            settings = await db.settings.find_one({"_id": result.inserted_id})
+            await db.settings.insert_one(default_settings)
+            await bump(SETTINGS)
+            settings, body = await settings_cache.get()
         
-        return serialize_settings(settings)
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -103,6 +87,7 @@ async def update_settings(
             {"_id": settings["_id"]},
             {"$set": update_data}
         )
+        await bump(SETTINGS)
         
         return {"success": True, "message": "Settings updated successfully"}
     except HTTPException:
@@ -120,8 +105,7 @@ async def upload_team_photo(
     """
     try:
         # Create team uploads directory
-        team_upload_dir = Path("/app/frontend/public/uploads/team")
-        team_upload_dir.mkdir(parents=True, exist_ok=True)
+        team_upload_dir = ensure_dir(Path("/app/frontend/public/uploads/team"))
         
         # Save file
         file_extension = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'png'
@@ -155,7 +139,7 @@ async def upload_asset(
         # Save file
         file_extension = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'png'
         unique_filename = f"{asset_type}_{uuid.uuid4()}.{file_extension}"
-        file_path = UPLOAD_DIR / unique_filename
+        file_path = ensure_dir(UPLOAD_DIR) / unique_filename
         
         contents = await file.read()
         with open(file_path, 'wb') as f:
@@ -187,6 +171,7 @@ async def upload_asset(
                         "order": 0
                     }}}
                 )
+                await bump(SETTINGS)
                 return {"success": True, "url": file_url, "message": "Banner uploaded"}
             
             if update_field:
@@ -194,6 +179,7 @@ async def upload_asset(
                     {"_id": settings["_id"]},
                     {"$set": update_field}
                 )
+                await bump(SETTINGS)
         
         return {"success": True, "url": file_url, "message": f"{asset_type} uploaded successfully"}
     except HTTPException:
@@ -224,6 +210,7 @@ async def delete_banner(
             {"_id": settings["_id"]},
             {"$set": {"banners": banners}}
         )
+        await bump(SETTINGS)
         
         return {"success": True, "message": "Banner deleted successfully"}
     except HTTPException:
@@ -2,10 +2,11 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Optional
 from pydantic import BaseModel
 from database import get_db
+from utils.responses import BSONRoute
 from routes.admin import verify_token
 from datetime import datetime
 
-router = APIRouter(prefix="/api/test-access", tags=["test-access"])
+router = APIRouter(prefix="/api/test-access", tags=["test-access"], route_class=BSONRoute)
 db = get_db()
 
 class TestAccessResponse(BaseModel):
@@ -35,7 +36,7 @@ async def check_test_access(token_data: dict = Depends(verify_token)):
         
         # Check if user has paid access
         # TODO: Check payment status in user profile or payments collection
-        user = await db.users.find_one({"email": user_email}, {"_id": 0})
+        user = await db.users.find_one({"email": user_email}, {"_id": 0, "hasPaidAccess": 1})
         has_paid_access = user.get("hasPaidAccess", False) if user else False
         
         if has_taken_free and not has_paid_access:
@@ -2,36 +2,25 @@ from fastapi import APIRouter, HTTPException, Request, Depends
 from pydantic import BaseModel
 from typing import List, Optional
 from database import get_db
+from utils.responses import BSONRoute
+from utils.midtrans_client import get_midtrans_client
+from utils.payment_state import apply_transaction_status
 from datetime import datetime
-from bson import ObjectId
 from routes.admin import verify_token
+from routes.webhooks import ingest_midtrans_notification
 import os
 import uuid
 import hashlib
 import json
 import logging
 
-router = APIRouter(prefix="/api/transactions", tags=["transactions"])
+router = APIRouter(prefix="/api/transactions", tags=["transactions"], route_class=BSONRoute)
 db = get_db()
 logger = logging.getLogger(__name__)
 
 # Midtrans Configuration - Keys will be filled by user
-MIDTRANS_SERVER_KEY = os.environ.get("MIDTRANS_SERVER_KEY", "")
+# Server key and environment are read by utils.midtrans_client
 MIDTRANS_CLIENT_KEY = os.environ.get("MIDTRANS_CLIENT_KEY", "")
-MIDTRANS_IS_PRODUCTION = os.environ.get("MIDTRANS_IS_PRODUCTION", "False") == "True"
-
-# Initialize Midtrans only if keys are provided
-snap = None
-if MIDTRANS_SERVER_KEY:
-    try:
-        import midtransclient
-        snap = midtransclient.Snap(
-            is_production=MIDTRANS_IS_PRODUCTION,
-            server_key=MIDTRANS_SERVER_KEY,
-            client_key=MIDTRANS_CLIENT_KEY
-        )
-    except Exception as e:
-        logger.warning(f"Midtrans not initialized: {str(e)}")
 
 # Pydantic Models
 class ItemDetails(BaseModel):
@@ -63,7 +52,8 @@ async def create_transaction(request: TransactionRequest):
     Create a new transaction with Midtrans
     """
     try:
-        if not snap:
+        midtrans = get_midtrans_client()
+        if not midtrans.configured:
             raise HTTPException(
                 status_code=503,
                 detail="Payment service not configured. Please add Midtrans API keys."
@@ -106,7 +96,7 @@ async def create_transaction(request: TransactionRequest):
         }
         
         # Call Midtrans API to create transaction
-        transaction = snap.create_transaction(param)
+        transaction = await midtrans.create_snap_transaction(param)
         
         # Store transaction record in MongoDB
         transaction_record = {
@@ -150,26 +140,19 @@ async def get_transaction_status(order_id: str):
             raise HTTPException(status_code=404, detail="Transaction not found")
         
         # If Midtrans is configured, get real-time status
-        if snap:
+        midtrans = get_midtrans_client()
+        if midtrans.configured:
             try:
-                status_response = snap.transactions.status(order_id)
+                status_response = await midtrans.get_status(order_id)
                 
-                # Update local record
-                await db.transactions.update_one(
-                    {"order_id": order_id},
-                    {
-                        "$set": {
-                            "status": status_response.get('transaction_status'),
-                            "payment_type": status_response.get('payment_type'),
-                            "updated_at": datetime.utcnow()
-                        }
-                    }
-                )
+                # Same forward-only transition as the webhook, so a poll
+                # cannot skip the stock update or move the order backwards
+                status, _ = await apply_transaction_status(order_id, status_response)
                 
                 return {
                     "order_id": order_id,
-                    "status": status_response.get('transaction_status'),
-                    "payment_type": status_response.get('payment_type'),
+                    "status": status,
+                    "payment_type": status_response.get('payment_type') or transaction.get('payment_type'),
                     "gross_amount": transaction.get('gross_amount')
                 }
             except Exception as e:
@@ -190,64 +173,18 @@ async def get_transaction_status(order_id: str):
 @router.post("/webhook")
 async def handle_midtrans_webhook(request: Request):
     """
-    Handle Midtrans payment notification webhook
+    Handle Midtrans payment notification webhook (same as POST /api/webhooks/midtrans)
     """
     try:
         body = await request.body()
         notification = json.loads(body.decode('utf-8'))
-        
-        order_id = notification.get('order_id')
-        transaction_status = notification.get('transaction_status')
-        fraud_status = notification.get('fraud_status', 'accept')
-        payment_type = notification.get('payment_type')
-        
-        logger.info(f"Webhook received for order {order_id}: {transaction_status}")
-        
-        # Update transaction in MongoDB
-        update_data = {
-            "status": transaction_status,
-            "payment_type": payment_type,
-            "fraud_status": fraud_status,
-            "updated_at": datetime.utcnow(),
-            "webhook_data": notification
-        }
-        
-        # Handle different statuses
-        if transaction_status == 'settlement':
-            update_data["settled_at"] = datetime.utcnow()
-            # Grant access to purchased items
-            await handle_successful_payment(order_id)
-        elif transaction_status == 'expire':
-            update_data["expired_at"] = datetime.utcnow()
-        
-        await db.transactions.update_one(
-            {"order_id": order_id},
-            {"$set": update_data}
-        )
-        
-        return {"status": "ok"}
-        
+        return await ingest_midtrans_notification(notification)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Webhook error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Webhook processing failed: {str(e)}")
 
-async def handle_successful_payment(order_id: str):
-    """
-    Handle successful payment - update product stock, etc.
-    """
-    try:
-        transaction = await db.transactions.find_one({"order_id": order_id})
-        if transaction:
-            # Update product stock for each item
-            for item in transaction.get('items', []):
-                await db.products.update_one(
-                    {"_id": ObjectId(item['id'])},
-                    {"$inc": {"stock": -item['quantity']}}
-                )
-            logger.info(f"Processed successful payment for order: {order_id}")
-    except Exception as e:
-        logger.error(f"Error processing payment: {str(e)}")
-
 @router.get("", response_model=List[dict])
 async def get_transactions(
     skip: int = 0,
@@ -266,9 +203,6 @@ async def get_transactions(
         cursor = db.transactions.find(query).skip(skip).limit(limit).sort("created_at", -1)
         transactions = await cursor.to_list(length=limit)
         
-        for txn in transactions:
-            txn["_id"] = str(txn["_id"])
-        
         return transactions
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -307,8 +241,9 @@ async def get_midtrans_config():
     """
     Get Midtrans client configuration (public)
     """
+    midtrans = get_midtrans_client()
     return {
         "clientKey": MIDTRANS_CLIENT_KEY,
-        "isProduction": MIDTRANS_IS_PRODUCTION,
-        "isConfigured": bool(MIDTRANS_SERVER_KEY)
+        "isProduction": midtrans.is_production,
+        "isConfigured": midtrans.configured
     }
@@ -1,46 +1,30 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
 from typing import List, Optional
 from database import get_db
+from utils.responses import BSONRoute
+from utils.midtrans_client import get_midtrans_client
+from utils.payment_state import initial_check_fields
+from utils.site_settings import get_site_settings
+from utils.uploads import ensure_dir
+from utils.user_cache import invalidate_user
 from datetime import datetime
-from bson import ObjectId
 from routes.auth import get_current_user
+from routes.webhooks import ingest_midtrans_notification
 import uuid
 import os
 import logging
 from pathlib import Path
 
-router = APIRouter(prefix="/api/user-payments", tags=["user-payments"])
+router = APIRouter(prefix="/api/user-payments", tags=["user-payments"], route_class=BSONRoute)
 db = get_db()
 logger = logging.getLogger(__name__)
 
 # Upload directory
 UPLOAD_DIR = Path("/app/frontend/public/uploads/payments")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 # Midtrans Configuration
-MIDTRANS_SERVER_KEY = os.environ.get("MIDTRANS_SERVER_KEY", "")
+# Server key and environment are read by utils.midtrans_client
 MIDTRANS_CLIENT_KEY = os.environ.get("MIDTRANS_CLIENT_KEY", "")
-MIDTRANS_IS_PRODUCTION = os.environ.get("MIDTRANS_IS_PRODUCTION", "False") == "True"
-
-# Initialize Midtrans CoreAPI for QRIS
-core_api = None
-snap_api = None
-if MIDTRANS_SERVER_KEY:
-    try:
-        import midtransclient
-        core_api = midtransclient.CoreApi(
-            is_production=MIDTRANS_IS_PRODUCTION,
-            server_key=MIDTRANS_SERVER_KEY,
-            client_key=MIDTRANS_CLIENT_KEY
-        )
-        snap_api = midtransclient.Snap(
-            is_production=MIDTRANS_IS_PRODUCTION,
-            server_key=MIDTRANS_SERVER_KEY,
-            client_key=MIDTRANS_CLIENT_KEY
-        )
-        logger.info("Midtrans CoreAPI and Snap initialized")
-    except Exception as e:
-        logger.warning(f"Midtrans not initialized: {str(e)}")
 
 @router.post("/create-snap-payment", response_model=dict)
 async def create_snap_payment(current_user: dict = Depends(get_current_user)):
@@ -48,14 +32,15 @@ async def create_snap_payment(current_user: dict = Depends(get_current_user)):
     Create Snap payment (supports QRIS, GoPay, VA, Credit Card, etc)
     """
     try:
-        if not snap_api:
+        midtrans = get_midtrans_client()
+        if not midtrans.configured:
             raise HTTPException(
                 status_code=503,
                 detail="Payment service not configured. Please add Midtrans API keys."
             )
         
         # Get test price from settings
-        settings = await db.settings.find_one()
+        settings = await get_site_settings()
         test_price = int(settings.get("paymentAmount", 50000)) if settings else 50000
         
         # Generate unique order ID
@@ -120,9 +105,10 @@ async def create_snap_payment(current_user: dict = Depends(get_current_user)):
         }
         
         # Call Midtrans Snap API
-        transaction = snap_api.create_transaction(param)
+        transaction = await midtrans.create_snap_transaction(param)
         
         # Store payment record
+        now = datetime.utcnow()
         payment_doc = {
             "userId": str(current_user["_id"]),
             "userEmail": current_user["email"],
@@ -134,7 +120,9 @@ async def create_snap_payment(current_user: dict = Depends(get_current_user)):
             "snapToken": transaction.get("token"),
             "redirectUrl": transaction.get("redirect_url"),
             "status": "pending",
-            "createdAt": datetime.utcnow()
+            "createdAt": now,
+            # Picked up by the payment reconciler
+            **initial_check_fields(now)
         }
         
         await db.payment_proofs.insert_one(payment_doc)
@@ -147,6 +135,7 @@ async def create_snap_payment(current_user: dict = Depends(get_current_user)):
                 "currentOrderId": order_id
             }}
         )
+        await invalidate_user(current_user["_id"])
         
         return {
             "success": True,
@@ -171,7 +160,7 @@ async def create_qris_payment(current_user: dict = Depends(get_current_user)):
     """
     try:
         # Get test price from settings
-        settings = await db.settings.find_one()
+        settings = await get_site_settings()
         test_price = int(settings.get("paymentAmount", 50000)) if settings else 50000
         
         # Generate unique order ID and UUID
@@ -211,6 +200,7 @@ async def create_qris_payment(current_user: dict = Depends(get_current_user)):
                 "currentOrderId": order_id
             }}
         )
+        await invalidate_user(current_user["_id"])
         
         return {
             "success": True,
@@ -241,58 +231,22 @@ async def check_payment_status(
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Check payment status from Midtrans
+    Check payment status. Served from the local record, which the payment
+    reconciler and the Midtrans notification keep up to date.
     """
     try:
-        if not core_api:
-            # Fallback to local status
-            payment = await db.payment_proofs.find_one({"orderId": order_id})
-            if payment:
-                return {
-                    "orderId": order_id,
-                    "status": payment.get("status", "unknown"),
-                    "grossAmount": payment.get("grossAmount")
-                }
-            raise HTTPException(status_code=404, detail="Payment not found")
-        
-        # Get status from Midtrans
-        status_response = core_api.transactions.status(order_id)
-        transaction_status = status_response.get("transaction_status")
-        
-        # Update local payment record
-        update_data = {
-            "status": transaction_status,
-            "updatedAt": datetime.utcnow(),
-            "midtransStatusResponse": status_response
-        }
-        
-        await db.payment_proofs.update_one(
+        payment = await db.payment_proofs.find_one(
             {"orderId": order_id},
-            {"$set": update_data}
+            {"status": 1, "grossAmount": 1, "midtransStatusResponse.payment_type": 1}
         )
-        
-        # If settled, update user status
-        if transaction_status == "settlement":
-            payment = await db.payment_proofs.find_one({"orderId": order_id})
-            if payment:
-                await db.users.update_one(
-                    {"_id": ObjectId(payment["userId"])},
-                    {"$set": {
-                        "paymentStatus": "approved",
-                        "paymentDate": datetime.utcnow()
-                    }}
-                )
-                
-                # Credit referral bonus if applicable
-                user = await db.users.find_one({"_id": ObjectId(payment["userId"])})
-                if user and user.get("usedReferralCode"):
-                    await credit_referral_bonus(user.get("usedReferralCode"), payment["userId"])
+        if not payment:
+            raise HTTPException(status_code=404, detail="Payment not found")
         
         return {
             "orderId": order_id,
-            "status": transaction_status,
-            "grossAmount": status_response.get("gross_amount"),
-            "paymentType": status_response.get("payment_type")
+            "status": payment.get("status", "unknown"),
+            "grossAmount": payment.get("grossAmount"),
+            "paymentType": payment.get("midtransStatusResponse", {}).get("payment_type")
         }
         
     except HTTPException:
@@ -301,34 +255,6 @@ async def check_payment_status(
         logger.error(f"Payment status check error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
-async def credit_referral_bonus(referral_code: str, referred_user_id: str):
-    """Credit referral bonus when payment is successful"""
-    try:
-        referrer = await db.users.find_one({"myReferralCode": referral_code})
-        if referrer:
-            # Get bonus amount from settings
-            ref_settings = await db.referral_settings.find_one({})
-            bonus_amount = ref_settings.get("bonusPerReferral", 10000) if ref_settings else 10000
-            
-            # Update referral transaction status
-            await db.referral_transactions.update_one(
-                {"referrerId": str(referrer["_id"]), "referredId": referred_user_id, "status": "pending"},
-                {"$set": {
-                    "status": "credited",
-                    "creditedAt": datetime.utcnow()
-                }}
-            )
-            
-            # Add bonus to referrer
-            await db.users.update_one(
-                {"_id": referrer["_id"]},
-                {"$inc": {"referralBonus": bonus_amount}}
-            )
-            
-            logger.info(f"Credited {bonus_amount} to referrer {referrer['email']}")
-    except Exception as e:
-        logger.error(f"Error crediting referral bonus: {str(e)}")
-
 @router.post("/upload-proof", response_model=dict)
 async def upload_payment_proof(
     paymentType: str = Form(...),  # test, shop
@@ -351,7 +277,7 @@ async def upload_payment_proof(
         
         # Save file
         unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = UPLOAD_DIR / unique_filename
+        file_path = ensure_dir(UPLOAD_DIR) / unique_filename
         
         contents = await file.read()
         with open(file_path, 'wb') as f:
@@ -361,7 +287,7 @@ async def upload_payment_proof(
         
         # Get test price from settings if not provided
         if not paymentAmount:
-            settings = await db.settings.find_one()
+            settings = await get_site_settings()
             paymentAmount = settings.get("paymentAmount", 50000) if settings else 50000
         
         # Create payment record
@@ -390,6 +316,7 @@ async def upload_payment_proof(
                     "paymentMethod": paymentMethod
                 }}
             )
+            await invalidate_user(current_user["_id"])
         
         return {
             "success": True,
@@ -411,9 +338,6 @@ async def get_my_payments(current_user: dict = Depends(get_current_user)):
         cursor = db.payment_proofs.find({"userId": str(current_user["_id"])}).sort("createdAt", -1)
         payments = await cursor.to_list(100)
         
-        for payment in payments:
-            payment["_id"] = str(payment["_id"])
-        
         return payments
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -424,7 +348,7 @@ async def get_test_price():
     Get current test price from settings
     """
     try:
-        settings = await db.settings.find_one()
+        settings = await get_site_settings()
         if settings:
             return {
                 "price": settings.get("paymentAmount", 50000),
@@ -443,104 +367,9 @@ async def get_test_price():
 @router.post("/midtrans-notification", response_model=dict)
 async def midtrans_notification_handler(notification: dict):
     """
-    Handle Midtrans payment notification (webhook)
-    This endpoint is called by Midtrans when payment status changes
+    Handle Midtrans payment notification (webhook). Kept for existing
+    Midtrans configurations; same as POST /api/webhooks/midtrans.
     """
-    try:
-        if not core_api:
-            logger.warning("Midtrans notification received but CoreAPI not initialized")
-            return {"success": False, "message": "Payment service not configured"}
-        
-        logger.info(f"Received Midtrans notification: {notification}")
-        
-        # Verify notification from Midtrans
-        status_response = core_api.transactions.notification(notification)
-        
-        order_id = status_response.get('order_id')
-        transaction_status = status_response.get('transaction_status')
-        fraud_status = status_response.get('fraud_status')
-        payment_type = status_response.get('payment_type')
-        
-        logger.info(f"Order {order_id} - Status: {transaction_status}, Fraud: {fraud_status}")
-        
-        # Update payment record in database
-        payment = await db.payment_proofs.find_one({"orderId": order_id})
-        
-        if not payment:
-            logger.warning(f"Payment record not found for order {order_id}")
-            return {"success": False, "message": "Payment not found"}
-        
-        # Determine final status
-        final_status = "pending"
-        
-        if transaction_status == 'capture':
-            if fraud_status == 'accept':
-                final_status = "settlement"
-            else:
-                final_status = "pending"
-        elif transaction_status == 'settlement':
-            final_status = "settlement"
-        elif transaction_status in ['cancel', 'deny', 'expire']:
-            final_status = "failed"
-        elif transaction_status == 'pending':
-            final_status = "pending"
-        
-        # Update payment proof record
-        await db.payment_proofs.update_one(
-            {"orderId": order_id},
-            {"$set": {
-                "status": final_status,
-                "transactionStatus": transaction_status,
-                "fraudStatus": fraud_status,
-                "updatedAt": datetime.utcnow(),
-                "midtransNotification": status_response
-            }}
-        )
-        
-        # If payment is successful, update user status
-        if final_status == "settlement":
-            user_id = payment.get("userId")
-            if user_id:
-                # Update user payment status
-                await db.users.update_one(
-                    {"_id": ObjectId(user_id)},
-                    {"$set": {
-                        "paymentStatus": "approved",
-                        "paymentDate": datetime.utcnow(),
-                        "paidTestStatus": "in_progress"  # Allow user to take paid test
-                    }}
-                )
-                
-                # Credit referral bonus if user used a referral code
-                user = await db.users.find_one({"_id": ObjectId(user_id)})
-                if user and user.get("usedReferralCode"):
-                    await credit_referral_bonus(user.get("usedReferralCode"), user_id)
-                    logger.info(f"Referral bonus credited for order {order_id}")
-                
-                logger.info(f"User {user_id} payment approved for order {order_id}")
-        elif final_status == "failed":
-            # Update user status if payment failed
-            user_id = payment.get("userId")
-            if user_id:
-                await db.users.update_one(
-                    {"_id": ObjectId(user_id)},
-                    {"$set": {
-                        "paymentStatus": "unpaid",
-                        "currentOrderId": None
-                    }}
-                )
-                logger.info(f"Payment failed for order {order_id}")
-        
-        return {
-            "success": True,
-            "order_id": order_id,
-            "status": final_status,
-            "message": "Notification processed"
-        }
-        
-    except Exception as e:
-        logger.error(f"Error processing Midtrans notification: {str(e)}", exc_info=True)
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    logger.info(f"Received Midtrans notification for order {notification.get('order_id')}")
+    result = await ingest_midtrans_notification(notification)
+    return {"success": True, **result, "message": "Notification received"}
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Optional
 from database import get_db
+from utils.responses import BSONRoute
+from utils.user_cache import SLIM_PROJECTION, invalidate_user
 from datetime import datetime
 from bson import ObjectId
 from routes.admin import verify_token
 from models.user import AdminUserUpdate
 
-router = APIRouter(prefix="/api/users", tags=["users"])
+router = APIRouter(prefix="/api/users", tags=["users"], route_class=BSONRoute)
 db = get_db()
 
 @router.get("", response_model=List[dict])
@@ -37,14 +39,10 @@ async def get_all_users(
         if paymentStatus:
             query["paymentStatus"] = paymentStatus
         
-        cursor = db.users.find(query).skip(skip).limit(limit).sort("createdAt", -1)
+        # Without password hash and bulky payloads
+        cursor = db.users.find(query, SLIM_PROJECTION).skip(skip).limit(limit).sort("createdAt", -1)
         users = await cursor.to_list(length=limit)
         
-        for user in users:
-            user["_id"] = str(user["_id"])
-            # Remove sensitive data
-            user.pop("hashedPassword", None)
-        
         return users
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -100,23 +98,17 @@ async def get_user(
         if not ObjectId.is_valid(user_id):
             raise HTTPException(status_code=400, detail="Invalid user ID")
         
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, SLIM_PROJECTION)
         if not user:
             raise HTTPException(status_code=404, detail="User tidak ditemukan")
         
-        user["_id"] = str(user["_id"])
-        user.pop("hashedPassword", None)
-        
         # Get payment info
         payment = await db.payments.find_one({"userId": user_id})
         if payment:
-            payment["_id"] = str(payment["_id"])
             user["paymentDetails"] = payment
         
         # Get referral info
         referrals = await db.referral_transactions.find({"referrerId": user_id}).to_list(100)
-        for ref in referrals:
-            ref["_id"] = str(ref["_id"])
         user["referrals"] = referrals
         
         return user
@@ -149,6 +141,7 @@ async def update_user(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="User tidak ditemukan atau tidak ada perubahan")
         
+        await invalidate_user(user_id)
         return {"success": True, "message": "User berhasil diupdate"}
     except HTTPException:
         raise
@@ -181,6 +174,7 @@ async def ban_user(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="User tidak ditemukan")
         
+        await invalidate_user(user_id)
         return {"success": True, "message": "User berhasil diblokir"}
     except HTTPException:
         raise
@@ -211,6 +205,7 @@ async def unban_user(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="User tidak ditemukan")
         
+        await invalidate_user(user_id)
         return {"success": True, "message": "User berhasil di-unban"}
     except HTTPException:
         raise
@@ -235,6 +230,8 @@ async def delete_user(
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="User tidak ditemukan")
         
+        await invalidate_user(user_id)
+        
         # Delete associated data
         await db.payments.delete_many({"userId": user_id})
         await db.referral_transactions.delete_many({
@@ -260,24 +257,26 @@ async def get_user_test_answers(
         if not ObjectId.is_valid(user_id):
             raise HTTPException(status_code=400, detail="Invalid user ID")
         
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+        test_type = "free" if testType == "free" else "paid"
+        user = await db.users.find_one(
+            {"_id": ObjectId(user_id)},
+            {f"{test_type}TestStatus": 1, f"{test_type}TestCompletedAt": 1}
+        )
         if not user:
             raise HTTPException(status_code=404, detail="User tidak ditemukan")
         
-        if testType == "free":
-            return {
-                "testType": "free",
-                "status": user.get("freeTestStatus", "not_started"),
-                "answers": user.get("freeTestAnswers"),
-                "completedAt": user.get("freeTestCompletedAt")
-            }
-        else:
-            return {
-                "testType": "paid",
-                "status": user.get("paidTestStatus", "not_started"),
-                "answers": user.get("paidTestAnswers"),
-                "completedAt": user.get("paidTestCompletedAt")
-            }
+        # Answers are stored outside the user document (migrate_user_payloads.py)
+        answers = await db.user_test_answers.find_one(
+            {"userId": user_id, "testType": test_type},
+            {"_id": 0, "answers": 1, "completedAt": 1}
+        ) or {}
+        
+        return {
+            "testType": test_type,
+            "status": user.get(f"{test_type}TestStatus", "not_started"),
+            "answers": answers.get("answers"),
+            "completedAt": user.get(f"{test_type}TestCompletedAt") or answers.get("completedAt")
+        }
     except HTTPException:
         raise
     except Exception as e:
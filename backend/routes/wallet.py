@@ -1,22 +1,23 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Depends
 from pydantic import BaseModel
 from typing import Optional
 from database import get_db
+from utils.responses import BSONRoute
+from utils.midtrans_client import MidtransError, get_midtrans_client
+from utils.payment_state import initial_check_fields
+from utils.wallet_ledger import InsufficientBalance, credit, debit, get_balance, verify_balance
+from routes.webhooks import ingest_midtrans_notification
+from routes.admin import verify_token
 from datetime import datetime
 from bson import ObjectId
-import httpx
-import base64
-import hashlib
 import os
+import uuid
 
-router = APIRouter(prefix="/api/wallet", tags=["wallet"])
+router = APIRouter(prefix="/api/wallet", tags=["wallet"], route_class=BSONRoute)
 db = get_db()
 
 # Midtrans Config
-MIDTRANS_SERVER_KEY = os.environ.get("MIDTRANS_SERVER_KEY", "SB-Mid-server-YOUR_KEY")
 MIDTRANS_CLIENT_KEY = os.environ.get("MIDTRANS_CLIENT_KEY", "SB-Mid-client-YOUR_KEY")
-MIDTRANS_IS_PRODUCTION = os.environ.get("MIDTRANS_IS_PRODUCTION", "false").lower() == "true"
-MIDTRANS_API_URL = "https://api.midtrans.com" if MIDTRANS_IS_PRODUCTION else "https://api.sandbox.midtrans.com"
 
 class TopUpRequest(BaseModel):
     amount: int
@@ -32,21 +33,7 @@ class PaymentRequest(BaseModel):
 @router.get("/balance/{user_id}")
 async def get_wallet_balance(user_id: str):
     try:
-        wallet = await db.wallets.find_one({"userId": user_id})
-        if not wallet:
-            # Create wallet if not exists
-            wallet = {
-                "userId": user_id,
-                "balance": 0,
-                "createdAt": datetime.utcnow(),
-                "updatedAt": datetime.utcnow()
-            }
-            await db.wallets.insert_one(wallet)
-            wallet["_id"] = str(wallet.get("_id", ""))
-        else:
-            wallet["_id"] = str(wallet["_id"])
-        
-        return {"balance": wallet.get("balance", 0), "userId": user_id}
+        return {"balance": await get_balance(user_id), "userId": user_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -58,9 +45,6 @@ async def get_transactions(user_id: str, limit: int = 20):
             {"userId": user_id}
         ).sort("createdAt", -1).limit(limit).to_list(limit)
         
-        for t in transactions:
-            t["_id"] = str(t["_id"])
-        
         return transactions
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -69,16 +53,23 @@ async def get_transactions(user_id: str, limit: int = 20):
 @router.post("/topup")
 async def create_topup(request: TopUpRequest):
     try:
-        order_id = f"TOPUP-{request.userId[:8]}-{int(datetime.utcnow().timestamp())}"
+        midtrans = get_midtrans_client()
+        if not midtrans.configured:
+            raise HTTPException(
+                status_code=503,
+                detail="Payment service not configured. Please add Midtrans API keys."
+            )
+        if request.amount <= 0:
+            raise HTTPException(status_code=400, detail="Jumlah top up tidak valid")
+        
+        order_id = f"TOPUP-{request.userId[:8]}-{int(datetime.utcnow().timestamp())}-{uuid.uuid4().hex[:6].upper()}"
         
         # Get user info
-        user = await db.users.find_one({"_id": ObjectId(request.userId)})
+        user = await db.users.find_one({"_id": ObjectId(request.userId)}, {"fullName": 1, "email": 1})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Create Midtrans transaction
-        auth_string = base64.b64encode(f"{MIDTRANS_SERVER_KEY}:".encode()).decode()
-        
         payload = {
             "payment_type": "qris",
             "transaction_details": {
@@ -94,39 +85,13 @@ async def create_topup(request: TopUpRequest):
             }
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{MIDTRANS_API_URL}/v2/charge",
-                json=payload,
-                headers={
-                    "Authorization": f"Basic {auth_string}",
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                }
-            )
-            
-            result = response.json()
-        
-        if response.status_code != 200 and response.status_code != 201:
-            # Fallback for sandbox/demo mode
-            result = {
-                "status_code": "201",
-                "status_message": "QRIS transaction is created",
-                "transaction_id": f"demo-{order_id}",
-                "order_id": order_id,
-                "gross_amount": str(request.amount),
-                "payment_type": "qris",
-                "transaction_status": "pending",
-                "actions": [
-                    {
-                        "name": "generate-qr-code",
-                        "url": f"https://api.sandbox.midtrans.com/v2/qris/{order_id}/qr-code"
-                    }
-                ],
-                "qr_string": "00020101021226670016COM.NOBUBANK.WWW01telepin30"
-            }
+        try:
+            result = await midtrans.charge(payload)
+        except MidtransError as e:
+            raise HTTPException(status_code=502, detail=f"Gagal membuat pembayaran QRIS: {str(e)}")
         
-        # Save pending transaction
+        # Save pending transaction; the payment reconciler follows it up
+        now = datetime.utcnow()
         transaction = {
             "userId": request.userId,
             "orderId": order_id,
@@ -135,7 +100,8 @@ async def create_topup(request: TopUpRequest):
             "status": "pending",
             "paymentMethod": "qris",
             "midtransResponse": result,
-            "createdAt": datetime.utcnow()
+            "createdAt": now,
+            **initial_check_fields(now)
         }
         await db.wallet_transactions.insert_one(transaction)
         
@@ -148,102 +114,44 @@ async def create_topup(request: TopUpRequest):
             "expiryTime": result.get("expiry_time"),
             "midtransResponse": result
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Check payment status
+# Check payment status (from the local record; the payment reconciler
+# and the notification handler keep it up to date)
 @router.get("/check-status/{order_id}")
 async def check_payment_status(order_id: str):
     try:
-        auth_string = base64.b64encode(f"{MIDTRANS_SERVER_KEY}:".encode()).decode()
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{MIDTRANS_API_URL}/v2/{order_id}/status",
-                headers={
-                    "Authorization": f"Basic {auth_string}",
-                    "Accept": "application/json"
-                }
-            )
-            result = response.json()
-        
-        transaction_status = result.get("transaction_status", "pending")
+        transaction = await db.wallet_transactions.find_one(
+            {"orderId": order_id},
+            {"status": 1, "transactionStatus": 1, "midtransStatusResponse": 1, "midtransResponse": 1}
+        )
+        if not transaction:
+            raise HTTPException(status_code=404, detail="Transaksi tidak ditemukan")
         
-        # Update local transaction if settlement
-        if transaction_status == "settlement" or transaction_status == "capture":
-            transaction = await db.wallet_transactions.find_one({"orderId": order_id})
-            if transaction and transaction.get("status") == "pending":
-                # Update transaction status
-                await db.wallet_transactions.update_one(
-                    {"orderId": order_id},
-                    {"$set": {"status": "success", "updatedAt": datetime.utcnow()}}
-                )
-                
-                # Add balance to wallet
-                await db.wallets.update_one(
-                    {"userId": transaction["userId"]},
-                    {
-                        "$inc": {"balance": transaction["amount"]},
-                        "$set": {"updatedAt": datetime.utcnow()}
-                    },
-                    upsert=True
-                )
+        status = transaction.get("status", "pending")
+        transaction_status = transaction.get("transactionStatus") or {"success": "settlement"}.get(status, status)
         
         return {
             "orderId": order_id,
             "status": transaction_status,
-            "midtransResponse": result
+            "midtransResponse": transaction.get("midtransStatusResponse") or transaction.get("midtransResponse")
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Midtrans webhook/notification handler
+# Midtrans webhook/notification handler (same as POST /api/webhooks/midtrans)
 @router.post("/notification")
 async def handle_notification(request: Request):
     try:
         data = await request.json()
-        
-        order_id = data.get("order_id")
-        transaction_status = data.get("transaction_status")
-        fraud_status = data.get("fraud_status", "accept")
-        
-        # Verify signature
-        server_key = MIDTRANS_SERVER_KEY
-        signature_key = data.get("signature_key")
-        order_id_data = data.get("order_id")
-        status_code = data.get("status_code")
-        gross_amount = data.get("gross_amount")
-        
-        raw_string = f"{order_id_data}{status_code}{gross_amount}{server_key}"
-        expected_signature = hashlib.sha512(raw_string.encode()).hexdigest()
-        
-        # Process based on status
-        if transaction_status == "settlement" or (transaction_status == "capture" and fraud_status == "accept"):
-            transaction = await db.wallet_transactions.find_one({"orderId": order_id})
-            if transaction and transaction.get("status") == "pending":
-                # Update transaction
-                await db.wallet_transactions.update_one(
-                    {"orderId": order_id},
-                    {"$set": {"status": "success", "updatedAt": datetime.utcnow()}}
-                )
-                
-                # Add balance
-                await db.wallets.update_one(
-                    {"userId": transaction["userId"]},
-                    {
-                        "$inc": {"balance": transaction["amount"]},
-                        "$set": {"updatedAt": datetime.utcnow()}
-                    },
-                    upsert=True
-                )
-        
-        elif transaction_status in ["deny", "cancel", "expire"]:
-            await db.wallet_transactions.update_one(
-                {"orderId": order_id},
-                {"$set": {"status": "failed", "updatedAt": datetime.utcnow()}}
-            )
-        
-        return {"status": "ok"}
+        return await ingest_midtrans_notification(data)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -251,32 +159,28 @@ async def handle_notification(request: Request):
 @router.post("/pay-test")
 async def pay_for_test(request: PaymentRequest):
     try:
-        # Check wallet balance
-        wallet = await db.wallets.find_one({"userId": request.userId})
-        current_balance = wallet.get("balance", 0) if wallet else 0
-        
-        if current_balance < request.amount:
+        now = datetime.utcnow()
+        # Unique per payment: the ledger records one debit per order id
+        order_id = f"PAY-{request.userId[:8]}-{int(now.timestamp())}-{uuid.uuid4().hex[:6].upper()}"
+        
+        # Deduct balance; fails instead of overdrawing when payments race
+        try:
+            entry = await debit(request.userId, request.amount, "payment", order_id, request.description)
+        except InsufficientBalance:
             raise HTTPException(status_code=400, detail="Saldo tidak mencukupi")
-        
-        # Deduct balance
-        await db.wallets.update_one(
-            {"userId": request.userId},
-            {
-                "$inc": {"balance": -request.amount},
-                "$set": {"updatedAt": datetime.utcnow()}
-            }
-        )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Jumlah pembayaran tidak valid")
         
         # Record transaction
         transaction = {
             "userId": request.userId,
-            "orderId": f"PAY-{request.userId[:8]}-{int(datetime.utcnow().timestamp())}",
+            "orderId": order_id,
             "amount": -request.amount,
             "type": "payment",
             "description": request.description,
             "paymentType": request.paymentType,
             "status": "success",
-            "createdAt": datetime.utcnow()
+            "createdAt": now
         }
         await db.wallet_transactions.insert_one(transaction)
         
@@ -297,7 +201,7 @@ async def pay_for_test(request: PaymentRequest):
         return {
             "success": True,
             "message": "Pembayaran berhasil",
-            "newBalance": current_balance - request.amount
+            "newBalance": entry["balanceAfter"]
         }
     except HTTPException:
         raise
@@ -309,7 +213,10 @@ async def pay_for_test(request: PaymentRequest):
 async def demo_topup(request: TopUpRequest):
     """Demo top-up for testing without real Midtrans"""
     try:
-        order_id = f"DEMO-{request.userId[:8]}-{int(datetime.utcnow().timestamp())}"
+        if request.amount <= 0:
+            raise HTTPException(status_code=400, detail="Jumlah top-up tidak valid")
+        
+        order_id = f"DEMO-{request.userId[:8]}-{int(datetime.utcnow().timestamp())}-{uuid.uuid4().hex[:6].upper()}"
         
         # Record transaction
         transaction = {
@@ -324,24 +231,24 @@ async def demo_topup(request: TopUpRequest):
         await db.wallet_transactions.insert_one(transaction)
         
         # Add balance
-        await db.wallets.update_one(
-            {"userId": request.userId},
-            {
-                "$inc": {"balance": request.amount},
-                "$set": {"updatedAt": datetime.utcnow()}
-            },
-            upsert=True
-        )
-        
-        # Get new balance
-        wallet = await db.wallets.find_one({"userId": request.userId})
+        entry = await credit(request.userId, request.amount, "topup", order_id, "Demo top-up")
         
         return {
             "success": True,
             "message": "Demo top-up berhasil",
             "orderId": order_id,
             "amount": request.amount,
-            "newBalance": wallet.get("balance", 0)
+            "newBalance": entry["balanceAfter"]
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Check a wallet balance against its ledger (admin only)
+@router.get("/ledger/{user_id}/verify")
+async def verify_wallet_ledger(user_id: str, token_data: dict = Depends(verify_token)):
+    try:
+        return await verify_balance(user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Request
+from utils.responses import BSONRoute
+from utils.midtrans_client import get_midtrans_client
+from utils.webhook_events import webhook_processor
+import logging
+
+router = APIRouter(prefix="/api/webhooks", tags=["webhooks"], route_class=BSONRoute)
+logger = logging.getLogger(__name__)
+
+
+async def ingest_midtrans_notification(notification: dict) -> dict:
+    """
+    Verify and queue a Midtrans notification; utils.webhook_events applies it.
+    Used by /api/webhooks/midtrans and the older per-router notification URLs.
+    """
+    midtrans = get_midtrans_client()
+    if not midtrans.configured:
+        raise HTTPException(status_code=503, detail="Payment service not configured")
+    if not isinstance(notification, dict) or not notification.get("order_id"):
+        raise HTTPException(status_code=400, detail="Notifikasi tidak valid")
+    if not midtrans.verify_signature(notification):
+        logger.warning(f"Rejected Midtrans notification with bad signature for order {notification.get('order_id')}")
+        raise HTTPException(status_code=403, detail="Invalid signature")
+
+    event_id, duplicate = await webhook_processor.enqueue(notification)
+    return {"status": "ok", "eventId": event_id, "duplicate": duplicate}
+
+
+@router.post("/midtrans", response_model=dict)
+async def midtrans_webhook(request: Request):
+    """
+    Midtrans payment notification for every payment type (Snap test
+    payments, wallet top-ups and shop transactions)
+    """
+    try:
+        notification = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Notifikasi tidak valid")
+    try:
+        return await ingest_midtrans_notification(notification)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Webhook error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Webhook processing failed: {str(e)}")
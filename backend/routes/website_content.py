@@ -1,12 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response
 from fastapi.security import HTTPBearer
 from typing import List, Optional
 from pydantic import BaseModel
 from database import get_db
+from utils.responses import BSONRoute, etag_matches
+from utils.cache_versions import bump
+from utils.homepage import HOMEPAGE, get_homepage_bundle
 from datetime import datetime
 from bson import ObjectId
 
-router = APIRouter(prefix="/api/website-content", tags=["website-content"])
+router = APIRouter(prefix="/api/website-content", tags=["website-content"], route_class=BSONRoute)
 security = HTTPBearer()
 
 db = get_db()
@@ -54,13 +58,29 @@ class SectionImage(BaseModel):
     imageUrl: str
     altText: str = ""
 
+# Landing page bundle
+@router.get("/homepage")
+async def get_homepage(request: Request):
+    """
+    Everything the public landing page needs in one response: settings, hero
+    slides, products, testimonials, activities, section images, active
+    banners and current running info. Served from an in-memory bundle with a
+    content-hash ETag; clients revalidate with If-None-Match and get a 304.
+    """
+    try:
+        bundle = await get_homepage_bundle()
+        headers = {"ETag": bundle["etag"], "Cache-Control": "public, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), bundle["etag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(content=bundle["body"], media_type="application/json", headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Hero Slides CRUD
 @router.get("/hero-slides")
 async def get_hero_slides():
     try:
         slides = await db.hero_slides.find({"isActive": True}).sort("order", 1).to_list(100)
-        for slide in slides:
-            slide["_id"] = str(slide["_id"])
         return slides
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -71,6 +91,7 @@ async def create_hero_slide(slide: SlideContent):
         slide_dict = slide.dict()
         slide_dict["createdAt"] = datetime.utcnow()
         result = await db.hero_slides.insert_one(slide_dict)
+        await bump(HOMEPAGE)
         return {"id": str(result.inserted_id), "message": "Slide created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -84,6 +105,7 @@ async def update_hero_slide(slide_id: str, slide: SlideContent):
         )
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Slide not found")
+        await bump(HOMEPAGE)
         return {"message": "Slide updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -94,6 +116,7 @@ async def delete_hero_slide(slide_id: str):
         result = await db.hero_slides.delete_one({"_id": ObjectId(slide_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Slide not found")
+        await bump(HOMEPAGE)
         return {"message": "Slide deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -103,8 +126,6 @@ async def delete_hero_slide(slide_id: str):
 async def get_products():
     try:
         products = await db.website_products.find({"isActive": True}).sort("order", 1).to_list(100)
-        for product in products:
-            product["_id"] = str(product["_id"])
         return products
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -115,6 +136,7 @@ async def create_product(product: ProductContent):
         product_dict = product.dict()
         product_dict["createdAt"] = datetime.utcnow()
         result = await db.website_products.insert_one(product_dict)
+        await bump(HOMEPAGE)
         return {"id": str(result.inserted_id), "message": "Product created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -128,6 +150,7 @@ async def update_product(product_id: str, product: ProductContent):
         )
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Product not found")
+        await bump(HOMEPAGE)
         return {"message": "Product updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -138,6 +161,7 @@ async def delete_product(product_id: str):
         result = await db.website_products.delete_one({"_id": ObjectId(product_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Product not found")
+        await bump(HOMEPAGE)
         return {"message": "Product deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -147,8 +171,6 @@ async def delete_product(product_id: str):
 async def get_testimonials():
     try:
         testimonials = await db.website_testimonials.find({"isActive": True}).sort("order", 1).to_list(100)
-        for t in testimonials:
-            t["_id"] = str(t["_id"])
         return testimonials
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -159,6 +181,7 @@ async def create_testimonial(testimonial: TestimonialContent):
         t_dict = testimonial.dict()
         t_dict["createdAt"] = datetime.utcnow()
         result = await db.website_testimonials.insert_one(t_dict)
+        await bump(HOMEPAGE)
         return {"id": str(result.inserted_id), "message": "Testimonial created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -172,6 +195,7 @@ async def update_testimonial(testimonial_id: str, testimonial: TestimonialConten
         )
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Testimonial not found")
+        await bump(HOMEPAGE)
         return {"message": "Testimonial updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -182,6 +206,7 @@ async def delete_testimonial(testimonial_id: str):
         result = await db.website_testimonials.delete_one({"_id": ObjectId(testimonial_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Testimonial not found")
+        await bump(HOMEPAGE)
         return {"message": "Testimonial deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -191,8 +216,6 @@ async def delete_testimonial(testimonial_id: str):
 async def get_activities():
     try:
         activities = await db.website_activities.find({"isActive": True}).sort("order", 1).to_list(100)
-        for a in activities:
-            a["_id"] = str(a["_id"])
         return activities
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -203,6 +226,7 @@ async def create_activity(activity: ActivityContent):
         a_dict = activity.dict()
         a_dict["createdAt"] = datetime.utcnow()
         result = await db.website_activities.insert_one(a_dict)
+        await bump(HOMEPAGE)
         return {"id": str(result.inserted_id), "message": "Activity created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -216,6 +240,7 @@ async def update_activity(activity_id: str, activity: ActivityContent):
         )
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Activity not found")
+        await bump(HOMEPAGE)
         return {"message": "Activity updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -226,6 +251,7 @@ async def delete_activity(activity_id: str):
         result = await db.website_activities.delete_one({"_id": ObjectId(activity_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Activity not found")
+        await bump(HOMEPAGE)
         return {"message": "Activity deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -235,8 +261,6 @@ async def delete_activity(activity_id: str):
 async def get_section_images():
     try:
         images = await db.section_images.find({}).to_list(100)
-        for img in images:
-            img["_id"] = str(img["_id"])
         return images
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -245,8 +269,6 @@ async def get_section_images():
 async def get_section_image(section_name: str):
     try:
         image = await db.section_images.find_one({"sectionName": section_name})
-        if image:
-            image["_id"] = str(image["_id"])
         return image
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -259,6 +281,7 @@ async def create_or_update_section_image(image: SectionImage):
             {"$set": image.dict(), "$setOnInsert": {"createdAt": datetime.utcnow()}},
             upsert=True
         )
+        await bump(HOMEPAGE)
         return {"message": "Section image saved successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -363,6 +386,7 @@ async def seed_default_content():
         ]
         await db.section_images.insert_many(default_section_images)
         
+        await bump(HOMEPAGE)
         return {"message": "Default content seeded successfully", "seeded": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
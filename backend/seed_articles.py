@@ -3,6 +3,7 @@ Script untuk seed 5 artikel contoh ke database NEWME CLASS
 """
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from utils.cache_versions import ARTICLES, bump
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -530,6 +531,9 @@ async def seed_articles():
     except Exception as e:
         print(f"❌ Error seeding articles: {str(e)}")
         raise
+    else:
+        # Drop cached copies / ETags served by the API
+        await bump(ARTICLES, db)
     finally:
         client.close()
 
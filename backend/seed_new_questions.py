@@ -4,6 +4,7 @@ Dengan scoring system yang proper untuk mengetahui jati diri seseorang
 """
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from utils.cache_versions import QUESTIONS, bump
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -599,6 +600,9 @@ async def seed_new_questions():
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         raise
+    else:
+        # Drop cached copies / ETags served by the API
+        await bump(QUESTIONS, db)
     finally:
         client.close()
 
@@ -3,6 +3,7 @@ Script untuk membuat soal-soal test kepribadian NEWME CLASS
 """
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from utils.cache_versions import QUESTIONS, bump
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -435,6 +436,9 @@ async def seed_questions():
     except Exception as e:
         print(f"❌ Error seeding questions: {str(e)}")
         raise
+    else:
+        # Drop cached copies / ETags served by the API
+        await bump(QUESTIONS, db)
     finally:
         client.close()
 
@@ -1,52 +1,105 @@
 from fastapi import FastAPI, APIRouter
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+import importlib
 import os
 import logging
+import time
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Initialize database
-from database import init_db
-db = init_db()
-
-# Import routes AFTER database initialization
-from routes.registrations import router as registrations_router
-from routes.contacts import router as contacts_router
-from routes.institutions import router as institutions_router
-from routes.admin import router as admin_router
-from routes.payments import router as payments_router
-from routes.settings import router as settings_router
-from routes.analytics import router as analytics_router
-from routes.users import router as users_router
-from routes.products import router as products_router
-from routes.questions import router as questions_router
-from routes.banners import router as banners_router
-from routes.transactions import router as transactions_router
-from routes.certificates import router as certificates_router
-from routes.auth import router as auth_router
-from routes.user_payments import router as user_payments_router
-from routes.referrals import router as referrals_router
-from routes.articles import router as articles_router
-from routes.running_info import router as running_info_router
-from routes.personality_tests import router as personality_tests_router
-from routes.test_access import router as test_access_router
-from routes.ai_analysis import router as ai_analysis_router
-from routes.website_content import router as website_content_router
-from routes.wallet import router as wallet_router
+import database
+from utils.mongo_profiler import profile_mongo_commands
+from utils.conditional_get import conditional_get
+from utils.responses import BSONJSONResponse, BSONRoute
+from utils.uploads import ensure_dir
+from utils import write_behind
+from utils.midtrans_client import close_midtrans_client
+from utils.payment_reconciler import payment_reconciler
+from utils.webhook_events import webhook_processor
+
+# Router modules, in include order. Routers hold a proxy from get_db(); the
+# client itself is created in lifespan(). Each import is timed so a slow
+# cold start can be traced to the router that caused it.
+ROUTER_MODULES = [
+    "registrations",
+    "contacts",
+    "institutions",
+    "admin",
+    "payments",
+    "settings",
+    "analytics",
+    "users",
+    "products",
+    "questions",
+    "banners",
+    "transactions",
+    "certificates",
+    "auth",
+    "user_payments",
+    "referrals",
+    "articles",
+    "running_info",
+    "personality_tests",
+    "test_access",
+    "ai_analysis",
+    "website_content",
+    "wallet",
+    "webhooks",
+]
+
+router_import_ms = {}
+routers = []
+for module_name in ROUTER_MODULES:
+    started = time.perf_counter()
+    routers.append(importlib.import_module(f"routes.{module_name}").router)
+    router_import_ms[module_name] = round((time.perf_counter() - started) * 1000, 2)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    slowest = sorted(router_import_ms.items(), key=lambda item: item[1], reverse=True)[:3]
+    logger.info(
+        f"Routers imported in {sum(router_import_ms.values()):.0f}ms "
+        f"(slowest: {', '.join(f'{name} {ms:.0f}ms' for name, ms in slowest)})"
+    )
+    if uploads_path.parent.exists():
+        ensure_dir(uploads_path)
+    # Each worker process owns its own Motor client and pool
+    database.connect()
+    # Index builds run in the background on the server; an unreachable
+    # database should not keep the API from starting.
+    try:
+        await database.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to apply indexes: {str(e)}")
+    write_behind.start_all()
+    payment_reconciler.start()
+    webhook_processor.start()
+    yield
+    await webhook_processor.stop()
+    await payment_reconciler.stop()
+    await write_behind.stop_all()
+    await close_midtrans_client()
+    database.close()
 
 # Create the main app without a prefix
 app = FastAPI(
     title="NEWME CLASS API",
     description="API for NEWME CLASS - Kelas Peduli Talenta",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson with ObjectId/datetime support; routers also use BSONRoute to
+    # skip jsonable_encoder for plain dict/list payloads
+    default_response_class=BSONJSONResponse
 )
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=BSONRoute)
 
 # Health check endpoint
 @api_router.get("/")
@@ -59,40 +112,59 @@ async def root():
 
 @api_router.get("/health")
 async def health_check():
-    return {"status": "ok", "database": "connected"}
+    """
+    Liveness probe - the process is up. Reports the database state but
+    does not fail on it; use /api/ready for load balancer checks.
+    """
+    try:
+        await database.ping(timeout=1.0)
+        db_status = "connected"
+    except Exception:
+        db_status = "unreachable"
+    return {"status": "ok", "database": db_status, "pid": os.getpid()}
+
+@api_router.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe - pings MongoDB and reports connection pool statistics.
+    Returns 503 when the database cannot be reached so the worker is taken
+    out of rotation.
+    """
+    pool = database.pool_stats.snapshot()
+    try:
+        latency_ms = await database.ping()
+    except Exception as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "database": "unreachable", "error": str(e), "pool": pool}
+        )
+    return {
+        "status": "ready",
+        "database": "connected",
+        "pid": os.getpid(),
+        "pingMs": round(latency_ms, 3),
+        "pool": pool,
+        "poolOptions": database.pool_options()
+    }
 
 # Include all routers
-app.include_router(registrations_router)
-app.include_router(contacts_router)
-app.include_router(institutions_router)
-app.include_router(admin_router)
-app.include_router(payments_router)
-app.include_router(settings_router)
-app.include_router(analytics_router)
-app.include_router(users_router)
-app.include_router(products_router)
-app.include_router(questions_router)
-app.include_router(banners_router)
-app.include_router(transactions_router)
-app.include_router(certificates_router)
-app.include_router(auth_router)
-app.include_router(user_payments_router)
-app.include_router(referrals_router)
-app.include_router(articles_router)
-app.include_router(running_info_router)
-app.include_router(personality_tests_router)
-app.include_router(test_access_router)
-app.include_router(ai_analysis_router)
-app.include_router(website_content_router)
-app.include_router(wallet_router)
+for router in routers:
+    app.include_router(router)
 
 # Include the base api router
 app.include_router(api_router)
 
 # Mount static files for uploads (served from frontend's public folder)
 uploads_path = Path("/app/frontend/public/uploads")
-if uploads_path.exists():
-    app.mount("/uploads", StaticFiles(directory=str(uploads_path)), name="uploads")
+if uploads_path.parent.exists():
+    # Created in lifespan(), after the mount is registered
+    app.mount("/uploads", StaticFiles(directory=str(uploads_path), check_dir=False), name="uploads")
+
+# ETag / 304 for public read endpoints (utils/conditional_get.py)
+app.middleware("http")(conditional_get)
+
+# Per-route Mongo command counts (Server-Timing header, /api/admin/perf)
+app.middleware("http")(profile_mongo_commands)
 
 app.add_middleware(
     CORSMiddleware,
@@ -109,4 +181,4 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Database connection is managed by database.py
\ No newline at end of file
+# Database connection is managed by lifespan() above
\ No newline at end of file
@@ -3,6 +3,7 @@ Update existing articles dengan HTML content dan featured images
 """
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from utils.cache_versions import ARTICLES, bump
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -98,6 +99,9 @@ async def update_articles():
     except Exception as e:
         print(f"❌ Error updating articles: {str(e)}")
         raise
+    else:
+        # Drop cached copies / ETags served by the API
+        await bump(ARTICLES, db)
     finally:
         client.close()
 
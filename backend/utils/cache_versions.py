@@ -0,0 +1,120 @@
+"""
+Cross-worker cache invalidation.
+
+Every cached resource has a counter in the `cache_versions` collection
+({_id: name, version: n}); a cache can depend on several of them. Writers call `await bump(name)` after changing the
+underlying data. That increments the counter and drops the copies held by
+this worker. VersionedCache re-reads the shared counter at most once per
+`check_interval` seconds and reloads when it moved, so a change shows up in
+every worker within about a second.
+
+Scripts that write with their own client pass it along:
+`await bump(QUESTIONS, db)`.
+"""
+import asyncio
+import time
+
+from pymongo import ReturnDocument
+
+from database import get_db
+from utils.fork import after_fork
+
+db = get_db()
+
+# Resource names bumped by writers and read by the conditional GET
+# middleware (utils/conditional_get.py)
+ARTICLES = "articles"
+QUESTIONS = "questions"
+PERSONALITY_DESCRIPTIONS = "personality_descriptions"
+REFERRAL_SETTINGS = "referral_settings"
+USERS = "users"
+
+_MISSING = object()
+_caches = {}
+_memo = {}
+
+
+async def get_versions(names) -> tuple:
+    docs = await db.cache_versions.find({"_id": {"$in": list(names)}}).to_list(len(names))
+    versions = {doc["_id"]: doc["version"] for doc in docs}
+    return tuple(versions.get(name, 0) for name in names)
+
+
+async def current_versions(names, max_age: float = 1.0) -> tuple:
+    """get_versions() through a per-worker memo refreshed at most every `max_age` seconds."""
+    names = tuple(names)
+    entry = _memo.get(names)
+    now = time.monotonic()
+    if entry is not None and now - entry[1] < max_age:
+        return entry[0]
+    versions = await get_versions(names)
+    _memo[names] = (versions, now)
+    return versions
+
+
+async def bump(name: str, database=None) -> int:
+    """Mark `name` as changed in every worker. Returns the new version."""
+    doc = await (database if database is not None else db).cache_versions.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    for cache in _caches.get(name, []):
+        cache.invalidate()
+    for names in [names for names in _memo if name in names]:
+        _memo.pop(names, None)
+    return doc["version"]
+
+
+@after_fork
+def _reset_memo():
+    _memo.clear()
+
+
+class VersionedCache:
+    """
+    A value built by `loader` and rebuilt whenever the version of any of
+    `names` changes. The cached value is shared between requests - do not
+    mutate it.
+    """
+
+    def __init__(self, names, loader, check_interval: float = 1.0):
+        self.names = (names,) if isinstance(names, str) else tuple(names)
+        self.check_interval = check_interval
+        self._loader = loader
+        for name in self.names:
+            _caches.setdefault(name, []).append(self)
+        after_fork(self._reset)
+        self._reset()
+
+    def _reset(self):
+        self._lock = asyncio.Lock()
+        self.invalidate()
+
+    def invalidate(self):
+        self._value = _MISSING
+        self._version = None
+        self._checked_at = 0.0
+
+    @property
+    def version(self):
+        return self._version
+
+    def _fresh(self) -> bool:
+        return self._value is not _MISSING and time.monotonic() - self._checked_at < self.check_interval
+
+    async def get(self):
+        if self._fresh():
+            return self._value
+        async with self._lock:
+            if self._fresh():
+                return self._value
+            # Version first: a write landing during the load then only
+            # causes one extra reload instead of a stale value
+            version = await get_versions(self.names)
+            if self._value is _MISSING or version != self._version:
+                self._value = await self._loader()
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._value
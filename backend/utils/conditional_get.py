@@ -0,0 +1,60 @@
+"""
+Conditional GET for public read endpoints.
+
+The ETag of a response is derived from the request path/query and the
+cache_versions counters of the resources it reads, so it can be computed
+without running the route. A request whose If-None-Match matches gets a 304
+straight from the middleware - no Mongo query beyond the (memoized) version
+lookup. Writers keep the ETags honest by calling `bump()` on every change.
+"""
+import hashlib
+import re
+
+from starlette.responses import Response
+
+from utils.cache_versions import (
+    ARTICLES, PERSONALITY_DESCRIPTIONS, QUESTIONS, REFERRAL_SETTINGS, current_versions
+)
+from utils.responses import etag_matches
+
+# (path pattern, resource names, Cache-Control)
+CONDITIONAL_ROUTES = [
+    (re.compile(r"^/api/articles/?$"), (ARTICLES,), "public, max-age=60"),
+    (re.compile(r"^/api/articles/[^/]+$"), (ARTICLES,), "public, max-age=60"),
+    (re.compile(r"^/api/personality-tests/questions/[^/]+$"), (QUESTIONS,), "public, max-age=300"),
+    (re.compile(r"^/api/personality-tests/descriptions/[^/]+$"), (PERSONALITY_DESCRIPTIONS,), "public, max-age=3600"),
+    (re.compile(r"^/api/referrals/settings$"), (REFERRAL_SETTINGS,), "public, max-age=60"),
+]
+
+
+def _match(path: str):
+    for pattern, names, cache_control in CONDITIONAL_ROUTES:
+        if pattern.match(path):
+            return names, cache_control
+    return None
+
+
+def make_etag(path: str, query: str, versions) -> str:
+    key = f"{path}?{query}|{','.join(map(str, versions))}"
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+async def conditional_get(request, call_next):
+    """HTTP middleware: ETag / If-None-Match for the routes in CONDITIONAL_ROUTES."""
+    if request.method not in ("GET", "HEAD"):
+        return await call_next(request)
+    matched = _match(request.url.path)
+    if matched is None:
+        return await call_next(request)
+
+    names, cache_control = matched
+    versions = await current_versions(names)
+    etag = make_etag(request.url.path, request.url.query, versions)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
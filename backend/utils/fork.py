@@ -0,0 +1,15 @@
+"""
+Per-process state that must not be inherited across a fork.
+
+Modules that keep clients or caches in globals register a reset callback
+with @after_fork. The callback runs in the child right after os.fork()
+(gunicorn workers, including --preload), so each worker builds its own
+instance on first use instead of sharing the parent's sockets and threads.
+"""
+import os
+
+
+def after_fork(callback):
+    """Run `callback` in every child process after a fork. Usable as a decorator."""
+    os.register_at_fork(after_in_child=callback)
+    return callback
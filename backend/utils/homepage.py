@@ -0,0 +1,79 @@
+"""
+Cached landing-page bundle.
+
+Settings, hero slides, website products, testimonials, activities, section
+images, active banners and the running info currently inside its date window
+are served as one pre-serialized JSON document with a content-hash ETag. The
+bundle is rebuilt when the settings or any of those collections are written
+through their CRUD routes (`await bump(HOMEPAGE)`), and when a running-info
+date window opens or closes.
+"""
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+
+from database import get_db
+from utils.cache_versions import VersionedCache
+from utils.responses import dumps
+from utils.site_settings import SETTINGS
+
+db = get_db()
+
+HOMEPAGE = "homepage"
+
+
+def _in_window(info: dict, now: datetime) -> bool:
+    start, end = info.get("startDate"), info.get("endDate")
+    return (start is None or start <= now) and (end is None or end >= now)
+
+
+async def _load_homepage() -> dict:
+    now = datetime.utcnow()
+    # Settings straight from Mongo: settings_cache may still hold the
+    # previous document for up to a second after the SETTINGS bump that
+    # triggered this reload, and the bundle would keep it until the next bump
+    settings, slides, products, testimonials, activities, images, banners, infos = await asyncio.gather(
+        db.settings.find_one(),
+        db.hero_slides.find({"isActive": True}).sort("order", 1).to_list(100),
+        db.website_products.find({"isActive": True}).sort("order", 1).to_list(100),
+        db.website_testimonials.find({"isActive": True}).sort("order", 1).to_list(100),
+        db.website_activities.find({"isActive": True}).sort("order", 1).to_list(100),
+        db.section_images.find({}).to_list(100),
+        db.banners.find({"isActive": True}).sort("order", 1).to_list(100),
+        db.running_info.find({"isActive": True}).sort("priority", -1).to_list(100),
+    )
+
+    # The next moment a running-info item enters or leaves its window
+    boundaries = [info["startDate"] for info in infos if info.get("startDate") and info["startDate"] > now]
+    boundaries += [
+        info["endDate"] + timedelta(milliseconds=1)
+        for info in infos if info.get("endDate") and info["endDate"] >= now
+    ]
+
+    body = dumps({
+        "settings": settings or {},
+        "heroSlides": slides,
+        "products": products,
+        "testimonials": testimonials,
+        "activities": activities,
+        "sectionImages": images,
+        "banners": banners,
+        "runningInfo": [info for info in infos if _in_window(info, now)],
+    })
+    return {
+        "body": body,
+        "etag": f'"{hashlib.sha1(body).hexdigest()}"',
+        "expiresAt": min(boundaries, default=None),
+    }
+
+
+homepage_cache = VersionedCache((HOMEPAGE, SETTINGS), _load_homepage)
+
+
+async def get_homepage_bundle() -> dict:
+    """{"body": bytes, "etag": str, "expiresAt": datetime | None}"""
+    bundle = await homepage_cache.get()
+    if bundle["expiresAt"] and datetime.utcnow() >= bundle["expiresAt"]:
+        homepage_cache.invalidate()
+        bundle = await homepage_cache.get()
+    return bundle
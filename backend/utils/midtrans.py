@@ -1,30 +1,14 @@
-import midtransclient
-import os
+from utils.fork import after_fork
+from utils.midtrans_client import get_midtrans_client
 from datetime import datetime
 import uuid
 
 class MidtransService:
     def __init__(self):
-        # Get Midtrans credentials from environment
-        self.server_key = os.environ.get('MIDTRANS_SERVER_KEY', '')
-        self.client_key = os.environ.get('MIDTRANS_CLIENT_KEY', '')
-        self.is_production = os.environ.get('MIDTRANS_IS_PRODUCTION', 'false').lower() == 'true'
-        
-        # Initialize Snap API
-        self.snap = midtransclient.Snap(
-            is_production=self.is_production,
-            server_key=self.server_key,
-            client_key=self.client_key
-        )
-        
-        # Initialize Core API for checking transaction status
-        self.core_api = midtransclient.CoreApi(
-            is_production=self.is_production,
-            server_key=self.server_key,
-            client_key=self.client_key
-        )
+        # Requests go through the worker's shared async client
+        self.client = get_midtrans_client()
     
-    def create_qris_transaction(self, order_id: str, amount: int, customer_details: dict, item_details: list):
+    async def create_qris_transaction(self, order_id: str, amount: int, customer_details: dict, item_details: list):
         """
         Create QRIS transaction using Midtrans
         
@@ -54,7 +38,7 @@ class MidtransService:
             }
             
             # Create transaction
-            transaction = self.snap.create_transaction(param)
+            transaction = await self.client.create_snap_transaction(param)
             
             return {
                 "success": True,
@@ -68,7 +52,7 @@ class MidtransService:
                 "error": str(e)
             }
     
-    def get_transaction_status(self, order_id: str):
+    async def get_transaction_status(self, order_id: str):
         """
         Check transaction status from Midtrans
         
@@ -79,7 +63,7 @@ class MidtransService:
             Dict with transaction status
         """
         try:
-            status_response = self.core_api.transactions.status(order_id)
+            status_response = await self.client.get_status(order_id)
             
             return {
                 "success": True,
@@ -99,7 +83,7 @@ class MidtransService:
                 "error": str(e)
             }
     
-    def verify_notification(self, notification_data: dict):
+    async def verify_notification(self, notification_data: dict):
         """
         Verify and process Midtrans notification
         
@@ -110,7 +94,7 @@ class MidtransService:
             Dict with verification result and status
         """
         try:
-            status_response = self.core_api.transactions.notification(notification_data)
+            status_response = await self.client.notification(notification_data)
             
             order_id = status_response['order_id']
             transaction_status = status_response['transaction_status']
@@ -172,3 +156,9 @@ def get_midtrans_service():
     if _midtrans_service is None:
         _midtrans_service = MidtransService()
     return _midtrans_service
+
+
+@after_fork
+def _reset_midtrans_service():
+    global _midtrans_service
+    _midtrans_service = None
@@ -0,0 +1,216 @@
+"""
+Async Midtrans client.
+
+All payment routers talk to Midtrans through one AsyncMidtransClient per
+worker, built on a shared httpx.AsyncClient: connections are pooled and kept
+alive between calls, and a slow Midtrans response only suspends the request
+waiting for it instead of blocking the event loop (midtransclient uses
+`requests`).
+
+Every call has a timeout. Calls that fail with a 5xx status or a transport
+error are retried with exponential backoff. Creating a transaction is safe
+to retry because Midtrans rejects a second transaction with the same
+order_id instead of charging twice.
+
+Configuration comes from the environment: MIDTRANS_SERVER_KEY,
+MIDTRANS_IS_PRODUCTION, MIDTRANS_TIMEOUT (seconds, default 10),
+MIDTRANS_RETRIES (default 2), MIDTRANS_MAX_CONNECTIONS (default 20), and
+MIDTRANS_API_URL / MIDTRANS_SNAP_URL to point at another base URL.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+
+from utils.fork import after_fork
+
+logger = logging.getLogger(__name__)
+
+API_URLS = ("https://api.sandbox.midtrans.com", "https://api.midtrans.com")
+SNAP_URLS = ("https://app.sandbox.midtrans.com/snap/v1", "https://app.midtrans.com/snap/v1")
+
+
+class MidtransError(Exception):
+    """A failed Midtrans call. `status_code` is None when no response was received."""
+
+    def __init__(self, message: str, status_code: int = None, response: dict = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+class AsyncMidtransClient:
+    def __init__(self, server_key: str, is_production: bool = False, api_url: str = None,
+                 snap_url: str = None, timeout: float = 10.0, retries: int = 2,
+                 backoff: float = 0.25, max_connections: int = 20, transport=None):
+        self.server_key = server_key
+        self.is_production = is_production
+        self.api_url = (api_url or API_URLS[is_production]).rstrip("/")
+        self.snap_url = (snap_url or SNAP_URLS[is_production]).rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self._transport = transport
+        self._http = None
+        self.reset_stats()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            server_key=os.environ.get("MIDTRANS_SERVER_KEY", ""),
+            is_production=os.environ.get("MIDTRANS_IS_PRODUCTION", "False").lower() == "true",
+            api_url=os.environ.get("MIDTRANS_API_URL") or None,
+            snap_url=os.environ.get("MIDTRANS_SNAP_URL") or None,
+            timeout=float(os.environ.get("MIDTRANS_TIMEOUT", "10")),
+            retries=int(os.environ.get("MIDTRANS_RETRIES", "2")),
+            max_connections=int(os.environ.get("MIDTRANS_MAX_CONNECTIONS", "20")),
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.server_key)
+
+    def reset_stats(self):
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+        self.total_ms = 0.0
+
+    def _get_http(self):
+        if self._http is None:
+            import httpx  # deferred: only the payment paths need it
+            self._http = httpx.AsyncClient(
+                auth=(self.server_key, ""),
+                headers={"Accept": "application/json"},
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0
+                ),
+                transport=self._transport
+            )
+        return self._http
+
+    async def _request(self, method: str, url: str, payload: dict = None, timeout: float = None) -> dict:
+        import httpx
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            self.requests += 1
+            try:
+                response = await self._get_http().request(
+                    method, url, json=payload,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+                )
+                error = self._check(response)
+            except httpx.TransportError as e:
+                error = MidtransError(f"Midtrans tidak dapat dihubungi: {type(e).__name__} {str(e)}")
+            finally:
+                self.total_ms += (time.perf_counter() - started) * 1000
+
+            if error is None:
+                return response.json()
+            retryable = error.status_code is None or error.status_code >= 500
+            if not retryable or attempt >= self.retries:
+                self.failed += 1
+                raise error
+            attempt += 1
+            self.retried += 1
+            delay = self.backoff * 2 ** (attempt - 1)
+            logger.warning(f"Midtrans {method} {url} failed ({error}), retry {attempt} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _check(response):
+        """MidtransError for an error response, else None. Core API also reports errors in the body."""
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        status_code = response.status_code
+        if status_code < 400 and isinstance(body, dict) and str(body.get("status_code", "")).isdigit():
+            # 407 is an expired transaction: a valid status, not an error
+            if int(body["status_code"]) >= 400 and body["status_code"] != "407":
+                status_code = int(body["status_code"])
+        if status_code < 400 and body is not None:
+            return None
+        if isinstance(body, dict):
+            messages = body.get("error_messages") or [body.get("status_message")]
+            message = "; ".join(str(m) for m in messages if m)
+        else:
+            message = response.text[:200]
+        return MidtransError(f"Midtrans error {status_code}: {message}", status_code, body if isinstance(body, dict) else None)
+
+    async def create_snap_transaction(self, param: dict, timeout: float = None) -> dict:
+        """Snap transaction; returns {"token", "redirect_url"}."""
+        return await self._request("POST", f"{self.snap_url}/transactions", param, timeout)
+
+    async def charge(self, payload: dict, timeout: float = None) -> dict:
+        """Core API charge (e.g. QRIS)."""
+        return await self._request("POST", f"{self.api_url}/v2/charge", payload, timeout)
+
+    async def get_status(self, order_id: str, timeout: float = None) -> dict:
+        """Current transaction status of `order_id`."""
+        return await self._request("GET", f"{self.api_url}/v2/{order_id}/status", None, timeout)
+
+    async def notification(self, notification: dict, timeout: float = None) -> dict:
+        """
+        Status for a webhook payload. Like midtransclient, the payload is not
+        trusted: the status is fetched again from Midtrans by order_id.
+        """
+        order_id = notification.get("order_id") or notification.get("transaction_id")
+        if not order_id:
+            raise MidtransError("Notification tanpa order_id")
+        return await self.get_status(order_id, timeout)
+
+    def verify_signature(self, notification: dict) -> bool:
+        """Check signature_key = sha512(order_id + status_code + gross_amount + server key)."""
+        signature = notification.get("signature_key")
+        if not self.configured or not isinstance(signature, str):
+            return False
+        raw = (f"{notification.get('order_id')}{notification.get('status_code')}"
+               f"{notification.get('gross_amount')}{self.server_key}")
+        return hmac.compare_digest(hashlib.sha512(raw.encode()).hexdigest(), signature)
+
+    def stats(self) -> dict:
+        requests = self.requests or 1
+        return {
+            "configured": self.configured,
+            "requests": self.requests,
+            "retried": self.retried,
+            "failed": self.failed,
+            "avgMs": round(self.total_ms / requests, 2),
+        }
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+_client = None
+
+
+def get_midtrans_client() -> AsyncMidtransClient:
+    """The worker's shared client. Check `.configured` before relying on it."""
+    global _client
+    if _client is None:
+        _client = AsyncMidtransClient.from_env()
+    return _client
+
+
+async def close_midtrans_client():
+    if _client is not None:
+        await _client.aclose()
+
+
+@after_fork
+def _reset_midtrans_client():
+    # The parent's pooled connections must not be shared with the child
+    global _client
+    _client = None
@@ -0,0 +1,147 @@
+"""
+Per-route MongoDB command instrumentation.
+
+A pymongo CommandListener attributes every command to the HTTP request that
+issued it (via a context variable that Motor copies into its executor
+threads). The middleware reports the per-request totals in a Server-Timing
+header and folds them into per-route aggregates served by /api/admin/perf.
+
+Aggregates are per worker process.
+"""
+from pymongo import monitoring
+from utils.fork import after_fork
+import contextvars
+import threading
+import time
+
+_current_request = contextvars.ContextVar("mongo_request_stats", default=None)
+
+
+class RequestCommandStats:
+    """Mongo commands issued while handling one request."""
+
+    __slots__ = ("count", "total_ms", "slowest_ms", "slowest_command", "_lock")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_command = None
+        self._lock = threading.Lock()
+
+    def add(self, command_name: str, duration_ms: float):
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            if duration_ms > self.slowest_ms:
+                self.slowest_ms = duration_ms
+                self.slowest_command = command_name
+
+    def server_timing(self) -> str:
+        desc = f"{self.count} cmds"
+        if self.slowest_command:
+            desc += f", slowest {self.slowest_command} {self.slowest_ms:.1f}ms"
+        return f'mongo;dur={self.total_ms:.2f};desc="{desc}"'
+
+
+class CommandProfiler(monitoring.CommandListener):
+    """Feeds command durations into the stats of the current request."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        stats = _current_request.get()
+        if stats is not None:
+            stats.add(event.command_name, event.duration_micros / 1000)
+
+    def failed(self, event):
+        stats = _current_request.get()
+        if stats is not None:
+            stats.add(event.command_name, event.duration_micros / 1000)
+
+
+class RouteStats:
+    """Running per-route aggregates."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self.since = time.time()
+
+    def record(self, route: str, stats: RequestCommandStats, elapsed_ms: float):
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    "requests": 0,
+                    "commands": 0,
+                    "mongoMs": 0.0,
+                    "requestMs": 0.0,
+                    "maxCommandsPerRequest": 0,
+                    "slowestCommandMs": 0.0,
+                    "slowestCommand": None,
+                }
+            entry["requests"] += 1
+            entry["commands"] += stats.count
+            entry["mongoMs"] += stats.total_ms
+            entry["requestMs"] += elapsed_ms
+            entry["maxCommandsPerRequest"] = max(entry["maxCommandsPerRequest"], stats.count)
+            if stats.slowest_ms > entry["slowestCommandMs"]:
+                entry["slowestCommandMs"] = stats.slowest_ms
+                entry["slowestCommand"] = stats.slowest_command
+
+    def summary(self, top: int = 20, sort_by: str = "commands") -> list:
+        with self._lock:
+            rows = []
+            for route, entry in self._routes.items():
+                requests = entry["requests"]
+                rows.append({
+                    "route": route,
+                    "requests": requests,
+                    "commands": entry["commands"],
+                    "commandsPerRequest": round(entry["commands"] / requests, 2),
+                    "maxCommandsPerRequest": entry["maxCommandsPerRequest"],
+                    "mongoMs": round(entry["mongoMs"], 2),
+                    "avgMongoMs": round(entry["mongoMs"] / requests, 3),
+                    "avgRequestMs": round(entry["requestMs"] / requests, 3),
+                    "slowestCommand": entry["slowestCommand"],
+                    "slowestCommandMs": round(entry["slowestCommandMs"], 3),
+                })
+        rows.sort(key=lambda r: r.get(sort_by) or 0, reverse=True)
+        return rows[:top]
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+            self.since = time.time()
+
+
+command_profiler = CommandProfiler()
+route_stats = RouteStats()
+
+
+@after_fork
+def _reset_route_stats():
+    # Aggregates describe the worker that collected them. Re-initialised in
+    # place (admin.py holds a reference), which also replaces a lock a
+    # parent thread may have held at fork time.
+    route_stats.__init__()
+
+
+async def profile_mongo_commands(request, call_next):
+    """HTTP middleware: collect per-request command stats."""
+    stats = RequestCommandStats()
+    token = _current_request.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current_request.reset(token)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    route = request.scope.get("route")
+    if route is not None:
+        route_stats.record(f"{request.method} {route.path}", stats, elapsed_ms)
+    response.headers.append("Server-Timing", stats.server_timing())
+    return response
@@ -0,0 +1,99 @@
+"""
+Bounded executor for password hashing.
+
+bcrypt takes 100-300 ms of CPU per hash or check. Run inline in an async
+handler, it stalls every other request on the worker. Login, registration
+and password changes run it here instead, on a small thread pool (bcrypt
+releases the GIL while hashing).
+
+At most `workers` hashes run at once, and at most `max_queue` more may
+wait. Any request beyond that gets an immediate 503 with Retry-After, so a
+login burst cannot pile up unbounded work. Sizes come from
+PASSWORD_POOL_WORKERS / PASSWORD_POOL_QUEUE.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from utils.fork import after_fork
+
+
+class PasswordPool:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._reset()
+
+    def _reset(self):
+        self._executor = None
+        self.in_flight = 0
+        self.running = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_ms = 0.0
+        self.run_ms = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self._executor
+
+    def _timed(self, fn, args, queued_at):
+        started = time.perf_counter()
+        self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            self.running -= 1
+            self.wait_ms += (started - queued_at) * 1000
+            self.run_ms += (time.perf_counter() - started) * 1000
+
+    async def run(self, fn, *args):
+        """Run `fn(*args)` on the pool. Raises HTTPException(503) when the queue is full."""
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server sedang sibuk, silakan coba lagi sebentar",
+                headers={"Retry-After": "1"}
+            )
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), self._timed, fn, args, time.perf_counter()
+            )
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "maxQueue": self.max_queue,
+            "inFlight": self.in_flight,
+            "queued": max(self.in_flight - self.running, 0),
+            "peakInFlight": self.peak_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avgWaitMs": round(self.wait_ms / completed, 2),
+            "avgRunMs": round(self.run_ms / completed, 2),
+        }
+
+
+password_pool = PasswordPool(
+    workers=int(os.environ.get("PASSWORD_POOL_WORKERS", min(4, os.cpu_count() or 1))),
+    max_queue=int(os.environ.get("PASSWORD_POOL_QUEUE", "32"))
+)
+
+
+@after_fork
+def _reset_password_pool():
+    # The parent's threads do not exist in the child; start a fresh pool
+    password_pool._reset()
@@ -0,0 +1,179 @@
+"""
+Background payment reconciliation.
+
+Pending Midtrans orders (Snap payments in payment_proofs, QRIS top-ups in
+wallet_transactions) are checked against Midtrans by this loop rather than
+by the status endpoints the frontend polls; those read Mongo only. Upstream
+traffic therefore depends on the number of pending orders, not on how many
+browser tabs are polling.
+
+Each round a worker claims up to `batch_size` due orders per collection:
+a find_one_and_update on {"nextCheckAt" <= now} that pushes nextCheckAt one
+lease into the future, so several gunicorn workers never check the same
+order at once. Claimed orders are checked with at most `concurrency`
+Midtrans calls in flight, transitions are written through
+utils.payment_state, and orders that are still pending get their next
+check scheduled by age (payment_state.next_check_delay()).
+
+Sizes come from PAYMENT_RECONCILE_INTERVAL / _BATCH / _CONCURRENCY.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from database import get_db
+from utils.fork import after_fork
+from utils.midtrans_client import MidtransError, get_midtrans_client
+from utils.payment_state import apply_payment_status, apply_wallet_status, next_check_delay
+
+logger = logging.getLogger(__name__)
+
+db = get_db()
+
+# collection -> (filter selecting the Midtrans orders, transition function)
+RECONCILED = {
+    "payment_proofs": ({"status": "pending", "paymentMethod": "midtrans_snap"}, apply_payment_status),
+    "wallet_transactions": ({"status": "pending", "type": "topup", "paymentMethod": "qris"}, apply_wallet_status),
+}
+
+
+class PaymentReconciler:
+    def __init__(self, interval: float = 5.0, batch_size: int = 50, concurrency: int = 8,
+                 lease: timedelta = timedelta(minutes=2)):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.lease = lease
+        self._reset()
+
+    def _reset(self):
+        self._task = None
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._backfilled = False
+        self.rounds = 0
+        self.checked = 0
+        self.transitions = 0
+        self.errors = 0
+        self.given_up = 0
+
+    async def _backfill(self, now: datetime):
+        # Orders created before nextCheckAt existed are due right away
+        for collection, (query, _) in RECONCILED.items():
+            await db[collection].update_many(
+                {**query, "nextCheckAt": {"$exists": False}},
+                {"$set": {"nextCheckAt": now, "checkAttempts": 0}}
+            )
+        self._backfilled = True
+
+    async def _claim(self, collection: str, query: dict, now: datetime) -> list:
+        claimed = []
+        for _ in range(self.batch_size):
+            order = await db[collection].find_one_and_update(
+                {**query, "nextCheckAt": {"$lte": now}},
+                {"$set": {"nextCheckAt": now + self.lease}, "$inc": {"checkAttempts": 1}},
+                projection={"orderId": 1, "createdAt": 1},
+                sort=[("nextCheckAt", 1)]
+            )
+            if order is None:
+                break
+            claimed.append(order)
+        return claimed
+
+    async def _check(self, collection: str, apply, order: dict, semaphore: asyncio.Semaphore):
+        order_id = order["orderId"]
+        async with semaphore:
+            try:
+                status_response = await get_midtrans_client().get_status(order_id)
+            except MidtransError as e:
+                # 404: the customer has not picked a payment method in Snap yet
+                if e.status_code != 404:
+                    self.errors += 1
+                    logger.warning(f"Reconcile {order_id}: {str(e)}")
+                status_response = None
+        self.checked += 1
+
+        if status_response is not None:
+            status, changed = await apply(order_id, status_response)
+            if changed:
+                self.transitions += 1
+                logger.info(f"Reconciled {order_id}: {status}")
+                return
+
+        now = datetime.utcnow()
+        delay = next_check_delay(now - (order.get("createdAt") or now))
+        if delay is None:
+            self.given_up += 1
+            logger.warning(f"Reconcile {order_id}: still pending, no longer checked")
+        await db[collection].update_one(
+            {"_id": order["_id"], "status": "pending"},
+            {"$set": {"nextCheckAt": now + delay if delay is not None else None}}
+        )
+
+    async def run_once(self) -> int:
+        """Check every due order once. Returns how many were checked."""
+        now = datetime.utcnow()
+        if not self._backfilled:
+            await self._backfill(now)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        checks = []
+        for collection, (query, apply) in RECONCILED.items():
+            for order in await self._claim(collection, query, now):
+                checks.append(self._check(collection, apply, order, semaphore))
+        await asyncio.gather(*checks)
+        self.rounds += 1
+        return len(checks)
+
+    async def _run(self):
+        while not self._stopping:
+            full = False
+            if get_midtrans_client().configured:
+                try:
+                    # A full batch means more orders are due: go again at once
+                    full = await self.run_once() >= self.batch_size
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Payment reconciliation failed: {str(e)}")
+            if not full:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wakeup.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Let the round in progress finish; claimed orders would otherwise
+        # wait out their lease
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "rounds": self.rounds,
+            "checked": self.checked,
+            "transitions": self.transitions,
+            "errors": self.errors,
+            "givenUp": self.given_up,
+        }
+
+
+payment_reconciler = PaymentReconciler(
+    interval=float(os.environ.get("PAYMENT_RECONCILE_INTERVAL", "5")),
+    batch_size=int(os.environ.get("PAYMENT_RECONCILE_BATCH", "50")),
+    concurrency=int(os.environ.get("PAYMENT_RECONCILE_CONCURRENCY", "8"))
+)
+
+
+@after_fork
+def _reset_payment_reconciler():
+    payment_reconciler._reset()
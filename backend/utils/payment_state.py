@@ -0,0 +1,269 @@
+"""
+Payment state transitions shared by webhooks (utils.webhook_events), status
+polls and the background reconciler (utils.payment_reconciler).
+
+Midtrans statuses are resolved to "settlement", "pending" or "failed".
+A record only moves out of "pending" once: the transition is a conditional
+update on {"status": "pending"}, and its side effects (approving the user,
+referral bonus, wallet credit via utils.wallet_ledger) run only for the
+caller that made it. A webhook and the reconciler seeing the same
+settlement therefore credit it once. Wallet top-ups are credited before
+the transition instead, idempotently per order (utils.wallet_ledger), so a
+failed credit leaves the top-up pending for a retry.
+
+Pending Midtrans records carry `nextCheckAt`, the time the reconciler should
+ask Midtrans about them again; see next_check_delay().
+"""
+import logging
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from database import get_db
+from utils.user_cache import invalidate_user
+from utils.wallet_ledger import credit
+
+logger = logging.getLogger(__name__)
+
+db = get_db()
+
+# (order age limit, delay before the next status check). Fresh orders are
+# checked often; the longer an order stays pending, the less likely it is
+# to be paid in the next few seconds.
+CHECK_SCHEDULE = [
+    (timedelta(minutes=10), timedelta(seconds=15)),
+    (timedelta(hours=1), timedelta(minutes=1)),
+    (timedelta(hours=6), timedelta(minutes=5)),
+    (timedelta(hours=48), timedelta(minutes=30)),
+]
+
+
+def resolve_status(transaction_status: str, fraud_status: str = None) -> str:
+    """Map a Midtrans transaction_status to settlement / pending / failed."""
+    if transaction_status == "capture":
+        return "settlement" if fraud_status in (None, "accept") else "pending"
+    if transaction_status == "settlement":
+        return "settlement"
+    if transaction_status in ("cancel", "deny", "expire", "failure"):
+        return "failed"
+    return "pending"
+
+
+def next_check_delay(age: timedelta):
+    """Delay before re-checking an order of this age; None once it is too old to poll."""
+    for max_age, delay in CHECK_SCHEDULE:
+        if age < max_age:
+            return delay
+    return None
+
+
+def initial_check_fields(now: datetime = None) -> dict:
+    """Fields for a new pending Midtrans record so the reconciler picks it up."""
+    now = now or datetime.utcnow()
+    return {"nextCheckAt": now + CHECK_SCHEDULE[0][1], "checkAttempts": 0}
+
+
+async def credit_referral_bonus(referral_code: str, referred_user_id: str):
+    """Credit referral bonus when payment is successful"""
+    try:
+        referrer = await db.users.find_one({"myReferralCode": referral_code}, {"email": 1})
+        if referrer:
+            # Get bonus amount from settings
+            ref_settings = await db.referral_settings.find_one({})
+            bonus_amount = ref_settings.get("bonusPerReferral", 10000) if ref_settings else 10000
+
+            # Update referral transaction status
+            await db.referral_transactions.update_one(
+                {"referrerId": str(referrer["_id"]), "referredId": referred_user_id, "status": "pending"},
+                {"$set": {
+                    "status": "credited",
+                    "creditedAt": datetime.utcnow()
+                }}
+            )
+
+            # Add bonus to referrer
+            await db.users.update_one(
+                {"_id": referrer["_id"]},
+                {"$inc": {"referralBonus": bonus_amount}}
+            )
+            await invalidate_user(referrer["_id"])
+
+            logger.info(f"Credited {bonus_amount} to referrer {referrer['email']}")
+    except Exception as e:
+        logger.error(f"Error crediting referral bonus: {str(e)}")
+
+
+async def apply_payment_status(order_id: str, status_response: dict):
+    """
+    Record a Midtrans status for a payment_proofs order. Returns (status,
+    changed): the resolved status, and whether this call moved the record
+    out of "pending". None status when the order is unknown.
+    """
+    transaction_status = status_response.get("transaction_status")
+    fraud_status = status_response.get("fraud_status")
+    final_status = resolve_status(transaction_status, fraud_status)
+    now = datetime.utcnow()
+    fields = {
+        "transactionStatus": transaction_status,
+        "fraudStatus": fraud_status,
+        "midtransStatusResponse": status_response,
+        "updatedAt": now
+    }
+
+    if final_status == "pending":
+        result = await db.payment_proofs.update_one({"orderId": order_id, "status": "pending"}, {"$set": fields})
+        return ("pending" if result.matched_count else await _current_status(order_id)), False
+
+    payment = await db.payment_proofs.find_one_and_update(
+        {"orderId": order_id, "status": "pending"},
+        {"$set": {**fields, "status": final_status, "nextCheckAt": None}},
+        projection={"userId": 1}
+    )
+    if payment is None:
+        return await _current_status(order_id), False
+
+    user_id = payment.get("userId")
+    if user_id and final_status == "settlement":
+        await db.users.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$set": {
+                "paymentStatus": "approved",
+                "paymentDate": now,
+                "paidTestStatus": "in_progress"  # Allow user to take paid test
+            }}
+        )
+        await invalidate_user(user_id)
+
+        # Credit referral bonus if user used a referral code
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, {"usedReferralCode": 1})
+        if user and user.get("usedReferralCode"):
+            await credit_referral_bonus(user.get("usedReferralCode"), user_id)
+        logger.info(f"User {user_id} payment approved for order {order_id}")
+    elif user_id:
+        # Only reset the user if this was the order they were paying with
+        result = await db.users.update_one(
+            {"_id": ObjectId(user_id), "currentOrderId": order_id, "paymentStatus": {"$ne": "approved"}},
+            {"$set": {
+                "paymentStatus": "unpaid",
+                "currentOrderId": None
+            }}
+        )
+        if result.modified_count:
+            await invalidate_user(user_id)
+        logger.info(f"Payment failed for order {order_id}")
+    return final_status, True
+
+
+async def _current_status(order_id: str):
+    payment = await db.payment_proofs.find_one({"orderId": order_id}, {"status": 1})
+    return payment.get("status") if payment else None
+
+
+async def apply_wallet_status(order_id: str, status_response: dict):
+    """
+    Record a Midtrans status for a wallet top-up. Returns (status, changed)
+    like apply_payment_status(); status is the wallet_transactions status
+    (pending / success / failed).
+    """
+    transaction_status = status_response.get("transaction_status")
+    final_status = resolve_status(transaction_status, status_response.get("fraud_status"))
+    now = datetime.utcnow()
+    fields = {
+        "transactionStatus": transaction_status,
+        "midtransStatusResponse": status_response,
+        "updatedAt": now
+    }
+
+    if final_status == "pending":
+        result = await db.wallet_transactions.update_one({"orderId": order_id, "status": "pending"}, {"$set": fields})
+        if result.matched_count:
+            return "pending", False
+    else:
+        new_status = "success" if final_status == "settlement" else "failed"
+        transaction = await db.wallet_transactions.find_one(
+            {"orderId": order_id, "status": "pending"}, {"userId": 1, "amount": 1}
+        )
+        if transaction is not None:
+            if new_status == "success":
+                # Credit before leaving "pending": if this fails the top-up
+                # stays pending and the retry credits it. The credit is keyed
+                # on the order id, so a retry or a racing caller adds nothing.
+                await credit(transaction["userId"], transaction["amount"], "topup", order_id)
+            result = await db.wallet_transactions.update_one(
+                {"_id": transaction["_id"], "status": "pending"},
+                {"$set": {**fields, "status": new_status, "nextCheckAt": None}}
+            )
+            if result.modified_count:
+                return new_status, True
+
+    transaction = await db.wallet_transactions.find_one({"orderId": order_id}, {"status": 1})
+    return (transaction.get("status") if transaction else None), False
+
+
+# Shop orders keep the raw Midtrans transaction_status. A status may only
+# replace one of these, so a late or replayed event never moves an order
+# backwards (e.g. a retried "pending" after "settlement"); statuses not
+# listed here only replace "pending".
+TRANSACTION_PREDECESSORS = {
+    "pending": ["pending", None],
+    "capture": ["pending", None],
+    "settlement": ["pending", "capture", None],
+    "deny": ["pending", "capture", None],
+    "cancel": ["pending", "capture", None],
+    "refund": ["settlement", "capture", "partial_refund"],
+    "partial_refund": ["settlement", "capture", "partial_refund"],
+    "chargeback": ["settlement", "capture", "partial_refund"],
+}
+
+
+async def apply_transaction_status(order_id: str, notification: dict):
+    """
+    Record a Midtrans status (webhook payload or status response) for a shop
+    order in `transactions`. The update only applies when the current status
+    may move to the new one (TRANSACTION_PREDECESSORS), so product stock is
+    released once, by whichever caller moves the order to settlement.
+    Returns (status, changed): the order's status afterwards, and whether
+    this call moved it. None status when the order is unknown.
+    """
+    transaction_status = notification.get("transaction_status")
+    now = datetime.utcnow()
+    update_data = {
+        "status": transaction_status,
+        "payment_type": notification.get("payment_type"),
+        "fraud_status": notification.get("fraud_status", "accept"),
+        "updated_at": now,
+        "webhook_data": notification
+    }
+    if transaction_status == "settlement":
+        update_data["settled_at"] = now
+    elif transaction_status == "expire":
+        update_data["expired_at"] = now
+
+    previous = await db.transactions.find_one_and_update(
+        {"order_id": order_id, "status": {"$in": TRANSACTION_PREDECESSORS.get(transaction_status, ["pending", None])}},
+        {"$set": update_data},
+        projection={"status": 1, "items": 1}
+    )
+    if previous is None:
+        current = await db.transactions.find_one({"order_id": order_id}, {"status": 1})
+        return (current.get("status") if current else None), False
+    if transaction_status == "settlement":
+        # Grant access to purchased items
+        await handle_successful_payment(order_id, previous.get("items", []))
+    return transaction_status, previous.get("status") != transaction_status
+
+
+async def handle_successful_payment(order_id: str, items: list):
+    """
+    Handle successful payment - update product stock, etc.
+    """
+    try:
+        # Update product stock for each item
+        for item in items:
+            await db.products.update_one(
+                {"_id": ObjectId(item['id'])},
+                {"$inc": {"stock": -item['quantity']}}
+            )
+        logger.info(f"Processed successful payment for order: {order_id}")
+    except Exception as e:
+        logger.error(f"Error processing payment: {str(e)}")
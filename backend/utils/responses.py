@@ -0,0 +1,95 @@
+"""
+BSON-aware JSON responses.
+
+BSONJSONResponse renders with orjson in one pass; ObjectId, datetime and
+Decimal128 values straight from Motor are handled natively, so routes can
+return raw documents without stringifying `_id` first.
+
+BSONRoute skips FastAPI's response_model validation and jsonable_encoder for
+routes declared with `response_model=dict` / `List[dict]` (or none), which
+only re-walk the payload. Routes with a Pydantic response model keep the
+normal path so field filtering still applies.
+"""
+from bson import Decimal128, ObjectId
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from typing import Any, get_args, get_origin
+import asyncio
+import functools
+import orjson
+
+_PASSTHROUGH_TYPES = (dict, list, str, Any)
+
+
+def bson_default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=bson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class BSONJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """True when an If-None-Match header value matches `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _is_passthrough(model) -> bool:
+    if model is None or model in _PASSTHROUGH_TYPES:
+        return True
+    return get_origin(model) in (dict, list) and all(arg in _PASSTHROUGH_TYPES for arg in get_args(model))
+
+
+class BSONRoute(APIRoute):
+    """APIRoute that returns plain payloads as BSONJSONResponse directly."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        if _is_passthrough(self.response_model):
+            self.dependant.call = self._wrap(self.dependant.call)
+
+    def _to_response(self, result, values: dict):
+        if isinstance(result, Response):
+            return result
+        # Carry over status/headers set through an injected `response: Response`
+        sub_response = next((v for v in values.values() if isinstance(v, Response)), None)
+        status_code = self.status_code or 200
+        if sub_response is not None and sub_response.status_code:
+            status_code = sub_response.status_code
+        response = BSONJSONResponse(result, status_code=status_code)
+        if sub_response is not None:
+            for key, value in sub_response.headers.raw:
+                if key != b"content-length":
+                    response.raw_headers.append((key, value))
+        return response
+
+    def _wrap(self, call):
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def endpoint(**values):
+                return self._to_response(await call(**values), values)
+        else:
+            @functools.wraps(call)
+            def endpoint(**values):
+                return self._to_response(call(**values), values)
+        return endpoint
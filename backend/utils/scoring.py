@@ -0,0 +1,208 @@
+"""
+Compiled scoring tables for the personality tests.
+
+The question bank and the personality descriptions only change through
+admin edits, so POST /api/personality-tests/submit scores against in-memory
+copies: per testType a map of question id -> per-option tuple of
+(personalityType, points) pairs. The tables are rebuilt when the "questions"
+(or "personality_descriptions") version is bumped.
+
+Batch scoring (POST /submit-batch) uses WeightTensor, the same table as a
+dense question x option x trait NumPy array. NumPy is imported on first use.
+"""
+from database import get_db
+from utils.cache_versions import PERSONALITY_DESCRIPTIONS, QUESTIONS, VersionedCache
+
+db = get_db()
+
+
+async def _load_scoring_tables():
+    cursor = db.questions.find(
+        {"scoring": {"$exists": True}},
+        {"_id": 0, "id": 1, "testType": 1, "scoring": 1}
+    )
+    tables = {}
+    async for question in cursor:
+        table = tables.setdefault(question.get("testType"), {})
+        table[question["id"]] = tuple(
+            tuple(option.get("score", {}).items()) for option in question["scoring"]
+        )
+    return tables
+
+
+async def _load_descriptions():
+    cursor = db.personality_descriptions.find({}, {"_id": 0, "personalityType": 1, "data": 1})
+    return {doc["personalityType"]: doc.get("data") async for doc in cursor}
+
+
+scoring_cache = VersionedCache(QUESTIONS, _load_scoring_tables)
+descriptions_cache = VersionedCache(PERSONALITY_DESCRIPTIONS, _load_descriptions)
+_tensors = {}
+
+
+async def get_scoring_table(test_type: str) -> dict:
+    """{question id: per-option ((personalityType, points), ...)} for `test_type`."""
+    tables = await scoring_cache.get()
+    return tables.get(test_type, {})
+
+
+async def get_description(personality_type: str):
+    """The `data` of a personality description, or None."""
+    descriptions = await descriptions_cache.get()
+    return descriptions.get(personality_type)
+
+
+class InvalidAnswer(ValueError):
+    def __init__(self, entry, question_id: str, option: int):
+        message = f"Option {option} is not valid for question {question_id}"
+        if entry is not None:
+            message = f"Submission {entry}: option {option} is not valid for question {question_id}"
+        super().__init__(message)
+        self.entry = entry
+
+
+def score_answers(table: dict, answers) -> dict:
+    """
+    Sum the option scores of `answers` per personality type. Unknown
+    questions are skipped. Raises InvalidAnswer.
+    """
+    scores = {}
+    for answer in answers:
+        options = table.get(answer.questionId)
+        if options is None:
+            continue
+        if not 0 <= answer.selectedOption < len(options):
+            raise InvalidAnswer(None, answer.questionId, answer.selectedOption)
+        for personality_type, points in options[answer.selectedOption]:
+            scores[personality_type] = scores.get(personality_type, 0) + points
+    return scores
+
+
+class WeightTensor:
+    """
+    A scoring table as a dense (question, option, trait) weight array,
+    flattened to (question * option, trait) so an answer is a row index.
+    """
+
+    def __init__(self, table: dict):
+        import numpy as np
+
+        self.question_index = {question_id: i for i, question_id in enumerate(table)}
+        self.traits = []
+        trait_index = {}
+        for options in table.values():
+            for option in options:
+                for trait, _ in option:
+                    if trait not in trait_index:
+                        trait_index[trait] = len(self.traits)
+                        self.traits.append(trait)
+
+        self.option_counts = [len(options) for options in table.values()]
+        self.max_options = max(self.option_counts, default=0)
+        shape = (len(table), self.max_options, len(self.traits))
+        weights = np.zeros(shape)
+        # Order of the trait within the option's score dict, 0 = not scored
+        rank = np.zeros(shape)
+        for q, options in enumerate(table.values()):
+            for o, option in enumerate(options):
+                for r, (trait, points) in enumerate(option, start=1):
+                    weights[q, o, trait_index[trait]] += points
+                    rank[q, o, trait_index[trait]] = r
+        self.integral = bool(np.all(weights == np.round(weights)))
+        self.weights = weights.reshape(-1, len(self.traits))
+        self.rank = rank.reshape(-1, len(self.traits))
+
+    def score(self, answer_lists):
+        """
+        Score many submissions at once. Returns (scores, first): N x trait
+        arrays of summed points (as score_answers() per row) and of the
+        position at which the trait was first scored (answer order, then
+        order within the option), inf when it never was. Raises InvalidAnswer.
+        """
+        import numpy as np
+
+        rows, flat = [], []
+        for n, answers in enumerate(answer_lists):
+            for answer in answers:
+                q = self.question_index.get(answer.questionId)
+                if q is None:
+                    continue
+                if not 0 <= answer.selectedOption < self.option_counts[q]:
+                    raise InvalidAnswer(n, answer.questionId, answer.selectedOption)
+                rows.append(n)
+                flat.append(q * self.max_options + answer.selectedOption)
+
+        n_entries = len(answer_lists)
+        rows = np.asarray(rows, dtype=np.intp)
+        flat = np.asarray(flat, dtype=np.intp)
+        weights = self.weights[flat]
+        rank = self.rank[flat]
+        positions = np.arange(len(flat), dtype=float) * (len(self.traits) + 1)
+        scores = np.zeros((n_entries, len(self.traits)))
+        first = np.full((n_entries, len(self.traits)), np.inf)
+        for t in range(len(self.traits)):
+            scores[:, t] = np.bincount(rows, weights=weights[:, t], minlength=n_entries)
+            hit = rank[:, t] > 0
+            np.minimum.at(first[:, t], rows[hit], positions[hit] + rank[hit, t])
+        return scores, first
+
+
+async def get_weight_tensor(test_type: str):
+    """WeightTensor for `test_type`, rebuilt with the scoring table. None for unknown types."""
+    table = await get_scoring_table(test_type)
+    if not table:
+        return None
+    version = scoring_cache.version
+    cached = _tensors.get(test_type)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    tensor = WeightTensor(table)
+    _tensors[test_type] = (version, tensor)
+    return tensor
+
+
+def score_batch(tensor: WeightTensor, answer_lists):
+    """
+    Score a cohort. Returns (results, cohort): per submission a
+    (personalityType, scores) pair or None when no answer counted, and the
+    result / per-trait score distributions of the scored submissions.
+    """
+    import numpy as np
+
+    scores, first = tensor.score(answer_lists)
+    scored = np.isfinite(first)
+    valid = scored.any(axis=1)
+    # Highest score among the traits that received points; like max() over
+    # the score_answers() dict, ties go to the trait that was scored first
+    masked = np.where(scored, scores, -np.inf)
+    leaders = scored & (masked == masked.max(axis=1, keepdims=True))
+    winners = np.where(leaders, first, np.inf).argmin(axis=1)
+
+    cast = int if tensor.integral else float
+    results = []
+    for row, row_scored, winner, ok in zip(scores.tolist(), scored.tolist(), winners.tolist(), valid.tolist()):
+        if not ok:
+            results.append(None)
+            continue
+        row_scores = {trait: cast(value) for trait, value, hit in zip(tensor.traits, row, row_scored) if hit}
+        results.append((tensor.traits[winner], row_scores))
+
+    total = int(valid.sum())
+    counts = np.bincount(winners[valid], minlength=len(tensor.traits))
+    distribution = {
+        trait: {"count": int(count), "percentage": round(100.0 * count / total, 2) if total else 0.0}
+        for trait, count in zip(tensor.traits, counts.tolist())
+    }
+    traits = {}
+    if total:
+        cohort_scores = scores[valid]
+        for t, trait in enumerate(tensor.traits):
+            column = cohort_scores[:, t]
+            traits[trait] = {
+                "mean": round(float(column.mean()), 2),
+                "std": round(float(column.std()), 2),
+                "min": cast(column.min()),
+                "max": cast(column.max()),
+                "median": float(np.median(column)),
+            }
+    return results, {"scored": total, "distribution": distribution, "traits": traits}
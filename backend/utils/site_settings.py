@@ -0,0 +1,29 @@
+"""
+Cached site settings.
+
+The single `settings` document is read on every page load and by the payment
+routes but changes rarely. The cache holds the document together with its
+serialized JSON so GET /api/settings can return the bytes as-is. Writers
+call `await bump(SETTINGS)`.
+"""
+from database import get_db
+from utils.cache_versions import VersionedCache
+from utils.responses import dumps
+
+db = get_db()
+
+SETTINGS = "settings"
+
+
+async def _load_settings():
+    settings = await db.settings.find_one()
+    return settings, dumps(settings) if settings else None
+
+
+settings_cache = VersionedCache(SETTINGS, _load_settings)
+
+
+async def get_site_settings():
+    """The settings document, or None. Shared between requests - do not mutate."""
+    settings, _ = await settings_cache.get()
+    return settings
@@ -0,0 +1,12 @@
+"""
+Upload directories are created on first write rather than at import time,
+so importing a router has no filesystem side effects.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+
+@lru_cache(maxsize=None)
+def ensure_dir(path: Path) -> Path:
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -0,0 +1,117 @@
+"""
+Authenticated-user cache.
+
+get_current_user() runs on every authenticated request. Instead of loading
+the full user document (answers, AI analysis) each time, it reads a slim
+projection from a per-worker LRU with a short TTL.
+
+Writers that change a user's ban state, profile, test/payment status or
+delete them call `await invalidate_user(user_id)`: the entry is dropped
+here and the user id is stamped in `user_invalidations`. Every worker polls
+that collection at most once per INVALIDATION_POLL seconds for ids stamped
+since its last poll and drops just those users, so one user's change no
+longer empties every worker's cache. Bumping the shared "users" version
+(bulk migrations) still clears the whole cache.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from database import get_db
+from utils.cache_versions import USERS, current_versions
+from utils.fork import after_fork
+
+db = get_db()
+
+# Payloads that live in user_test_answers / ai_analyses since
+# migrate_user_payloads.py; excluded for documents not migrated yet
+BULKY_FIELDS = {
+    "freeTestAnswers": 0,
+    "paidTestAnswers": 0,
+    "lastAnalysis": 0,
+}
+SLIM_PROJECTION = {**BULKY_FIELDS, "hashedPassword": 0}
+
+MAX_ENTRIES = 10000
+TTL_SECONDS = 60.0
+INVALIDATION_POLL = 1.0
+# Re-read stamps this far back so clock differences between hosts and
+# stamps written during a poll are not missed; dropping an entry twice is
+# harmless
+INVALIDATION_OVERLAP = timedelta(seconds=5)
+
+
+class _UserCache:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.version = None
+        self.polled_at = 0.0
+        self.since = None
+        self.hits = 0
+        self.misses = 0
+
+
+_cache = _UserCache()
+
+
+@after_fork
+def _reset_cache():
+    _cache.__init__()
+
+
+async def get_cached_user(user_id: str):
+    """The slim user document for `user_id`, or None. Shared between requests - do not mutate."""
+    version = await current_versions((USERS,))
+    if version != _cache.version:
+        _cache.entries.clear()
+        _cache.version = version
+    await _drop_invalidated()
+
+    now = time.monotonic()
+    entry = _cache.entries.get(user_id)
+    if entry is not None and entry[1] > now:
+        _cache.entries.move_to_end(user_id)
+        _cache.hits += 1
+        return entry[0]
+
+    _cache.misses += 1
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, SLIM_PROJECTION)
+    if user is not None:
+        _cache.entries[user_id] = (user, now + TTL_SECONDS)
+        _cache.entries.move_to_end(user_id)
+        while len(_cache.entries) > MAX_ENTRIES:
+            _cache.entries.popitem(last=False)
+    else:
+        _cache.entries.pop(user_id, None)
+    return user
+
+
+async def _drop_invalidated():
+    """Drop users invalidated by other workers since the last poll."""
+    now = time.monotonic()
+    if now - _cache.polled_at < INVALIDATION_POLL:
+        return
+    _cache.polled_at = now
+    started = datetime.utcnow()
+    if _cache.since is not None and _cache.entries:
+        cursor = db.user_invalidations.find({"at": {"$gte": _cache.since - INVALIDATION_OVERLAP}}, {"_id": 1})
+        async for doc in cursor:
+            _cache.entries.pop(doc["_id"], None)
+    _cache.since = started
+
+
+async def invalidate_user(user_id):
+    """Drop `user_id` from the cache in every worker."""
+    user_id = str(user_id)
+    _cache.entries.pop(user_id, None)
+    await db.user_invalidations.update_one(
+        {"_id": user_id},
+        {"$set": {"at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def cache_stats() -> dict:
+    return {"entries": len(_cache.entries), "hits": _cache.hits, "misses": _cache.misses}
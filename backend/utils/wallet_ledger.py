@@ -0,0 +1,166 @@
+"""
+Wallet balances with an append-only ledger.
+
+The ledger is the record: every balance change is one insert into
+`wallet_ledger` of {userId, seq, amount, balanceAfter, type, refId}, where
+seq follows the wallet's latest entry and balanceAfter is that entry's
+balance plus `amount`. The unique (userId, seq) index makes the insert the
+only write that has to succeed: two concurrent changes computed from the
+same entry cannot both land, and the loser re-reads and tries again. A
+debit is refused with InsufficientBalance when the latest balance does not
+cover it, so concurrent payments cannot overdraw.
+
+The unique (type, refId) index makes changes with a reference idempotent:
+crediting the same top-up twice returns the first entry instead of adding
+the money again, so callers can retry after an error.
+
+The balance is the latest entry's balanceAfter. The `wallets` document is
+a copy updated after each entry (and by the next change if that update was
+lost); wallets from before the ledger use it as their opening balance.
+
+Every SNAPSHOT_EVERY entries the balance is copied to `wallet_snapshots`,
+and a wallet's first entry records its opening balance as snapshot 0.
+verify_balance() recomputes a balance from the latest snapshot plus the
+entries after it.
+"""
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from database import get_db
+
+db = get_db()
+
+SNAPSHOT_EVERY = 100
+MAX_ATTEMPTS = 50
+
+
+class InsufficientBalance(Exception):
+    pass
+
+
+async def _latest(user_id: str):
+    """(seq, balance) of the wallet's latest ledger entry, or (0, opening balance)."""
+    entry = await db.wallet_ledger.find_one(
+        {"userId": user_id}, {"seq": 1, "balanceAfter": 1}, sort=[("seq", -1)]
+    )
+    if entry is not None:
+        return entry["seq"], entry["balanceAfter"]
+    wallet = await db.wallets.find_one({"userId": user_id}, {"balance": 1})
+    return 0, (wallet.get("balance", 0) if wallet else 0)
+
+
+async def get_balance(user_id: str) -> int:
+    _, balance = await _latest(user_id)
+    return balance
+
+
+async def _sync_wallet(user_id: str, seq: int, balance: int, now: datetime):
+    """Copy the balance to the wallets document unless a later entry got there first."""
+    try:
+        await db.wallets.update_one(
+            {"userId": user_id, "$or": [{"seq": {"$lt": seq}}, {"seq": {"$exists": False}}]},
+            {"$set": {"balance": balance, "seq": seq, "updatedAt": now}, "$setOnInsert": {"createdAt": now}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The wallet already holds a later entry
+        pass
+
+
+async def _snapshot(user_id: str, seq: int, balance: int, now: datetime):
+    try:
+        await db.wallet_snapshots.insert_one({"userId": user_id, "seq": seq, "balance": balance, "createdAt": now})
+    except DuplicateKeyError:
+        pass
+
+
+async def _existing(kind: str, ref_id: str):
+    if ref_id is None:
+        return None
+    return await db.wallet_ledger.find_one({"type": kind, "refId": ref_id})
+
+
+async def _append(user_id: str, amount: int, kind: str, ref_id: str, description: str = None) -> dict:
+    for _ in range(MAX_ATTEMPTS):
+        seq, balance = await _latest(user_id)
+        if balance + amount < 0:
+            # A retried debit that already went through is not an overdraft
+            existing = await _existing(kind, ref_id)
+            if existing is not None:
+                return existing
+            raise InsufficientBalance()
+
+        now = datetime.utcnow()
+        entry = {
+            "userId": user_id,
+            "seq": seq + 1,
+            "amount": amount,
+            "balanceAfter": balance + amount,
+            "type": kind,
+            "refId": ref_id,
+            "description": description,
+            "createdAt": now
+        }
+        try:
+            await db.wallet_ledger.insert_one(entry)
+        except DuplicateKeyError:
+            # Either this change was already recorded, or another change
+            # took this seq; then start again from the new latest entry
+            existing = await _existing(kind, ref_id)
+            if existing is not None:
+                return existing
+            continue
+
+        if entry["seq"] == 1:
+            await _snapshot(user_id, 0, balance, now)
+        if entry["seq"] % SNAPSHOT_EVERY == 0:
+            await _snapshot(user_id, entry["seq"], entry["balanceAfter"], now)
+        await _sync_wallet(user_id, entry["seq"], entry["balanceAfter"], now)
+        return entry
+    raise RuntimeError(f"Wallet {user_id} is too busy, try again")
+
+
+async def credit(user_id: str, amount: int, kind: str, ref_id: str, description: str = None) -> dict:
+    """
+    Add `amount` to the wallet. Returns the ledger entry; for a (kind,
+    ref_id) already in the ledger, the existing entry without adding again.
+    """
+    if amount <= 0:
+        raise ValueError("Credit amount must be positive")
+    return await _append(user_id, amount, kind, ref_id, description)
+
+
+async def debit(user_id: str, amount: int, kind: str, ref_id: str, description: str = None) -> dict:
+    """Take `amount` from the wallet if the balance covers it, else raise InsufficientBalance."""
+    if amount <= 0:
+        raise ValueError("Debit amount must be positive")
+    return await _append(user_id, -amount, kind, ref_id, description)
+
+
+async def verify_balance(user_id: str) -> dict:
+    """Recompute the balance from the latest snapshot and the ledger entries after it."""
+    seq, balance = await _latest(user_id)
+    wallet = await db.wallets.find_one({"userId": user_id}, {"balance": 1})
+    snapshot = await db.wallet_snapshots.find_one({"userId": user_id}, sort=[("seq", -1)])
+    if snapshot is None:
+        # No ledger history yet (e.g. a wallet from before the ledger)
+        snapshot = {"seq": 0, "balance": balance if not seq else 0}
+    base_seq = snapshot["seq"]
+    computed = snapshot["balance"]
+    entries = 0
+    async for entry in db.wallet_ledger.find({"userId": user_id, "seq": {"$gt": base_seq}}, {"amount": 1}):
+        computed += entry["amount"]
+        entries += 1
+
+    return {
+        "userId": user_id,
+        "balance": balance,
+        "computedBalance": computed,
+        "walletBalance": wallet.get("balance", 0) if wallet else 0,
+        "snapshotSeq": base_seq,
+        "entriesSinceSnapshot": entries,
+        # Gaps in the seq chain (entries deleted from the ledger)
+        "missingEntries": max(seq - base_seq - entries, 0),
+        "consistent": balance == computed and seq - base_seq == entries
+    }
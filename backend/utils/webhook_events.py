@@ -0,0 +1,227 @@
+"""
+Queue-backed processing of Midtrans notifications.
+
+routes/webhooks.py verifies a notification's signature and stores it in
+`webhook_events` under a dedupe key (order id + transaction status, + fraud
+status when present), then answers 200 straight away. A Midtrans retry of
+a notification that is already stored hits the same _id and is dropped,
+unless the stored event was given up on ("ignored" or "failed"), in which
+case it is queued again.
+
+A pool of worker tasks per process claims queued events (status "queued" ->
+"processing", with a lease) and applies them through utils.payment_state
+to whichever collection holds the order: payment_proofs,
+wallet_transactions or transactions. Events for the same order are
+processed one at a time within a process; across processes, the
+transitions themselves are conditional updates, so a duplicate cannot
+credit twice.
+
+A failed event is retried with exponential backoff, and after MAX_ATTEMPTS
+it is marked "failed". An event whose order is not found (yet) is retried
+the same way and marked "ignored" after MAX_ATTEMPTS. An event left "processing" by a killed worker
+is queued again when its lease runs out. Pool size comes from
+WEBHOOK_WORKERS.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from database import get_db
+from utils.fork import after_fork
+from utils.payment_state import apply_payment_status, apply_transaction_status, apply_wallet_status
+
+logger = logging.getLogger(__name__)
+
+db = get_db()
+
+MAX_ATTEMPTS = 8
+LEASE = timedelta(minutes=2)
+
+# (collection, order id field, transition function), tried in order
+TARGETS = [
+    ("payment_proofs", "orderId", apply_payment_status),
+    ("wallet_transactions", "orderId", apply_wallet_status),
+    ("transactions", "order_id", apply_transaction_status),
+]
+
+
+def event_id(notification: dict) -> str:
+    """Dedupe key of a notification."""
+    parts = [str(notification.get("order_id")), str(notification.get("transaction_status"))]
+    if notification.get("fraud_status"):
+        parts.append(str(notification["fraud_status"]))
+    return ":".join(parts)
+
+
+async def process_notification(notification: dict):
+    """Apply a notification to the order it belongs to. Returns e.g. "payment_proofs:settlement", or None."""
+    order_id = notification.get("order_id")
+    for collection, field, apply in TARGETS:
+        if await db[collection].find_one({field: order_id}, {"_id": 1}):
+            status, _ = await apply(order_id, notification)
+            return f"{collection}:{status}"
+    return None
+
+
+class WebhookProcessor:
+    def __init__(self, workers: int = 4, poll_interval: float = 1.0):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._reset()
+
+    def _reset(self):
+        self._tasks = []
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._order_locks = {}
+        self.received = 0
+        self.duplicates = 0
+        self.reopened = 0
+        self.processed = 0
+        self.ignored = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def enqueue(self, notification: dict):
+        """Store a verified notification. Returns (event id, duplicate)."""
+        now = datetime.utcnow()
+        key = event_id(notification)
+        try:
+            await db.webhook_events.insert_one({
+                "_id": key,
+                "orderId": notification.get("order_id"),
+                "transactionStatus": notification.get("transaction_status"),
+                "payload": notification,
+                "status": "queued",
+                "attempts": 0,
+                "receivedAt": now,
+                "nextAttemptAt": now
+            })
+        except DuplicateKeyError:
+            # A retry of an event given up on (e.g. its order did not exist
+            # yet) is processed again; anything else is a duplicate
+            result = await db.webhook_events.update_one(
+                {"_id": key, "status": {"$in": ["ignored", "failed"]}},
+                {"$set": {"payload": notification, "status": "queued", "attempts": 0,
+                          "nextAttemptAt": now, "reopenedAt": now}}
+            )
+            if not result.modified_count:
+                self.duplicates += 1
+                return key, True
+            self.reopened += 1
+            self._wakeup.set()
+            return key, False
+        self.received += 1
+        self._wakeup.set()
+        return key, False
+
+    async def _claim(self):
+        now = datetime.utcnow()
+        return await db.webhook_events.find_one_and_update(
+            {"status": "queued", "nextAttemptAt": {"$lte": now}},
+            {"$set": {"status": "processing", "leaseUntil": now + LEASE}, "$inc": {"attempts": 1}},
+            sort=[("nextAttemptAt", 1)]
+        )
+
+    async def _requeue_expired(self):
+        await db.webhook_events.update_many(
+            {"status": "processing", "leaseUntil": {"$lt": datetime.utcnow()}},
+            {"$set": {"status": "queued", "nextAttemptAt": datetime.utcnow()}}
+        )
+
+    async def _locked(self, order_id: str, notification: dict):
+        # One event per order at a time; the lock is dropped with its last user
+        entry = self._order_locks.get(order_id)
+        if entry is None:
+            entry = self._order_locks[order_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await process_notification(notification)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._order_locks[order_id]
+
+    def _retry_update(self, event: dict, error: str, final_status: str) -> dict:
+        """Requeue with backoff, or finalise as `final_status` after MAX_ATTEMPTS."""
+        attempts = event.get("attempts", 1)
+        if attempts >= MAX_ATTEMPTS:
+            logger.error(f"Webhook {event['_id']} {final_status} after {attempts} attempts: {error}")
+            return {"status": final_status, "error": error, "processedAt": datetime.utcnow()}
+        self.retried += 1
+        delay = min(2 ** attempts, 300)
+        logger.warning(f"Webhook {event['_id']}: {error}, retry in {delay}s")
+        return {"status": "queued", "error": error, "nextAttemptAt": datetime.utcnow() + timedelta(seconds=delay)}
+
+    async def _process(self, event: dict):
+        try:
+            result = await self._locked(event.get("orderId"), event["payload"])
+        except Exception as e:
+            update = self._retry_update(event, str(e), "failed")
+            if update["status"] == "failed":
+                self.failed += 1
+        else:
+            if result is None:
+                # The order may not be written yet (or a read failed): retry
+                # like an error instead of dropping the notification
+                update = self._retry_update(event, "order not found", "ignored")
+                if update["status"] == "ignored":
+                    self.ignored += 1
+            else:
+                self.processed += 1
+                update = {"status": "done", "result": result, "processedAt": datetime.utcnow()}
+        await db.webhook_events.update_one({"_id": event["_id"]}, {"$set": update})
+
+    async def _worker(self, index: int):
+        while not self._stopping:
+            try:
+                event = await self._claim()
+                if event is not None:
+                    await self._process(event)
+                    continue
+                if index == 0:
+                    await self._requeue_expired()
+            except Exception as e:
+                logger.error(f"Webhook queue unavailable: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self):
+        if not self._tasks:
+            self._stopping = False
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        # Finish the events in hand; anything still queued stays in Mongo
+        if self._tasks:
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(*self._tasks)
+            self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "reopened": self.reopened,
+            "processed": self.processed,
+            "ignored": self.ignored,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+webhook_processor = WebhookProcessor(workers=int(os.environ.get("WEBHOOK_WORKERS", "4")))
+
+
+@after_fork
+def _reset_webhook_processor():
+    webhook_processor._reset()
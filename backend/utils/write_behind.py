@@ -0,0 +1,245 @@
+"""
+Write-behind inserts.
+
+Request handlers hand documents to a WriteBehindQueue with `put()` and return
+immediately; a background task per worker writes them with one insert_many
+every `flush_interval` seconds, or as soon as `max_batch` documents are
+waiting. server.py starts the queues in lifespan() and flushes what is left
+on shutdown.
+
+Writes are at-most-once on a crash: anything still queued when a worker is
+killed is lost. Use it only for data that can tolerate that.
+
+`after_insert(docs)` runs after every successful insert_many with the
+documents that were written, e.g. to maintain counters.
+
+put() drops documents once `max_pending` are waiting; put_wait() instead
+waits for a flush to make room (backpressure) and reports whether the
+document was queued.
+
+CoalescingUpsertQueue keeps only the latest fields per key and writes them
+as upserts with one bulk_write per flush, for "last seen" style documents
+that are overwritten far more often than they are read.
+"""
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database import get_db
+from utils.fork import after_fork
+
+logger = logging.getLogger(__name__)
+
+db = get_db()
+
+_queues = []
+
+
+class WriteBehindQueue:
+    def __init__(self, collection: str, max_batch: int = 500, flush_interval: float = 0.5,
+                 max_pending: int = 50000, after_insert=None):
+        self.collection = collection
+        self.after_insert = after_insert
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        _queues.append(self)
+        after_fork(self._reset)
+        self._reset()
+
+    def _reset(self):
+        self._pending = []
+        self._wakeup = asyncio.Event()
+        self._room = asyncio.Event()
+        self._task = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failed_flushes = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _has_room(self, doc: dict) -> bool:
+        return len(self._pending) < self.max_pending
+
+    def _add(self, doc: dict):
+        self._pending.append(doc)
+
+    def put(self, doc: dict):
+        """Queue `doc` for insertion. Never blocks; drops it if the backlog is full."""
+        if not self._has_room(doc):
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.error(f"{self.collection} write-behind backlog full, {self.dropped} documents dropped")
+            return
+        self._add(doc)
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    async def put_wait(self, doc: dict, timeout: float = 2.0) -> bool:
+        """
+        Queue `doc`, waiting up to `timeout` seconds for a flush when the
+        backlog is full. False if there was still no room.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self._has_room(doc):
+            remaining = deadline - loop.time()
+            if remaining <= 0 or self._task is None:
+                self.rejected += 1
+                return False
+            self._room.clear()
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._room.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        self.put(doc)
+        return True
+
+    async def flush(self):
+        """Insert everything queued so far, in batches of `max_batch`."""
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            inserted = batch
+            try:
+                await db[self.collection].insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                # Duplicate keys are documents a failed earlier attempt had
+                # already written (insert_many sets _id before sending).
+                # Other per-document errors would fail again on a retry.
+                errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+                rejected = {err["index"] for err in errors}
+                inserted = [doc for i, doc in enumerate(batch) if i not in rejected]
+                if errors:
+                    self.dropped += len(errors)
+                    logger.error(f"{self.collection} write-behind: {len(errors)} documents rejected: {errors[0].get('errmsg')}")
+            except Exception as e:
+                # Network/server trouble: put the batch back for the next round
+                self.failed_flushes += 1
+                self._pending[:0] = batch
+                logger.error(f"{self.collection} write-behind flush failed: {str(e)}")
+                raise
+            self.written += len(inserted)
+            self._room.set()
+            if self.after_insert is not None and inserted:
+                try:
+                    await self.after_insert(inserted)
+                except Exception as e:
+                    logger.error(f"{self.collection} write-behind after_insert failed: {str(e)}")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                await asyncio.sleep(self.flush_interval)
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Let a flush in progress finish instead of cancelling it mid-write
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.error(f"{self.collection} write-behind: {len(self._pending)} documents not written on shutdown")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "failedFlushes": self.failed_flushes,
+        }
+
+
+class CoalescingUpsertQueue(WriteBehindQueue):
+    """
+    Write-behind upserts keyed on `key`: put({key: ..., **fields}) replaces
+    any fields still queued for the same key, and each flush sends one
+    `{"$set": fields}` upsert per key in a single bulk_write. `max_pending`
+    limits the number of distinct keys waiting.
+    """
+
+    def __init__(self, collection: str, key: str, **kwargs):
+        self.key = key
+        super().__init__(collection, **kwargs)
+
+    def _reset(self):
+        super()._reset()
+        self._pending = {}
+        self.coalesced = 0
+
+    def _has_room(self, doc: dict) -> bool:
+        return doc[self.key] in self._pending or len(self._pending) < self.max_pending
+
+    def _add(self, doc: dict):
+        key = doc[self.key]
+        if key in self._pending:
+            self.coalesced += 1
+            self._pending[key].update(doc)
+        else:
+            self._pending[key] = dict(doc)
+
+    async def flush(self):
+        """Upsert the latest fields of every queued key, `max_batch` keys per bulk_write."""
+        while self._pending:
+            keys = list(self._pending)[:self.max_batch]
+            batch = {key: self._pending.pop(key) for key in keys}
+            try:
+                await db[self.collection].bulk_write(
+                    [UpdateOne({self.key: key}, {"$set": fields}, upsert=True) for key, fields in batch.items()],
+                    ordered=False
+                )
+            except BulkWriteError as e:
+                # Upserts are idempotent, but a rejected one would fail again
+                errors = e.details.get("writeErrors", [])
+                self.dropped += len(errors)
+                if errors:
+                    logger.error(f"{self.collection} write-behind: {len(errors)} upserts rejected: {errors[0].get('errmsg')}")
+            except Exception as e:
+                # Put the batch back unless newer fields arrived meanwhile
+                self.failed_flushes += 1
+                for key, fields in batch.items():
+                    self._pending[key] = {**fields, **self._pending.get(key, {})}
+                logger.error(f"{self.collection} write-behind flush failed: {str(e)}")
+                raise
+            self.written += len(batch)
+            self._room.set()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "coalesced": self.coalesced}
+
+
+def queue_stats() -> dict:
+    return {queue.collection: queue.stats() for queue in _queues}
+
+
+def start_all():
+    for queue in _queues:
+        queue.start()
+
+
+async def stop_all():
+    for queue in _queues:
+        await queue.stop()
@@ -0,0 +1,326 @@
+"""
+Shared helpers for the in-process benchmarks.
+
+The ASGI app from backend/server.py is driven through httpx.ASGITransport, so
+no server process or network is involved. The database is either a scratch
+database on a local mongod (--mongo-url) or an in-memory mongomock backend
+(--mock, needs the optional mongomock-motor package).
+"""
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+ELEMENTS = ["air", "api", "tanah", "kayu", "angin"]
+
+
+def add_backend_arguments(parser):
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL"),
+                        help="mongod to benchmark against (a scratch database is created and dropped)")
+    parser.add_argument("--mock", action="store_true",
+                        help="use an in-memory mongomock backend instead of mongod")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiplier for the seeded data volumes")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for generated data")
+
+
+def configure_environment(args):
+    """Set the environment server.py expects before it is imported."""
+    if not args.mock and not args.mongo_url:
+        raise SystemExit("Pass --mongo-url (or set MONGO_URL) or use --mock")
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://localhost:27017"
+    os.environ["DB_NAME"] = f"bench_{uuid.uuid4().hex[:8]}"
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+
+@asynccontextmanager
+async def running_app(args):
+    """
+    Import server.app, point it at the chosen backend and run its lifespan.
+    Yields (app, db). The scratch database is dropped afterwards.
+    """
+    configure_environment(args)
+    import database
+    if args.mock:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--mock needs the mongomock-motor package (pip install mongomock-motor)")
+        # connect() keeps an existing client, so the lifespan uses the mock
+        database.client = AsyncMongoMockClient()
+        database._database = database.client[os.environ["DB_NAME"]]
+
+    from server import app
+    async with app.router.lifespan_context(app):
+        db = database.get_db()
+        try:
+            yield app, db
+        finally:
+            if not args.mock:
+                await database.client.drop_database(os.environ["DB_NAME"])
+
+
+def http_client(app):
+    import httpx
+    # server.py configures INFO logging; per-request client logs drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+def admin_headers() -> dict:
+    from routes.admin import create_access_token
+    token = create_access_token(data={"sub": "bench-admin@newmeclass.id", "role": "superadmin"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def user_headers(user: dict) -> dict:
+    from routes.auth import create_token
+    token = create_token(str(user["_id"]), user["email"], user.get("userType", "individual"))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _question(test_type: str, order: int, is_premium: bool, traits: list) -> dict:
+    scoring = []
+    options = []
+    for i, trait in enumerate(traits):
+        options.append(f"Pilihan {i + 1} untuk pertanyaan {order}")
+        scoring.append({"option": i, "score": {trait: random.randint(1, 3)}})
+    return {
+        "id": f"{test_type}-{order}",
+        "testType": test_type,
+        "question": f"Pertanyaan {order} ({test_type})",
+        "options": options,
+        "scoring": scoring,
+        "order": order,
+        "isPremium": is_premium,
+        "isActive": True,
+        "createdAt": datetime.utcnow(),
+    }
+
+
+async def seed(db, scale: float = 1.0, seed: int = 1234) -> dict:
+    """
+    Insert a realistic spread of documents. Returns handles the benchmarks
+    need (a sample user, article slug, order ids, ...).
+    """
+    random.seed(seed)
+    now = datetime.utcnow()
+
+    def n(base):
+        return max(1, int(base * scale))
+
+    from routes.auth import hash_password
+    # One real hash reused for every user; hashing thousands would dominate seeding
+    password_hash = hash_password("benchmark123")
+
+    users = []
+    for i in range(n(5000)):
+        users.append({
+            "email": f"user{i}@bench.test",
+            "hashedPassword": password_hash,
+            "fullName": f"Peserta Bench {i}",
+            "birthDate": "2005-01-01",
+            "whatsapp": f"08{i:010d}",
+            "userType": "institution" if i % 50 == 0 else "individual",
+            "referralSource": "google",
+            "province": "Sumatera Utara",
+            "city": "Medan",
+            "district": "Medan Kota",
+            "myReferralCode": f"BENCH{i:06d}",
+            "usedReferralCode": f"BENCH{i - 1:06d}" if i % 7 == 0 and i else None,
+            "referralCount": random.randint(0, 5) if i % 10 == 0 else 0,
+            "referralBonus": 0,
+            "isActive": True,
+            "isBanned": i % 500 == 0,
+            "freeTestStatus": random.choice(["not_started", "completed"]),
+            "paidTestStatus": random.choice(["not_started", "in_progress", "completed"]),
+            "paymentStatus": random.choice(["unpaid", "pending", "approved"]),
+            "createdAt": now - timedelta(minutes=i),
+        })
+    result = await db.users.insert_many(users)
+    user_ids = [str(_id) for _id in result.inserted_ids]
+    await db.user_test_answers.insert_many([
+        {"userId": user_id, "testType": "free", "answers": {f"q{q}": random.randint(0, 4) for q in range(25)}}
+        for user_id in user_ids
+    ])
+    sample_user = await db.users.find_one({"email": "user1@bench.test"})
+
+    await db.settings.insert_one({
+        "siteName": "NEWME CLASS",
+        "paymentAmount": 50000.0,
+        "requirePayment": True,
+        "banners": [{"url": f"/uploads/site/banner_{i}.png", "title": f"Banner {i}", "order": i} for i in range(5)],
+        "boardOfDirectors": [{"name": f"Direktur {i}", "position": "Direktur", "photo": ""} for i in range(4)],
+        "teamSupport": [{"name": f"Tim {i}", "position": "Staf", "photo": ""} for i in range(12)],
+        "updatedAt": now,
+    })
+    await db.referral_settings.insert_one({"bonusPerReferral": 10000, "minimumWithdraw": 50000, "isActive": True})
+
+    articles = []
+    for i in range(n(200)):
+        articles.append({
+            "title": f"Artikel Bench {i}",
+            "slug": f"artikel-bench-{i}",
+            "excerpt": "Ringkasan artikel " * 5,
+            "content": "<p>" + ("Isi artikel yang cukup panjang. " * 200) + "</p>",
+            "category": random.choice(["berita", "tips", "event"]),
+            "tags": ["bakat", "kepribadian"],
+            "isPublished": True,
+            "publishedAt": now - timedelta(hours=i),
+            "views": random.randint(0, 1000),
+            "createdAt": now - timedelta(hours=i),
+        })
+    await db.articles.insert_many(articles)
+
+    questions = []
+    for order in range(1, 26):
+        questions.append(_question("element_personality", order, order > 5, ELEMENTS))
+    for order in range(1, 21):
+        questions.append(_question("introvert_extrovert", order, order > 5, ["introvert", "extrovert"]))
+    await db.questions.insert_many(questions)
+    await db.personality_descriptions.insert_many([
+        {"personalityType": t, "data": {"title": t.upper(), "description": f"Deskripsi {t} " * 40}}
+        for t in ELEMENTS + ["introvert", "extrovert"]
+    ])
+
+    await db.pageviews.insert_many([
+        {
+            "page": random.choice(["/", "/articles", "/newme-test", "/shop", "/company-profile"]),
+            "sessionId": f"sess_{random.randint(0, n(8000))}",
+            "userAgent": "Mozilla/5.0 (bench)",
+            "ipAddress": "127.0.0.1",
+            "timestamp": now - timedelta(minutes=random.randint(0, 60 * 24 * 30)),
+        }
+        for _ in range(n(50000))
+    ])
+    await db.online_users.insert_many([
+        {"sessionId": f"sess_{i}", "currentPage": "/", "lastActivity": now - timedelta(seconds=i)}
+        for i in range(n(300))
+    ])
+
+    order_ids = []
+    proofs = []
+    for i in range(n(3000)):
+        order_id = f"NEWME-{i:08d}-{uuid.uuid4().hex[:8].upper()}"
+        order_ids.append(order_id)
+        proofs.append({
+            "userId": random.choice(user_ids),
+            "orderId": order_id,
+            "paymentType": "snap",
+            "grossAmount": 50000,
+            "status": random.choice(["pending", "settlement", "failed"]),
+            "createdAt": now - timedelta(minutes=i),
+        })
+    proofs.append({"userId": str(sample_user["_id"]), "orderId": "NEWME-SAMPLE", "paymentType": "snap",
+                   "grossAmount": 50000, "status": "pending", "createdAt": now})
+    await db.payment_proofs.insert_many(proofs)
+
+    await db.wallet_transactions.insert_many([
+        {
+            "userId": random.choice(user_ids + [str(sample_user["_id"])] * 50),
+            "orderId": f"TOPUP-{i}",
+            "amount": random.choice([25000, 50000, 100000]),
+            "type": "topup",
+            "status": random.choice(["pending", "success"]),
+            "createdAt": now - timedelta(minutes=i),
+        }
+        for i in range(n(10000))
+    ])
+    await db.wallets.insert_one({"userId": str(sample_user["_id"]), "balance": 150000, "createdAt": now})
+
+    await db.referral_transactions.insert_many([
+        {
+            "referrerId": random.choice(user_ids),
+            "referredId": random.choice(user_ids),
+            "bonusAmount": 10000,
+            "status": random.choice(["pending", "credited"]),
+            "createdAt": now - timedelta(minutes=i),
+        }
+        for i in range(n(1000))
+    ])
+    await db.issued_certificates.insert_many([
+        {"certificateNumber": f"NMC-BENCH-{i:06d}", "recipientName": f"Peserta {i}", "issuedAt": now - timedelta(days=i % 365)}
+        for i in range(n(2000))
+    ])
+    await db.registrations.insert_many([
+        {"name": f"Pendaftar {i}", "email": f"reg{i}@bench.test", "testStatus": "pending",
+         "registrationDate": now - timedelta(minutes=i)}
+        for i in range(n(1000))
+    ])
+    await db.contacts.insert_many([
+        {"name": f"Kontak {i}", "email": f"c{i}@bench.test", "message": "Halo", "status": "new",
+         "submittedAt": now - timedelta(minutes=i)}
+        for i in range(n(500))
+    ])
+    await db.ai_analyses.insert_many([
+        {"userId": str(sample_user["_id"]), "testType": "paid", "aiAnalysis": {"summary": "Ringkasan " * 100},
+         "createdAt": now - timedelta(days=i)}
+        for i in range(5)
+    ])
+    await db.hero_slides.insert_many([
+        {"title": f"Slide {i}", "imageUrl": "", "order": i, "isActive": True} for i in range(4)
+    ])
+    await db.website_products.insert_many([
+        {"title": f"Produk {i}", "imageUrl": "", "order": i, "isActive": True} for i in range(6)
+    ])
+    await db.website_testimonials.insert_many([
+        {"name": f"Testimoni {i}", "text": "Bagus " * 20, "order": i, "isActive": True} for i in range(4)
+    ])
+    await db.website_activities.insert_many([
+        {"title": f"Kegiatan {i}", "imageUrl": "", "order": i, "isActive": True} for i in range(4)
+    ])
+    await db.banners.insert_many([
+        {"title": f"Banner {i}", "imageUrl": "", "type": "slider", "isActive": True, "order": i} for i in range(5)
+    ])
+    await db.running_info.insert_many([
+        {"message": f"Info {i}", "isActive": True, "priority": i, "startDate": None, "endDate": None} for i in range(3)
+    ])
+
+    return {
+        "user": sample_user,
+        "userIds": user_ids,
+        "articleSlug": "artikel-bench-1",
+        "orderId": "NEWME-SAMPLE",
+        "certificateNumber": "NMC-BENCH-000001",
+    }
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize(latencies_ms: list, wall_seconds: float, errors: int = 0) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+        "meanMs": round(statistics.fmean(values), 3) if values else 0.0,
+        "p50Ms": round(percentile(values, 50), 3),
+        "p95Ms": round(percentile(values, 95), 3),
+        "p99Ms": round(percentile(values, 99), 3),
+        "maxMs": round(values[-1], 3) if values else 0.0,
+    }
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed_ms = (time.perf_counter() - self.started) * 1000
@@ -0,0 +1,200 @@
+"""
+Per-endpoint microbenchmarks against the in-process ASGI app.
+
+    python -m benchmarks.endpoints --mock --output benchmarks/baseline.json
+    python -m benchmarks.endpoints --mongo-url mongodb://localhost:27017 \\
+        --compare benchmarks/baseline.json --threshold 0.25
+
+Each endpoint gets a short warm-up and then --requests calls at
+--concurrency. p50/p95/p99 latency and req/s are printed and optionally
+written to a JSON baseline. With --compare, the run fails (exit 1) when an
+endpoint's p95 regresses by more than --threshold against the baseline.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.common import Timer, add_backend_arguments, admin_headers, http_client, running_app, seed, \
+    summarize, user_headers
+
+
+def build_cases(ctx: dict) -> list:
+    """(name, method, path, auth, body_factory)"""
+    user = ctx["user"]
+    user_id = str(user["_id"])
+
+    def submission():
+        return {
+            "testType": "element_personality",
+            "answers": [
+                {"questionId": f"element_personality-{q}", "selectedOption": random.randint(0, 4)}
+                for q in range(1, 26)
+            ],
+        }
+
+    return [
+        # Public
+        ("root", "GET", "/api/", None, None),
+        ("settings", "GET", "/api/settings", None, None),
+        ("test-price", "GET", "/api/user-payments/test-price", None, None),
+        ("articles", "GET", "/api/articles", None, None),
+        ("article-detail", "GET", f"/api/articles/{ctx['articleSlug']}", None, None),
+        ("banners", "GET", "/api/banners", None, None),
+        ("running-info", "GET", "/api/running-info", None, None),
+        ("hero-slides", "GET", "/api/website-content/hero-slides", None, None),
+        ("website-products", "GET", "/api/website-content/products", None, None),
+        ("testimonials", "GET", "/api/website-content/testimonials", None, None),
+        ("activities", "GET", "/api/website-content/activities", None, None),
+        ("section-images", "GET", "/api/website-content/section-images", None, None),
+        ("homepage", "GET", "/api/website-content/homepage", None, None),
+        ("test-questions", "GET", "/api/personality-tests/questions/element_personality", None, None),
+        ("test-description", "GET", "/api/personality-tests/descriptions/air", None, None),
+        ("test-stats", "GET", "/api/personality-tests/stats", None, None),
+        ("referral-settings", "GET", "/api/referrals/settings", None, None),
+        ("certificate-verify", "GET", f"/api/certificates/verify/{ctx['certificateNumber']}", None, None),
+        ("pageview", "POST", "/api/analytics/pageview?page=/articles&sessionId=sess_bench", None, None),
+        ("test-submit", "POST", "/api/personality-tests/submit", None, submission),
+        # Authenticated user
+        ("auth-me", "GET", "/api/auth/me", "user", None),
+        ("my-payments", "GET", "/api/user-payments/my-payments", "user", None),
+        ("check-payment", "GET", f"/api/user-payments/check-payment/{ctx['orderId']}", "user", None),
+        ("wallet-balance", "GET", f"/api/wallet/balance/{user_id}", None, None),
+        ("wallet-transactions", "GET", f"/api/wallet/transactions/{user_id}", None, None),
+        ("my-analyses", "GET", "/api/ai-analysis/my-analyses", "user", None),
+        # Admin
+        ("admin-dashboard", "GET", "/api/admin/dashboard/stats", "admin", None),
+        ("analytics-stats", "GET", "/api/analytics/stats", "admin", None),
+        ("online-users", "GET", "/api/analytics/online-users", "admin", None),
+        ("users-list", "GET", "/api/users", "admin", None),
+        ("users-stats", "GET", "/api/users/stats/summary", "admin", None),
+        ("user-detail", "GET", f"/api/users/{user_id}", "admin", None),
+        ("payments-list", "GET", "/api/payments", "admin", None),
+        ("referral-transactions", "GET", "/api/referrals/transactions", "admin", None),
+        ("referral-leaderboard", "GET", "/api/referrals/leaderboard", "admin", None),
+        ("referral-stats", "GET", "/api/referrals/stats", "admin", None),
+        ("certificates-issued", "GET", "/api/certificates/issued", "admin", None),
+        ("transactions-list", "GET", "/api/transactions", "admin", None),
+        ("registrations-list", "GET", "/api/registrations", None, None),
+    ]
+
+
+async def run_case(client, case, headers, requests: int, concurrency: int, warmup: int) -> dict:
+    name, method, path, auth, body_factory = case
+    request_headers = headers.get(auth, {})
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    statuses = {}
+
+    async def one(record: bool):
+        nonlocal errors
+        async with semaphore:
+            body = body_factory() if body_factory else None
+            with Timer() as t:
+                response = await client.request(method, path, headers=request_headers, json=body)
+            if not record:
+                return
+            latencies.append(t.elapsed_ms)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code >= 400:
+                errors += 1
+
+    await asyncio.gather(*(one(False) for _ in range(warmup)))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(True) for _ in range(requests)))
+    wall = time.perf_counter() - started
+
+    result = summarize(latencies, wall, errors)
+    result["statuses"] = {str(k): v for k, v in sorted(statuses.items())}
+    result["method"] = method
+    result["path"] = path
+    return result
+
+
+def compare(results: dict, baseline_path: str, threshold: float) -> list:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["endpoints"]
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get("p95Ms"):
+            continue
+        change = (current["p95Ms"] - previous["p95Ms"]) / previous["p95Ms"]
+        current["p95Change"] = round(change, 4)
+        if change > threshold:
+            regressions.append((name, previous["p95Ms"], current["p95Ms"], change))
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{'endpoint':<24}{'req':>6}{'err':>5}{'req/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, r in results.items():
+        change = f"  ({r['p95Change']:+.0%} p95)" if "p95Change" in r else ""
+        print(f"{name:<24}{r['requests']:>6}{r['errors']:>5}{r['rps']:>10.1f}"
+              f"{r['p50Ms']:>9.2f}{r['p95Ms']:>9.2f}{r['p99Ms']:>9.2f}{change}")
+
+
+async def main(args) -> int:
+    async with running_app(args) as (app, db):
+        print("Seeding benchmark data...")
+        ctx = await seed(db, scale=args.scale, seed=args.seed)
+        headers = {"admin": admin_headers(), "user": user_headers(ctx["user"])}
+
+        cases = build_cases(ctx)
+        if args.only:
+            cases = [c for c in cases if c[0] in args.only]
+
+        results = {}
+        async with http_client(app) as client:
+            for case in cases:
+                results[case[0]] = await run_case(
+                    client, case, headers, args.requests, args.concurrency, args.warmup
+                )
+
+    regressions = compare(results, args.compare, args.threshold) if args.compare else []
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "meta": {
+                    "createdAt": datetime.utcnow().isoformat(),
+                    "backend": "mongomock" if args.mock else "mongod",
+                    "scale": args.scale,
+                    "requests": args.requests,
+                    "concurrency": args.concurrency,
+                    "python": platform.python_version(),
+                },
+                "endpoints": results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if regressions:
+        print("\np95 regressions:")
+        for name, before, after, change in regressions:
+            print(f"  {name}: {before:.2f}ms -> {after:.2f}ms ({change:+.0%})")
+        return 1
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Per-endpoint benchmarks for the NEWME CLASS API")
+    add_backend_arguments(parser)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="run only these endpoint names")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative p95 increase before failing (default 0.25)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
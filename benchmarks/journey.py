@@ -0,0 +1,273 @@
+"""
+Scenario load generator for the full student journey.
+
+Each virtual student walks through:
+
+    register -> submit personality test -> AI analysis -> create Snap payment
+    -> pay at the Midtrans emulator -> poll until its signed notification
+    settles the payment
+    -> download AI certificate
+
+Students arrive according to a profile spread over --duration seconds:
+
+    constant  evenly spaced arrivals
+    ramp      arrival rate grows linearly from zero
+    spike     20% spread over the window, 80% inside a short burst
+
+The LLM is replaced by a local stand-in and Midtrans by the emulator in
+backend/midtrans_emulator.py (see benchmarks/standins.py), both with
+configurable latency. An event-loop lag monitor runs alongside the load.
+
+    python -m benchmarks.journey --mock --students 500 --duration 600 --time-scale 10
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from benchmarks.common import Timer, add_backend_arguments, http_client, running_app, seed, summarize
+from benchmarks.standins import install_llm_standin, install_midtrans_emulator
+
+STEPS = ["register", "submit-test", "ai-analysis", "create-payment", "await-settlement",
+         "download-certificate"]
+
+
+def arrival_times(students: int, duration: float, profile: str) -> list:
+    if profile == "constant":
+        return [duration * i / students for i in range(students)]
+    if profile == "ramp":
+        # Cumulative arrivals grow with t^2, i.e. the rate grows linearly
+        return [duration * math.sqrt(i / students) for i in range(students)]
+    if profile == "spike":
+        background = int(students * 0.2)
+        spike_start, spike_length = duration * 0.4, max(duration * 0.05, 1.0)
+        times = [random.uniform(0, duration) for _ in range(background)]
+        times += [spike_start + random.uniform(0, spike_length) for _ in range(students - background)]
+        return sorted(times)
+    raise ValueError(f"Unknown profile: {profile}")
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes up from a short sleep."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class Journey:
+    def __init__(self, client, midtrans, institution: str, think_time: float):
+        self.client = client
+        self.midtrans = midtrans
+        self.institution = institution
+        self.think_time = think_time
+        self.latencies = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self.completed = []
+        self.abandoned = 0
+
+    async def _step(self, name: str, method: str, path: str, **kwargs):
+        with Timer() as t:
+            response = await self.client.request(method, path, **kwargs)
+        self.latencies[name].append(t.elapsed_ms)
+        ok = response.status_code < 400
+        if ok and response.headers.get("content-type", "").startswith("application/json"):
+            body = response.json()
+            # Several endpoints report failure with a 200 and success=False
+            if isinstance(body, dict) and body.get("success") is False:
+                ok = False
+        if not ok:
+            self.errors[name] += 1
+            return None
+        return response
+
+    async def _think(self):
+        if self.think_time:
+            await asyncio.sleep(random.expovariate(1 / self.think_time))
+
+    async def run(self, index: int):
+        started = time.perf_counter()
+        email = f"siswa{index}-{uuid.uuid4().hex[:6]}@{self.institution}.sch.id"
+
+        response = await self._step("register", "POST", "/api/auth/register", json={
+            "email": email,
+            "password": "rahasia123",
+            "fullName": f"Siswa {index}",
+            "birthDate": "2008-05-17",
+            "whatsapp": f"0812{index:08d}",
+            "userType": "individual",
+            "referralSource": "kerabat",
+            "province": "Sumatera Utara",
+            "city": "Medan",
+            "district": "Medan Kota",
+            "institutionName": self.institution,
+        })
+        if response is None:
+            self.abandoned += 1
+            return
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        await self._think()
+
+        answers = [{"questionId": f"element_personality-{q}", "selectedOption": random.randint(0, 4)}
+                   for q in range(1, 26)]
+        response = await self._step("submit-test", "POST", "/api/personality-tests/submit",
+                                    json={"testType": "element_personality", "answers": answers})
+        if response is None:
+            self.abandoned += 1
+            return
+        await self._think()
+
+        response = await self._step("ai-analysis", "POST", "/api/ai-analysis/analyze", headers=headers, json={
+            "testType": "paid",
+            "answers": [{"questionId": a["questionId"], "questionText": "Pertanyaan", "category": "element",
+                         "answer": f"Pilihan {a['selectedOption']}", "score": 3} for a in answers],
+            "categoryScores": {"element": {"score": 60, "max": 75}},
+            "totalScore": 60,
+            "maxScore": 75,
+            "percentage": 80,
+        })
+        if response is None:
+            self.abandoned += 1
+            return
+        await self._think()
+
+        response = await self._step("create-payment", "POST", "/api/user-payments/create-snap-payment",
+                                    headers=headers)
+        if response is None:
+            self.abandoned += 1
+            return
+        order_id = response.json()["orderId"]
+        await self._think()
+
+        # The emulator sends the signed notification; the webhook workers
+        # apply it, so poll like the dashboard does
+        self.midtrans.pay(order_id)
+        for _ in range(100):
+            response = await self._step("await-settlement", "GET", f"/api/user-payments/check-payment/{order_id}",
+                                        headers=headers)
+            if response is None or response.json()["status"] == "settlement":
+                break
+            await asyncio.sleep(0.1)
+        if response is None or response.json()["status"] != "settlement":
+            self.abandoned += 1
+            return
+
+        response = await self._step("download-certificate", "GET", "/api/certificates/download-ai-certificate",
+                                    headers=headers)
+        if response is None:
+            self.abandoned += 1
+            return
+        self.completed.append((time.perf_counter() - started) * 1000)
+
+
+async def main(args) -> int:
+    random.seed(args.seed)
+    async with running_app(args) as (app, db):
+        print("Seeding baseline data...")
+        await seed(db, scale=args.scale, seed=args.seed)
+        install_llm_standin(latency=args.llm_latency, jitter=args.llm_latency / 3)
+        midtrans = install_midtrans_emulator(app, latency=args.midtrans_latency,
+                                             failure_rate=args.midtrans_failure_rate)
+
+        wall_duration = args.duration / args.time_scale
+        schedule = arrival_times(args.students, wall_duration, args.profile)
+        monitor = LoopLagMonitor()
+
+        async with http_client(app) as client:
+            journey = Journey(client, midtrans, args.institution, args.think_time / args.time_scale)
+            print(f"Running {args.students} journeys over {wall_duration:.1f}s ({args.profile})...")
+            monitor.start()
+            started = time.perf_counter()
+
+            async def launch(index: int, at: float):
+                delay = at - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await journey.run(index)
+
+            await asyncio.gather(*(launch(i, at) for i, at in enumerate(schedule)))
+            wall = time.perf_counter() - started
+            await monitor.stop()
+        await midtrans.close()
+
+    steps = {}
+    for step in STEPS:
+        steps[step] = summarize(journey.latencies[step], wall, journey.errors[step])
+    report = {
+        "meta": {
+            "createdAt": datetime.utcnow().isoformat(),
+            "students": args.students,
+            "profile": args.profile,
+            "durationSeconds": args.duration,
+            "timeScale": args.time_scale,
+            "llmLatency": args.llm_latency,
+            "midtransLatency": args.midtrans_latency,
+            "backend": "mongomock" if args.mock else "mongod",
+        },
+        "wallSeconds": round(wall, 3),
+        "journeys": {
+            "completed": len(journey.completed),
+            "abandoned": journey.abandoned,
+            **summarize(journey.completed, wall),
+        },
+        "steps": steps,
+        "eventLoopLag": summarize(monitor.samples, wall),
+        "midtransEmulator": {**midtrans.stats, "orders": len(midtrans.orders)},
+    }
+
+    print(f"\n{'step':<24}{'ok':>6}{'err':>5}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for step, r in steps.items():
+        print(f"{step:<24}{r['requests'] - r['errors']:>6}{r['errors']:>5}{r['rps']:>9.2f}"
+              f"{r['p50Ms']:>10.1f}{r['p95Ms']:>10.1f}{r['p99Ms']:>10.1f}")
+    lag = report["eventLoopLag"]
+    print(f"\nJourneys completed: {len(journey.completed)}/{args.students} in {wall:.1f}s")
+    print(f"Event loop lag: p50 {lag['p50Ms']:.1f}ms  p99 {lag['p99Ms']:.1f}ms  max {lag['maxMs']:.1f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0 if journey.abandoned == 0 else 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="User-journey load generator for the NEWME CLASS API")
+    add_backend_arguments(parser)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=600.0, help="arrival window in seconds")
+    parser.add_argument("--profile", choices=["constant", "ramp", "spike"], default="constant")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="compress the arrival window and think time by this factor")
+    parser.add_argument("--think-time", type=float, default=5.0, help="mean pause between steps (seconds)")
+    parser.add_argument("--institution", default="sman1medan")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="stand-in LLM response time (seconds)")
+    parser.add_argument("--midtrans-latency", type=float, default=0.3, help="Midtrans emulator latency (seconds)")
+    parser.add_argument("--midtrans-failure-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
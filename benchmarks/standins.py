@@ -0,0 +1,107 @@
+"""
+Local stand-ins for the external services used in the user journey.
+
+- LLM: a fake `emergentintegrations.llm.chat` module whose send_message()
+  sleeps for a configurable time and returns a canned analysis JSON.
+- Midtrans: the local emulator (backend/midtrans_emulator.py) mounted on an
+  ASGI transport behind the backend's shared AsyncMidtransClient, so the
+  real client code (pooling, retries) and the signed webhook path run.
+"""
+import asyncio
+import json
+import random
+import sys
+import types
+
+
+CANNED_ANALYSIS = {
+    "personalityType": "AMBIVERT",
+    "dominantType": "KREATIF",
+    "elementScores": {
+        "AIR": {"percentage": 30, "label": "SI ADAPTIF"},
+        "KAYU": {"percentage": 25, "label": "SI KREATIF"},
+        "API": {"percentage": 20, "label": "SI PERASA"},
+        "TANAH": {"percentage": 15, "label": "SI STABIL"},
+        "ANGIN": {"percentage": 10, "label": "SI SOSIAL"},
+    },
+    "dominantElement": "AIR",
+    "summary": "Peserta memiliki kepribadian yang adaptif dan reflektif.",
+    "kepribadian": ["Mudah Responsif", "Investigatif", "Reflektif"],
+    "ciriKhas": ["Pengamat", "Pendengar"],
+    "karakter": ["Investigator", "Mediator"],
+    "kekuatanJatidiri": {"kehidupan": "Adaptasi", "kesehatan": "Ginjal", "kontribusi": "Solusi",
+                         "kekhasan": "Tenang", "kharisma": "Kebijaksanaan"},
+    "kompilasiAdaptasi": ["Luangkan waktu refleksi"] * 10,
+    "strengths": ["Analitis", "Empati", "Tenang", "Teliti"],
+    "areasToImprove": ["Ketegasan", "Manajemen waktu", "Ekspresi diri"],
+    "careerRecommendations": ["Peneliti", "Konselor", "Analis Data", "Penulis", "Guru"],
+    "tips": ["Tetapkan target harian", "Perluas jejaring", "Latih public speaking", "Catat ide"],
+    "detailedAnalysis": {"personality": "Analisis " * 80, "talent": "Bakat " * 80, "motivation": "Semangat " * 40},
+}
+
+
+def install_llm_standin(latency: float = 1.5, jitter: float = 0.5):
+    """Register a fake emergentintegrations package and enable the AI path."""
+
+    class UserMessage:
+        def __init__(self, text: str):
+            self.text = text
+
+    class LlmChat:
+        def __init__(self, api_key=None, session_id=None, system_message=None):
+            self.session_id = session_id
+
+        def with_model(self, provider, model):
+            return self
+
+        async def send_message(self, message):
+            await asyncio.sleep(max(0.0, random.gauss(latency, jitter)))
+            return "```json\n" + json.dumps(CANNED_ANALYSIS) + "\n```"
+
+    chat = types.ModuleType("emergentintegrations.llm.chat")
+    chat.LlmChat = LlmChat
+    chat.UserMessage = UserMessage
+    llm = types.ModuleType("emergentintegrations.llm")
+    llm.chat = chat
+    package = types.ModuleType("emergentintegrations")
+    package.llm = llm
+    sys.modules.update({
+        "emergentintegrations": package,
+        "emergentintegrations.llm": llm,
+        "emergentintegrations.llm.chat": chat,
+    })
+
+    import routes.ai_analysis
+    routes.ai_analysis.EMERGENT_LLM_KEY = "standin-llm-key"
+
+
+SERVER_KEY = "standin-server-key"
+EMULATOR_URL = "http://midtrans-emulator"
+
+
+def install_midtrans_emulator(app, latency: float = 0.3, failure_rate: float = 0.0):
+    """
+    Serve Midtrans from backend/midtrans_emulator.py in-process: the shared
+    AsyncMidtransClient reaches it over an ASGI transport, and its signed
+    notifications go to the backend's /api/webhooks/midtrans the same way.
+    Returns the MidtransEmulator; pay(order_id) completes a payment.
+    """
+    import httpx
+    from midtrans_emulator import MidtransEmulator
+    from utils import midtrans_client
+
+    emulator = MidtransEmulator(
+        server_key=SERVER_KEY,
+        notify_url="http://bench/api/webhooks/midtrans",
+        latency=latency,
+        failure_rate=failure_rate,
+        notify_transport=httpx.ASGITransport(app=app)
+    )
+    midtrans_client._client = midtrans_client.AsyncMidtransClient(
+        server_key=SERVER_KEY,
+        api_url=EMULATOR_URL,
+        snap_url=f"{EMULATOR_URL}/snap/v1",
+        backoff=0.05,
+        transport=httpx.ASGITransport(app=emulator.app)
+    )
+    return emulator
@@ -1,15 +1,11 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { ChevronLeft, ChevronRight, ExternalLink } from 'lucide-react';
 import { Button } from './ui/button';
-import axios from 'axios';
 
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
-
-const HeroCarousel = () => {
+// `slides` comes from the homepage bundle; null while it loads
+const HeroCarousel = ({ slides: contentSlides = null }) => {
   const [currentSlide, setCurrentSlide] = useState(0);
   const [isAutoPlaying, setIsAutoPlaying] = useState(true);
-  const [slides, setSlides] = useState([]);
-  const [loading, setLoading] = useState(true);
 
   // Default slides (fallback)
   const defaultSlides = [
@@ -55,24 +51,8 @@ const HeroCarousel = () => {
     }
   ];
 
-  useEffect(() => {
-    const loadSlides = async () => {
-      try {
-        const response = await axios.get(`${BACKEND_URL}/api/website-content/hero-slides`);
-        if (response.data && response.data.length > 0) {
-          setSlides(response.data);
-        } else {
-          setSlides(defaultSlides);
-        }
-      } catch (error) {
-        console.error('Failed to load slides:', error);
-        setSlides(defaultSlides);
-      } finally {
-        setLoading(false);
-      }
-    };
-    loadSlides();
-  }, []);
+  const loading = contentSlides === null;
+  const slides = loading ? [] : (contentSlides.length > 0 ? contentSlides : defaultSlides);
 
   useEffect(() => {
     if (!isAutoPlaying || slides.length === 0) return;
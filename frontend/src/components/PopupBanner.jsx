@@ -1,38 +1,31 @@
 import React, { useState, useEffect } from 'react';
 import { X } from 'lucide-react';
 import { Button } from './ui/button';
-import { bannersAPI } from '../services/api';
 
-const PopupBanner = () => {
+// `banners` comes from the homepage bundle; null while it loads
+const PopupBanner = ({ banners = null }) => {
   const [popups, setPopups] = useState([]);
   const [currentPopup, setCurrentPopup] = useState(null);
   const [isVisible, setIsVisible] = useState(false);
 
   useEffect(() => {
-    loadPopups();
-  }, []);
-
-  const loadPopups = async () => {
-    try {
-      const response = await bannersAPI.getAll({ type: 'popup', isActive: true });
-      const popupBanners = response.data;
+    if (!banners) return;
+    const popupBanners = banners.filter((banner) => banner.type === 'popup');
+    
+    if (popupBanners.length > 0) {
+      // Check if user has dismissed today
+      const dismissedToday = localStorage.getItem('popup_dismissed_date');
+      const today = new Date().toDateString();
       
-      if (popupBanners.length > 0) {
-        // Check if user has dismissed today
-        const dismissedToday = localStorage.getItem('popup_dismissed_date');
-        const today = new Date().toDateString();
-        
-        if (dismissedToday !== today) {
-          setPopups(popupBanners);
-          setCurrentPopup(popupBanners[0]);
-          // Delay showing popup for better UX
-          setTimeout(() => setIsVisible(true), 1500);
-        }
+      if (dismissedToday !== today) {
+        setPopups(popupBanners);
+        setCurrentPopup(popupBanners[0]);
+        // Delay showing popup for better UX
+        const timer = setTimeout(() => setIsVisible(true), 1500);
+        return () => clearTimeout(timer);
       }
-    } catch (error) {
-      console.error('Failed to load popups');
     }
-  };
+  }, [banners]);
 
   const handleClose = () => {
     setIsVisible(false);
@@ -2,15 +2,72 @@ import { useEffect } from 'react';
 import { useLocation } from 'react-router-dom';
 import { analyticsAPI } from '../services/api';
 
+// Page views are batched and sent to /analytics/beacon every few seconds,
+// when the batch is full, or when the tab is hidden/closed.
+// Set REACT_APP_ANALYTICS_BATCHING=false to send one request per page view.
+const BATCHING = process.env.REACT_APP_ANALYTICS_BATCHING !== 'false';
+const FLUSH_INTERVAL_MS = 15000;
+const MAX_BATCH = 20;
+
+let pending = [];
+let flushTimer = null;
+
+const getSessionId = () => {
+  // Generate or get session ID
+  let sessionId = sessionStorage.getItem('visitor_session_id');
+  if (!sessionId) {
+    sessionId = 'sess_' + Date.now() + '_' + Math.random().toString(36).substr(2, 9);
+    sessionStorage.setItem('visitor_session_id', sessionId);
+  }
+  return sessionId;
+};
+
+const flush = () => {
+  if (flushTimer) {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+  }
+  if (pending.length === 0) return;
+  const events = pending;
+  pending = [];
+  analyticsAPI.sendBeacon(getSessionId(), events).catch(() => {
+    // Silent fail - don't disrupt user experience
+    console.debug('Analytics tracking failed');
+  });
+};
+
+const queuePageView = (page) => {
+  pending.push({ page, referrer: document.referrer || null, timestamp: Date.now() });
+  if (pending.length >= MAX_BATCH) {
+    flush();
+  } else if (!flushTimer) {
+    flushTimer = setTimeout(flush, FLUSH_INTERVAL_MS);
+  }
+};
+
 const VisitorTracker = () => {
   const location = useLocation();
 
   useEffect(() => {
-    // Generate or get session ID
-    let sessionId = sessionStorage.getItem('visitor_session_id');
-    if (!sessionId) {
-      sessionId = 'sess_' + Date.now() + '_' + Math.random().toString(36).substr(2, 9);
-      sessionStorage.setItem('visitor_session_id', sessionId);
+    if (!BATCHING) return undefined;
+    const onVisibilityChange = () => {
+      if (document.visibilityState === 'hidden') flush();
+    };
+    document.addEventListener('visibilitychange', onVisibilityChange);
+    window.addEventListener('pagehide', flush);
+    return () => {
+      document.removeEventListener('visibilitychange', onVisibilityChange);
+      window.removeEventListener('pagehide', flush);
+      flush();
+    };
+  }, []);
+
+  useEffect(() => {
+    const sessionId = getSessionId();
+
+    if (BATCHING) {
+      queuePageView(location.pathname);
+      return;
     }
 
     // Track page view
@@ -9,7 +9,7 @@ import {
 } from 'lucide-react';
 import { Button } from '../components/ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '../components/ui/card';
-import { bannersAPI, articlesAPI } from '../services/api';
+import { websiteContentAPI, articlesAPI } from '../services/api';
 import PopupBanner from '../components/PopupBanner';
 import HeroCarousel from '../components/HeroCarousel';
 import AboutSection from '../components/AboutSection';
@@ -19,9 +19,6 @@ import TestimonialSlider from '../components/TestimonialSlider';
 import BenefitsSection from '../components/BenefitsSection';
 import ActivitiesSection from '../components/ActivitiesSection';
 import VisiMisiSection from '../components/VisiMisiSection';
-import axios from 'axios';
-
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
 const Home = () => {
   const [banners, setBanners] = useState([]);
@@ -30,20 +27,25 @@ const Home = () => {
   const [isLoggedIn, setIsLoggedIn] = useState(false);
   const [userData, setUserData] = useState(null);
   const [settings, setSettings] = useState(null);
+  const [homepage, setHomepage] = useState(null);
 
   useEffect(() => {
-    loadBanners();
+    loadHomepage();
     loadArticles();
-    loadSettings();
     checkLoginStatus();
   }, []);
 
-  const loadSettings = async () => {
+  // Settings, hero slides and banners in one request
+  const loadHomepage = async () => {
     try {
-      const response = await axios.get(`${BACKEND_URL}/api/settings`);
-      setSettings(response.data);
+      const response = await websiteContentAPI.getHomepage();
+      const content = response.data || {};
+      setHomepage(content);
+      setSettings(content.settings);
+      setBanners((content.banners || []).filter((banner) => banner.type === 'slider'));
     } catch (error) {
-      console.error('Failed to load settings:', error);
+      console.error('Failed to load homepage content:', error);
+      setHomepage({});
     }
   };
 
@@ -65,15 +67,6 @@ const Home = () => {
     }
   }, [banners.length]);
 
-  const loadBanners = async () => {
-    try {
-      const response = await bannersAPI.getAll({ type: 'slider', isActive: true });
-      setBanners(response.data);
-    } catch (error) {
-      console.error('Failed to load banners');
-    }
-  };
-
   const checkLoginStatus = () => {
     const token = localStorage.getItem('user_token');
     const user = localStorage.getItem('user_data');
@@ -94,10 +87,10 @@ const Home = () => {
   return (
     <div className="min-h-screen bg-[#1a1a1a]" data-testid="home-page">
       {/* Popup Banner */}
-      <PopupBanner />
+      <PopupBanner banners={homepage && (homepage.banners || [])} />
 
       {/* Hero Carousel */}
-      <HeroCarousel />
+      <HeroCarousel slides={homepage && (homepage.heroSlides || [])} />
 
       {/* FREE TEST PROMO - TOPIK UTAMA */}
       <section className="py-12 sm:py-16 md:py-20 bg-gradient-to-br from-[#D4A017] via-[#C49515] to-[#B8900F]" data-testid="promo-section-main">
@@ -142,6 +142,12 @@ export const bannersAPI = {
   reorder: (orders) => apiClient.put('/banners/reorder', orders),
 };
 
+// Website content API
+export const websiteContentAPI = {
+  // Landing page bundle; served with an ETag, so the browser revalidates it
+  getHomepage: () => apiClient.get('/website-content/homepage'),
+};
+
 // Transactions API (Midtrans)
 export const transactionsAPI = {
   create: (data) => apiClient.post('/transactions/create', data),
@@ -176,6 +182,14 @@ export const certificatesAPI = {
 // Analytics API
 export const analyticsAPI = {
   trackPageview: (page, sessionId) => apiClient.post(`/analytics/pageview?page=${page}${sessionId ? `&sessionId=${sessionId}` : ''}`),
+  // Batch of page views from one session; uses navigator.sendBeacon when available so it survives page unload
+  sendBeacon: (sessionId, events) => {
+    const body = JSON.stringify({ sessionId, events });
+    if (navigator.sendBeacon && navigator.sendBeacon(`${API_URL}/analytics/beacon`, body)) {
+      return Promise.resolve();
+    }
+    return apiClient.post('/analytics/beacon', body);
+  },
   getStats: () => apiClient.get('/analytics/stats'),
   getOnlineUsers: () => apiClient.get('/analytics/online-users'),
   cleanup: () => apiClient.delete('/analytics/cleanup'),
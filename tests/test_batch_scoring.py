@@ -0,0 +1,80 @@
+"""
+Batch scoring must agree with the one-at-a-time path.
+
+Scores random cohorts with utils.scoring.score_batch() and checks every
+submission against score_answers() + max(), including ties and answers to
+unknown questions. No database needed.
+"""
+import random
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.scoring import InvalidAnswer, WeightTensor, score_answers, score_batch
+
+TRAITS = ["air", "api", "tanah", "kayu", "angin"]
+
+
+def _table(rng, questions=20):
+    table = {}
+    for q in range(questions):
+        options = []
+        for _ in range(rng.randint(2, 5)):
+            picked = rng.sample(TRAITS, rng.randint(1, 2))
+            options.append(tuple((trait, rng.randint(0, 3)) for trait in picked))
+        table[f"q{q}"] = tuple(options)
+    return table
+
+
+def _answers(rng, table):
+    answers = []
+    for question_id, options in table.items():
+        if rng.random() < 0.1:
+            continue
+        answers.append(SimpleNamespace(questionId=question_id, selectedOption=rng.randrange(len(options))))
+    if rng.random() < 0.2:
+        answers.append(SimpleNamespace(questionId="unknown", selectedOption=0))
+    rng.shuffle(answers)
+    return answers
+
+
+def test_batch_matches_single_scoring():
+    rng = random.Random(7)
+    table = _table(rng)
+    cohort = [_answers(rng, table) for _ in range(500)] + [[]]
+
+    results, summary = score_batch(WeightTensor(table), cohort)
+
+    scored = 0
+    for answers, result in zip(cohort, results):
+        scores = score_answers(table, answers)
+        if not scores:
+            assert result is None
+            continue
+        scored += 1
+        assert result == (max(scores, key=scores.get), scores)
+    assert summary["scored"] == scored
+    assert sum(bucket["count"] for bucket in summary["distribution"].values()) == scored
+
+
+def test_out_of_range_option_is_rejected():
+    table = {"q0": ((("air", 1),), (("api", 1),))}
+    cohort = [[SimpleNamespace(questionId="q0", selectedOption=0)],
+              [SimpleNamespace(questionId="q0", selectedOption=2)]]
+    with pytest.raises(InvalidAnswer) as exc:
+        score_batch(WeightTensor(table), cohort)
+    assert exc.value.entry == 1
+
+
+def test_out_of_range_option_is_rejected_in_single_scoring():
+    table = {"q0": ((("air", 1),), (("api", 1),))}
+    for option in (2, -1):
+        with pytest.raises(InvalidAnswer) as exc:
+            score_answers(table, [SimpleNamespace(questionId="q0", selectedOption=option)])
+        assert exc.value.entry is None
@@ -0,0 +1,91 @@
+"""
+Multi-worker smoke test.
+
+Starts the gunicorn launcher (backend/gunicorn.conf.py) with several workers
+and --preload, then checks that every configured worker serves requests and
+none of them is the master. MongoDB does not need to be reachable:
+/api/health reports the database state without failing.
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("gunicorn")
+httpx = pytest.importorskip("httpx")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+WORKERS = 3
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def gunicorn_server():
+    port = _free_port()
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(WORKERS),
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_PRELOAD": "1",
+        "MONGO_URL": os.environ.get("MONGO_URL", "mongodb://127.0.0.1:1"),
+        "MONGO_SERVER_SELECTION_TIMEOUT_MS": "200",
+        "DB_NAME": "multiworker_test",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "server:app"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 60
+        while True:
+            if process.poll() is not None:
+                pytest.fail(f"gunicorn exited: {process.stderr.read().decode()[-2000:]}")
+            try:
+                httpx.get(f"{base_url}/api/health", timeout=5)
+                break
+            except httpx.TransportError:
+                if time.time() > deadline:
+                    pytest.fail("gunicorn did not start within 60s")
+                time.sleep(0.2)
+        yield base_url, process.pid
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def test_requests_are_served_by_separate_worker_processes(gunicorn_server):
+    base_url, master_pid = gunicorn_server
+
+    def health_pid(_):
+        # A new connection per request so the kernel can hand it to any worker
+        response = httpx.get(f"{base_url}/api/health", timeout=10)
+        assert response.status_code == 200
+        return response.json()["pid"]
+
+    pids = set()
+    deadline = time.time() + 30
+    with ThreadPoolExecutor(max_workers=WORKERS * 4) as pool:
+        while len(pids) < WORKERS and time.time() < deadline:
+            pids.update(pool.map(health_pid, range(WORKERS * 8)))
+
+    assert master_pid not in pids
+    # Every worker must serve; a worker that died or never booted shows up here
+    assert len(pids) == WORKERS, f"{len(pids)} of {WORKERS} workers served requests"
@@ -0,0 +1,334 @@
+"""
+Consistency checks for the money paths under concurrency: the wallet ledger
+(utils/wallet_ledger.py), the pending -> final transitions in
+utils/payment_state.py and webhook dedupe (utils/webhook_events.py).
+Midtrans is the local emulator (backend/midtrans_emulator.py) on an ASGI
+transport.
+
+Each test runs against a scratch database on a running mongod:
+    MONGO_URL=mongodb://localhost:27017 python -m pytest tests/test_payment_consistency.py
+"""
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+MONGO_URL = os.environ.get("MONGO_URL")
+
+pytestmark = pytest.mark.skipif(not MONGO_URL, reason="MONGO_URL not set")
+
+SERVER_KEY = "test-server-key"
+
+
+def run_with_db(test):
+    """Run `test(db)` on a scratch database with the registry indexes applied."""
+    import database
+    from indexes import apply_indexes
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+        db = client[f"payment_check_{uuid.uuid4().hex[:8]}"]
+        database.client, database._database = client, db
+        try:
+            await apply_indexes(db)
+            return await test(db)
+        finally:
+            await client.drop_database(db.name)
+            database.client, database._database = None, None
+            client.close()
+
+    return asyncio.run(run())
+
+
+def install_emulator():
+    """Point the shared Midtrans client at a fresh emulator; returns the emulator."""
+    import httpx
+    from midtrans_emulator import MidtransEmulator
+    from utils import midtrans_client
+
+    emulator = MidtransEmulator(server_key=SERVER_KEY)
+    midtrans_client._client = midtrans_client.AsyncMidtransClient(
+        server_key=SERVER_KEY,
+        api_url="http://midtrans-emulator",
+        snap_url="http://midtrans-emulator/snap/v1",
+        backoff=0.01,
+        transport=httpx.ASGITransport(app=emulator.app)
+    )
+    return emulator
+
+
+async def drain(*processors):
+    """Process every queued webhook event, one worker loop per processor."""
+    async def work(processor):
+        while True:
+            event = await processor._claim()
+            if event is None:
+                return
+            await processor._process(event)
+
+    await asyncio.gather(*(work(processor) for processor in processors))
+
+
+def test_concurrent_debits_never_overdraw():
+    from utils.wallet_ledger import InsufficientBalance, credit, debit, get_balance, verify_balance
+
+    async def test(db):
+        await credit("u1", 100000, "topup", "T1")
+
+        async def pay(i):
+            try:
+                await debit("u1", 10000, "test_payment", f"P{i}")
+                return True
+            except InsufficientBalance:
+                return False
+
+        results = await asyncio.gather(*(pay(i) for i in range(25)))
+        assert results.count(True) == 10
+        assert await get_balance("u1") == 0
+        assert await db.wallet_ledger.count_documents({"userId": "u1"}) == 11
+        check = await verify_balance("u1")
+        assert check["consistent"] and check["missingEntries"] == 0
+
+    run_with_db(test)
+
+
+def test_racing_first_credits_create_one_wallet():
+    from utils.wallet_ledger import credit, verify_balance
+
+    async def test(db):
+        await asyncio.gather(*(credit("u2", 1000, "topup", f"T{i}") for i in range(10)))
+        assert await db.wallets.count_documents({"userId": "u2"}) == 1
+        seqs = [entry["seq"] async for entry in db.wallet_ledger.find({"userId": "u2"})]
+        assert sorted(seqs) == list(range(1, 11))
+        check = await verify_balance("u2")
+        assert check["balance"] == 10000 and check["consistent"]
+
+    run_with_db(test)
+
+
+def test_verify_balance_across_snapshot_boundary(monkeypatch):
+    from utils import wallet_ledger
+
+    monkeypatch.setattr(wallet_ledger, "SNAPSHOT_EVERY", 10)
+
+    async def test(db):
+        # A wallet from before the ledger: its opening balance is snapshot 0
+        await db.wallets.insert_one({"userId": "u3", "balance": 500})
+        for i in range(25):
+            await wallet_ledger.credit("u3", 100, "topup", f"T{i}")
+        await wallet_ledger.debit("u3", 300, "test_payment", "P1")
+
+        snapshots = [s["seq"] async for s in db.wallet_snapshots.find({"userId": "u3"}).sort("seq", 1)]
+        assert snapshots == [0, 10, 20]
+        check = await wallet_ledger.verify_balance("u3")
+        assert check["balance"] == 500 + 2500 - 300
+        assert check["snapshotSeq"] == 20 and check["entriesSinceSnapshot"] == 6
+        assert check["consistent"]
+
+        # An entry lost after the snapshot is reported
+        await db.wallet_ledger.delete_one({"userId": "u3", "seq": 24})
+        check = await wallet_ledger.verify_balance("u3")
+        assert not check["consistent"] and check["missingEntries"] == 1
+
+    run_with_db(test)
+
+
+def test_credit_is_idempotent_per_reference():
+    from utils.wallet_ledger import credit, get_balance
+
+    async def test(db):
+        entries = await asyncio.gather(*(credit("u5", 5000, "topup", "TOPUP-u5-1") for _ in range(5)))
+        assert {entry["seq"] for entry in entries} == {1}
+        assert await get_balance("u5") == 5000
+        assert await db.wallet_ledger.count_documents({"userId": "u5"}) == 1
+
+    run_with_db(test)
+
+
+def test_lost_wallet_update_does_not_lose_the_balance(monkeypatch):
+    from utils import wallet_ledger
+
+    async def test(db):
+        await wallet_ledger.credit("u6", 1000, "topup", "T1")
+
+        async def crash(*args):
+            raise RuntimeError("connection reset")
+
+        # The process dies after recording the entry, before copying the balance
+        monkeypatch.setattr(wallet_ledger, "_sync_wallet", crash)
+        with pytest.raises(RuntimeError):
+            await wallet_ledger.credit("u6", 500, "topup", "T2")
+        monkeypatch.undo()
+
+        assert await wallet_ledger.get_balance("u6") == 1500
+        assert (await wallet_ledger.verify_balance("u6"))["consistent"]
+        await wallet_ledger.debit("u6", 1500, "payment", "P1")
+        wallet = await db.wallets.find_one({"userId": "u6"})
+        assert wallet["balance"] == 0 and wallet["seq"] == 3
+
+    run_with_db(test)
+
+
+def test_failed_topup_credit_is_retried(monkeypatch):
+    from utils import payment_state
+    from utils.wallet_ledger import get_balance
+
+    async def test(db):
+        await db.wallet_transactions.insert_one({
+            "userId": "u7", "orderId": "TOPUP-u7-1", "amount": 20000, "type": "topup",
+            "status": "pending", "paymentMethod": "qris", "createdAt": datetime.utcnow()
+        })
+        settlement = {"order_id": "TOPUP-u7-1", "transaction_status": "settlement", "fraud_status": "accept"}
+        credit = payment_state.credit
+
+        async def failing_credit(*args, **kwargs):
+            raise RuntimeError("not master")
+
+        monkeypatch.setattr(payment_state, "credit", failing_credit)
+        with pytest.raises(RuntimeError):
+            await payment_state.apply_wallet_status("TOPUP-u7-1", settlement)
+        assert (await db.wallet_transactions.find_one({"orderId": "TOPUP-u7-1"}))["status"] == "pending"
+
+        monkeypatch.setattr(payment_state, "credit", credit)
+        results = await asyncio.gather(*(payment_state.apply_wallet_status("TOPUP-u7-1", settlement) for _ in range(3)))
+        assert sorted(results) == [("success", False), ("success", False), ("success", True)]
+        assert await get_balance("u7") == 20000
+
+    run_with_db(test)
+
+
+def test_duplicate_topup_settlement_credits_once():
+    from routes.webhooks import ingest_midtrans_notification
+    from utils.payment_reconciler import PaymentReconciler
+    from utils.payment_state import initial_check_fields
+    from utils.wallet_ledger import get_balance
+    from utils.webhook_events import WebhookProcessor
+
+    async def test(db):
+        emulator = install_emulator()
+        order_id = "TOPUP-u4-1"
+        emulator._new_order(order_id, 25000, "qris")
+        now = datetime.utcnow()
+        await db.wallet_transactions.insert_one({
+            "userId": "u4", "orderId": order_id, "amount": 25000, "type": "topup",
+            "status": "pending", "paymentMethod": "qris", "createdAt": now,
+            **initial_check_fields(now), "nextCheckAt": now
+        })
+        notification = emulator.pay(order_id)
+
+        # Midtrans retries the notification; the second copy is deduped
+        first = await ingest_midtrans_notification(notification)
+        second = await ingest_midtrans_notification(dict(notification))
+        assert not first["duplicate"] and second["duplicate"]
+
+        # Two workers' webhook processors and the reconciler race on it
+        await asyncio.gather(
+            drain(WebhookProcessor(workers=1), WebhookProcessor(workers=1)),
+            PaymentReconciler().run_once()
+        )
+        transaction = await db.wallet_transactions.find_one({"orderId": order_id})
+        assert transaction["status"] == "success"
+        assert await get_balance("u4") == 25000
+        assert await db.wallet_ledger.count_documents({"userId": "u4", "refId": order_id}) == 1
+
+    run_with_db(test)
+
+
+def test_notification_for_an_unknown_order_is_retried():
+    from routes.webhooks import ingest_midtrans_notification
+    from utils import webhook_events
+    from utils.wallet_ledger import get_balance
+
+    async def test(db):
+        emulator = install_emulator()
+        order_id = "TOPUP-u8-1"
+        emulator._new_order(order_id, 15000, "qris")
+        notification = emulator.pay(order_id)
+        processor = webhook_events.WebhookProcessor(workers=1)
+
+        # The notification arrives before the order is written
+        await ingest_midtrans_notification(notification)
+        await drain(processor)
+        event = await db.webhook_events.find_one({"orderId": order_id})
+        assert event["status"] == "queued" and event["nextAttemptAt"] > datetime.utcnow()
+
+        await db.wallet_transactions.insert_one({
+            "userId": "u8", "orderId": order_id, "amount": 15000, "type": "topup",
+            "status": "pending", "paymentMethod": "qris", "createdAt": datetime.utcnow()
+        })
+        await db.webhook_events.update_one({"_id": event["_id"]}, {"$set": {"nextAttemptAt": datetime.utcnow()}})
+        await drain(processor)
+        assert (await db.webhook_events.find_one({"_id": event["_id"]}))["status"] == "done"
+        assert await get_balance("u8") == 15000
+
+        # An event given up on is reopened by the next Midtrans retry
+        await db.webhook_events.update_one({"_id": event["_id"]}, {"$set": {"status": "ignored"}})
+        result = await ingest_midtrans_notification(dict(notification))
+        assert not result["duplicate"]
+        await drain(processor)
+        assert (await db.webhook_events.find_one({"_id": event["_id"]}))["status"] == "done"
+        assert await get_balance("u8") == 15000
+
+    run_with_db(test)
+
+
+def test_duplicate_payment_settlement_approves_and_credits_referral_once():
+    from bson import ObjectId
+    from utils.payment_state import apply_payment_status
+
+    async def test(db):
+        referrer_id, user_id = ObjectId(), ObjectId()
+        await db.users.insert_many([
+            {"_id": referrer_id, "email": "ref@example.com", "myReferralCode": "REF123", "referralBonus": 0},
+            {"_id": user_id, "email": "user@example.com", "usedReferralCode": "REF123",
+             "paymentStatus": "pending", "currentOrderId": "NEWME-1"},
+        ])
+        await db.referral_transactions.insert_one(
+            {"referrerId": str(referrer_id), "referredId": str(user_id), "status": "pending"}
+        )
+        await db.payment_proofs.insert_one({"orderId": "NEWME-1", "userId": str(user_id), "status": "pending"})
+
+        settlement = {"order_id": "NEWME-1", "transaction_status": "settlement", "fraud_status": "accept"}
+        results = await asyncio.gather(*(apply_payment_status("NEWME-1", dict(settlement)) for _ in range(5)))
+        assert [changed for _, changed in results].count(True) == 1
+        assert {status for status, _ in results} == {"settlement"}
+
+        # A late failure notification cannot undo it
+        assert await apply_payment_status("NEWME-1", {"transaction_status": "expire"}) == ("settlement", False)
+        user = await db.users.find_one({"_id": user_id})
+        assert user["paymentStatus"] == "approved"
+        referrer = await db.users.find_one({"_id": referrer_id})
+        assert referrer["referralBonus"] == 10000
+
+    run_with_db(test)
+
+
+def test_shop_order_settles_once_and_never_moves_backwards():
+    from bson import ObjectId
+    from utils.payment_state import apply_transaction_status
+
+    async def test(db):
+        product_id = ObjectId()
+        await db.products.insert_one({"_id": product_id, "stock": 10})
+        await db.transactions.insert_one({
+            "order_id": "ORDER-1", "status": "pending",
+            "items": [{"id": str(product_id), "quantity": 2}]
+        })
+
+        await asyncio.gather(*(
+            apply_transaction_status("ORDER-1", {"transaction_status": status})
+            for status in ["settlement", "settlement", "pending", "settlement"]
+        ))
+        # Replayed "pending" after the settlement
+        assert await apply_transaction_status("ORDER-1", {"transaction_status": "pending"}) == ("settlement", False)
+        assert (await db.transactions.find_one({"order_id": "ORDER-1"}))["status"] == "settlement"
+        assert (await db.products.find_one({"_id": product_id}))["stock"] == 8
+
+    run_with_db(test)
@@ -0,0 +1,49 @@
+"""
+Query-plan regression check.
+
+Applies the index registry to a scratch database and runs explain() on every
+query shape in indexes.QUERY_SHAPES. Fails if any of them would COLLSCAN.
+
+Needs a running mongod:
+    MONGO_URL=mongodb://localhost:27017 python -m pytest tests/test_query_plans.py
+"""
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from indexes import INDEXES, QUERY_SHAPES, apply_indexes, find_collscans
+
+MONGO_URL = os.environ.get("MONGO_URL")
+
+requires_mongo = pytest.mark.skipif(not MONGO_URL, reason="MONGO_URL not set")
+
+
+def test_every_query_shape_targets_a_registered_collection():
+    missing = {collection for collection, _, _ in QUERY_SHAPES} - set(INDEXES)
+    assert not missing
+
+
+@requires_mongo
+def test_no_query_shape_uses_collscan():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+        db = client[f"query_plan_check_{uuid.uuid4().hex[:8]}"]
+        try:
+            await apply_indexes(db)
+            # Applying twice must be a no-op
+            await apply_indexes(db)
+            return await find_collscans(db)
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    offenders = asyncio.run(run())
+    assert not offenders, f"COLLSCAN for: {offenders}"